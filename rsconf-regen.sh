@@ -6,4 +6,4 @@ export PATH=$HOME/opt/sqlite/bin:$PATH
 export LD_LIBRARY_PATH=$HOME/opt/sqlite/lib
 export LD_RUN_PATH=$HOME/opt/sqlite/lib
 
-python manage.py ixctl_rsconf_generate
+python manage.py ixctl_rsconf_generate --jobs $(nproc)
@@ -0,0 +1,420 @@
+"""
+Managed workspace for arouteserver runs
+
+Every run gets its own temporary directory for its input and output
+files, which is removed once the run is done. The arouteserver cache
+(IRR / bgpq4 results, PeeringDB and RPKI data) lives in a persistent
+directory shared by all runs and route servers, so unchanged IRR data
+does not have to be fetched again on every run.
+
+Cache files are expired by age (`IXCTL_ARS_CACHE_TTL`) and the cache
+is kept below a size cap (`IXCTL_ARS_CACHE_MAX_SIZE`) by removing the
+least recently modified files first. Pruning walks the whole cache, so
+runs do it at most once every `IXCTL_ARS_CACHE_PRUNE_INTERVAL` seconds.
+
+arouteserver commands run on a pool of long-lived worker processes
+that import arouteserver once, so a run does not pay for interpreter
+startup and imports (`IXCTL_ARS_RUNNER`). The cli is used if the pool
+is disabled or unavailable.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import structlog
+from django.conf import settings
+
+logger = structlog.get_logger(__name__)
+
+# max seconds an arouteserver run may take
+
+RUN_TIMEOUT = 600
+
+# worker pool state, the pool belongs to the process that created it
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# runs in flight per pool, and pools that were replaced and are
+# terminated once their last run is done
+
+_pool_runs = {}
+_retired_pools = set()
+
+# arouteserver cli parser and commands, set up in pool workers
+
+_parser = None
+_commands = None
+
+
+def get_work_dir():
+    """
+    Returns the workspace root, creating it if needed
+    """
+
+    work_dir = settings.IXCTL_ARS_WORK_DIR or os.path.join(
+        tempfile.gettempdir(), "ixctl-arouteserver"
+    )
+    os.makedirs(work_dir, exist_ok=True)
+    return work_dir
+
+
+def get_cache_dir():
+    """
+    Returns the shared arouteserver cache directory, creating it if needed
+    """
+
+    cache_dir = settings.IXCTL_ARS_CACHE_DIR or os.path.join(get_work_dir(), "cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+@contextlib.contextmanager
+def workspace():
+    """
+    Context manager that provides a temporary directory for a single
+    arouteserver run and removes it afterwards
+
+    The shared cache is pruned before the directory is handed out,
+    if it is due (see `maybe_prune_cache`).
+
+    Yields:
+
+    - `str`: path of the run directory
+    """
+
+    maybe_prune_cache()
+
+    run_dir = tempfile.mkdtemp(prefix="run-", dir=get_work_dir())
+    try:
+        yield run_dir
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def maybe_prune_cache(now=None):
+    """
+    Prunes the shared cache if it was not pruned within the last
+    `IXCTL_ARS_CACHE_PRUNE_INTERVAL` seconds
+
+    The time of the last pruning is the modification time of a marker
+    file in the workspace root, so it is shared by all processes.
+
+    Keyword Argument(s):
+
+    - now (`float`): unix timestamp
+
+    Returns:
+
+    - `int`: number of removed files, `None` if pruning was not due
+    """
+
+    if now is None:
+        now = time.time()
+
+    marker = os.path.join(get_work_dir(), ".cache-pruned")
+
+    with contextlib.suppress(FileNotFoundError):
+        if now - os.path.getmtime(marker) < settings.IXCTL_ARS_CACHE_PRUNE_INTERVAL:
+            return None
+
+    # marked before pruning, so concurrent runs do not prune as well
+
+    with open(marker, "a"):
+        pass
+    os.utime(marker, (now, now))
+
+    return prune_cache(now=now)
+
+
+def prune_cache(cache_dir=None, ttl=None, max_size=None, now=None):
+    """
+    Removes expired cache files and enforces the cache size cap
+
+    Keyword Argument(s):
+
+    - cache_dir (`str`): defaults to `get_cache_dir()`
+    - ttl (`int`): max age of a cache file in seconds, defaults to
+      `IXCTL_ARS_CACHE_TTL` (0 disables expiry)
+    - max_size (`int`): max total size of the cache in bytes, defaults
+      to `IXCTL_ARS_CACHE_MAX_SIZE` (0 disables the cap)
+    - now (`float`): unix timestamp to expire against
+
+    Returns:
+
+    - `int`: number of removed files
+    """
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    if ttl is None:
+        ttl = settings.IXCTL_ARS_CACHE_TTL
+    if max_size is None:
+        max_size = settings.IXCTL_ARS_CACHE_MAX_SIZE
+    if now is None:
+        now = time.time()
+
+    files = []
+
+    for root, dirs, filenames in os.walk(cache_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # removed by a concurrent run
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    expired = []
+    size = 0
+
+    # newest first, so the oldest files are the ones over the size cap
+
+    for mtime, file_size, path in sorted(files, reverse=True):
+        if (ttl and now - mtime > ttl) or (max_size and size + file_size > max_size):
+            expired.append(path)
+        else:
+            size += file_size
+
+    for path in expired:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    if expired:
+        logger.debug(f"pruned {len(expired)} files from arouteserver cache {cache_dir}")
+
+    return len(expired)
+
+
+def init_worker():
+    """
+    Pool worker initializer, imports arouteserver and sets up its
+    cli parser once for all runs of the worker
+    """
+
+    global _parser, _commands
+
+    from pierky.arouteserver.commands import all_commands
+
+    _parser = argparse.ArgumentParser(prog="arouteserver")
+    sub_parsers = _parser.add_subparsers(dest="command")
+    sub_parsers.required = True
+
+    _commands = {}
+    for cmd_class in all_commands:
+        cmd_class.attach_to_parser(sub_parsers)
+        _commands[cmd_class.COMMAND_NAME] = cmd_class
+
+
+def run_command(args):
+    """
+    Runs an arouteserver command inside a pool worker
+
+    Argument(s):
+
+    - args (`list`): arouteserver cli arguments, without the program name
+
+    Returns:
+
+    - `str` error message or `None` on success
+    """
+
+    from pierky.arouteserver.errors import ARouteServerError
+
+    # errors arouteserver logs end up in the error message, the
+    # handler is attached after the command is set up since that
+    # (re)configures logging
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setLevel(logging.ERROR)
+    root = logging.getLogger()
+
+    try:
+        try:
+            parsed = _parser.parse_args(args)
+        except SystemExit:
+            return f"Invalid arguments: {args}"
+
+        command = _commands[parsed.command](parsed)
+        root.addHandler(handler)
+
+        if command.run():
+            return None
+        return stream.getvalue().strip() or "arouteserver failed"
+
+    except ARouteServerError as exc:
+        error = f"{exc}" or stream.getvalue().strip() or "arouteserver failed"
+        if exc.extra_info:
+            error = f"{error}\n\n{exc.extra_info}"
+        return error
+    except KeyboardInterrupt:
+        raise
+    except SystemExit as exc:
+        # a command exiting must not take the worker down with it
+        return f"arouteserver exited with status {exc.code}"
+    except BaseException as exc:
+        return f"Unexpected error: {exc!r}"
+    finally:
+        root.removeHandler(handler)
+
+
+def get_pool():
+    """
+    Returns the arouteserver worker pool, starting it if needed
+
+    Forked processes start a pool of their own.
+    """
+
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # workers are spawned so they do not inherit database
+            # connections or other state of the django process
+            _pool = multiprocessing.get_context("spawn").Pool(
+                processes=settings.IXCTL_ARS_POOL_SIZE,
+                initializer=init_worker,
+                maxtasksperchild=settings.IXCTL_ARS_POOL_MAX_TASKS or None,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool():
+    """
+    Terminates the worker pool of this process, if there is one
+    """
+
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.terminate()
+        _pool = None
+        _pool_pid = None
+
+
+def retire_pool(pool):
+    """
+    Marks a worker pool for replacement, the next run starts a new pool
+
+    Runs still in flight on the pool are allowed to finish, the pool is
+    terminated once the last of them is done.
+
+    Argument(s):
+
+    - pool (`multiprocessing.pool.Pool`)
+    """
+
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_pid = None
+
+        if _pool_runs.get(pool):
+            pool.close()
+            _retired_pools.add(pool)
+        else:
+            pool.terminate()
+
+
+@contextlib.contextmanager
+def pool_run():
+    """
+    Context manager providing the worker pool for a single run
+
+    Keeps count of the runs in flight, so a retired pool (see
+    `retire_pool`) is terminated once its last run is done.
+    """
+
+    pool = get_pool()
+
+    with _pool_lock:
+        _pool_runs[pool] = _pool_runs.get(pool, 0) + 1
+
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_runs[pool] -= 1
+            if not _pool_runs[pool]:
+                del _pool_runs[pool]
+                if pool in _retired_pools:
+                    _retired_pools.discard(pool)
+                    pool.terminate()
+
+
+def run_cli(args):
+    """
+    Runs an arouteserver command through the cli
+
+    Raises `OSError` if the command fails
+    """
+
+    process = subprocess.Popen(["arouteserver"] + args, stderr=subprocess.PIPE)
+    _, err = process.communicate(timeout=RUN_TIMEOUT)
+
+    if process.returncode:
+        if err:
+            err = err.decode("utf-8")
+            raise OSError(err)
+        else:
+            raise OSError(f"Process returned {process.returncode}")
+
+
+def run(args):
+    """
+    Runs an arouteserver command
+
+    Runs on the worker pool if `IXCTL_ARS_RUNNER` is "pool", falling
+    back to the cli if the pool cannot be used.
+
+    A run that does not finish within `RUN_TIMEOUT` seconds is not
+    retried, its pool is replaced since the worker is likely stuck.
+
+    Argument(s):
+
+    - args (`list`): arouteserver cli arguments, without the program name
+
+    Raises `OSError` if the command fails (`TimeoutError` if it timed out)
+    """
+
+    if settings.IXCTL_ARS_RUNNER != "pool":
+        return run_cli(args)
+
+    timed_out = False
+
+    try:
+        with pool_run() as pool:
+            try:
+                error = pool.apply_async(run_command, (args,)).get(RUN_TIMEOUT)
+            except multiprocessing.TimeoutError:
+                retire_pool(pool)
+                timed_out = True
+            except (OSError, ValueError):
+                retire_pool(pool)
+                raise
+    except (OSError, ValueError) as exc:
+        # pool could not be started or was closed
+        logger.warning(f"arouteserver pool unavailable, using cli: {exc!r}")
+        return run_cli(args)
+
+    if timed_out:
+        raise TimeoutError(f"arouteserver did not finish within {RUN_TIMEOUT} seconds")
+
+    if error:
+        raise OSError(error)
@@ -0,0 +1,362 @@
+"""
+Content addressed file store for generated route server configs
+
+Configs are stored once per distinct content, under the sha256 digest
+of the content, in `IXCTL_RSCONF_ARTIFACT_DIR`. Config rows only keep
+the digest and size, so loading or saving a config's metadata never
+moves the config itself.
+
+Artifacts are gzip compressed if `IXCTL_RSCONF_ARTIFACT_COMPRESS` is
+enabled. Artifacts written with either setting can always be read.
+
+Content encoded copies of an artifact (see `get_encoded`) are kept next
+to it, so they can be served to clients as they are.
+
+Artifacts that are no longer referred to are removed once they were not
+stored for `IXCTL_RSCONF_ARTIFACT_GRACE` seconds (see `remove_stale`).
+Storing an artifact that exists already refreshes its modification
+time, so a config that is about to be saved never loses its artifact.
+Storing and removing hold a lock on the store, so neither happens in
+the middle of the other.
+"""
+
+import contextlib
+import fcntl
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# file name suffixes of content encoded artifacts
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# content encodings artifacts can be served in, in order of preference
+
+if zstandard:
+    ENCODINGS = ("zstd", "gzip")
+else:
+    ENCODINGS = ("gzip",)
+
+
+def get_dir():
+    """
+    Returns the artifact store directory, creating it if needed
+    """
+
+    artifact_dir = settings.IXCTL_RSCONF_ARTIFACT_DIR
+    os.makedirs(artifact_dir, exist_ok=True)
+    return artifact_dir
+
+
+@contextlib.contextmanager
+def lock():
+    """
+    Context manager holding the exclusive lock of the artifact store,
+    shared by all processes using the store
+    """
+
+    with open(os.path.join(get_dir(), ".lock"), "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def get_path(digest, encoding=None):
+    """
+    Returns the file path of an artifact
+
+    Artifacts are spread over sub directories named after the first
+    two characters of their digest.
+
+    Keyword Argument(s):
+
+    - encoding (`str`): content encoding of the file, `None` for the
+      uncompressed content
+    """
+
+    filename = digest + SUFFIXES.get(encoding, "")
+    return os.path.join(get_dir(), digest[:2], filename)
+
+
+def encode(data, encoding):
+    """
+    Returns `bytes` data compressed with the specified content encoding
+    """
+
+    if encoding == "gzip":
+        # fixed mtime so the result only depends on the content
+        return gzip.compress(data, mtime=0)
+    if encoding == "zstd" and zstandard:
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def write(path, data):
+    """
+    Writes `bytes` data to a file
+
+    Data is written to a temporary file first and moved into place, so
+    readers never see a partially written file.
+    """
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def find(digest):
+    """
+    Returns (`str` path, `bool` compressed) of a stored artifact
+
+    Raises `FileNotFoundError` if it does not exist
+    """
+
+    for encoding in (None, "gzip"):
+        path = get_path(digest, encoding)
+        if os.path.exists(path):
+            return path, encoding is not None
+    raise FileNotFoundError(f"Artifact {digest} not found")
+
+
+def put(content):
+    """
+    Stores content, unless content with the same digest is stored
+    already
+
+    Argument(s):
+
+    - content (`str`)
+
+    Returns:
+
+    - `tuple` (`str` digest, `int` size in bytes)
+    """
+
+    data = content.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+
+    with lock():
+        try:
+            path, _ = find(digest)
+        except FileNotFoundError:
+            if settings.IXCTL_RSCONF_ARTIFACT_COMPRESS:
+                write(get_path(digest, "gzip"), encode(data, "gzip"))
+            else:
+                write(get_path(digest), data)
+        else:
+            # refreshed so it is not removed as stale before the row
+            # referring to it is saved
+            os.utime(path)
+
+    return digest, len(data)
+
+
+def open_artifact(digest):
+    """
+    Opens a stored artifact for reading, returns a binary file object
+    of the uncompressed content
+    """
+
+    path, compressed = find(digest)
+    if compressed:
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+class Stream:
+    """
+    Read only wrapper for a decompressing file object
+
+    Hides seeking, so a `FileResponse` streams the content instead of
+    decompressing it once more to determine its length.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def read(self, size=-1):
+        return self.fileobj.read(size)
+
+    def close(self):
+        self.fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stream(digest):
+    """
+    Opens a stored artifact for streaming its uncompressed content,
+    uncompressed artifacts are returned as a plain file object
+    """
+
+    path, compressed = find(digest)
+    if compressed:
+        return Stream(gzip.open(path, "rb"))
+    return open(path, "rb")
+
+
+def has_encoded(digest, encoding):
+    """
+    Returns whether the content encoded copy of a stored artifact
+    exists, see `get_encoded`
+    """
+
+    return os.path.exists(get_path(digest, encoding))
+
+
+def get_encoded(digest, encoding):
+    """
+    Returns the content encoded copy of a stored artifact, creating it
+    if it does not exist yet
+
+    Gzip compressed artifacts are their own gzip encoded copy.
+
+    Argument(s):
+
+    - digest (`str`)
+    - encoding (`str`): content encoding, one of `ENCODINGS`
+
+    Returns:
+
+    - `tuple` (`str` path, `int` size in bytes)
+
+    Raises `FileNotFoundError` if the artifact does not exist
+    """
+
+    path = get_path(digest, encoding)
+
+    if not os.path.exists(path):
+        with open_artifact(digest) as fh:
+            write(path, encode(fh.read(), encoding))
+
+    return path, os.path.getsize(path)
+
+
+def read(digest):
+    """
+    Returns the content of a stored artifact as `str`
+    """
+
+    with open_artifact(digest) as fh:
+        return fh.read().decode("utf-8")
+
+
+def remove(digest):
+    """
+    Removes a stored artifact and its encoded copies, if they exist
+    """
+
+    for encoding in (None, *SUFFIXES):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(get_path(digest, encoding))
+
+
+def iter_digests():
+    """
+    Yields the digests of all artifacts in the store, including
+    artifacts of which only encoded copies are left
+    """
+
+    artifact_dir = get_dir()
+
+    for subdir in os.listdir(artifact_dir):
+        path = os.path.join(artifact_dir, subdir)
+        if len(subdir) != 2 or not os.path.isdir(path):
+            continue
+
+        digests = set()
+        for filename in os.listdir(path):
+            digest = filename.split(".")[0]
+            if DIGEST_RE.match(digest) and digest not in digests:
+                digests.add(digest)
+                yield digest
+
+
+def gc_due(now=None):
+    """
+    Returns whether unused artifacts are due to be looked for, which
+    is done at most once every `IXCTL_RSCONF_ARTIFACT_GC_INTERVAL`
+    seconds
+
+    The time of the last run is the modification time of a marker file
+    in the store, so it is shared by all processes. It is updated when
+    a run is due, so concurrent callers do not run as well.
+
+    Keyword Argument(s):
+
+    - now (`float`): unix timestamp
+    """
+
+    if now is None:
+        now = time.time()
+
+    marker = os.path.join(get_dir(), ".gc")
+
+    with contextlib.suppress(FileNotFoundError):
+        if now - os.path.getmtime(marker) < settings.IXCTL_RSCONF_ARTIFACT_GC_INTERVAL:
+            return False
+
+    with open(marker, "a"):
+        pass
+    os.utime(marker, (now, now))
+
+    return True
+
+
+def remove_stale(digest, max_age=None, now=None):
+    """
+    Removes a stored artifact and its encoded copies, unless it was
+    stored within the last `max_age` seconds
+
+    The caller makes sure nothing refers to the artifact.
+
+    Keyword Argument(s):
+
+    - max_age (`int`): defaults to `IXCTL_RSCONF_ARTIFACT_GRACE`
+    - now (`float`): unix timestamp
+
+    Returns:
+
+    - `bool`: whether the artifact was removed
+    """
+
+    if max_age is None:
+        max_age = settings.IXCTL_RSCONF_ARTIFACT_GRACE
+    if now is None:
+        now = time.time()
+
+    with lock():
+        with contextlib.suppress(FileNotFoundError):
+            path, _ = find(digest)
+            if now - os.path.getmtime(path) < max_age:
+                return False
+        remove(digest)
+
+    return True
@@ -32,3 +32,9 @@ IXF_EXPORT_PRIVACY_TYPES = (
     ("public", _("IX-F export feed is public")),
     ("private", _("IX-F export feed requires secret key to view")),
 )
+
+MEMBER_CHANGE_ACTIONS = (
+    ("add", _("Added")),
+    ("change", _("Changed")),
+    ("remove", _("Removed")),
+)
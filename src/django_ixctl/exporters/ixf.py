@@ -1,52 +1,621 @@
+import base64
+import binascii
 import datetime
+import gzip
+import hashlib
 import json
+from itertools import groupby
+from operator import itemgetter
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
 
-def export(ix, pretty=False):
-    member_list = []
+import django_ixctl.models
 
-    rv = {
-        "version": "0.6",
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "member_list": member_list,
-        "ixp_list": [{"ixp_id": ix.id, "shortname": ix.name}],
-    }
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content encodings snapshots are stored in, in order of preference
+
+if brotli:
+    EXPORT_ENCODINGS = ("br", "gzip")
+else:
+    EXPORT_ENCODINGS = ("gzip",)
+
+# member fields required to build the ix-f member list
+#
+# members are loaded as plain value rows so building the export
+# never instantiates model objects or touches related objects.
+#
+# the rows are the intermediate form all schema renderers
+# serialize from, so they carry the union of the fields the
+# renderers need
+
+MEMBER_FIELDS = (
+    "ix_id",
+    "asn",
+    "name",
+    "ixf_member_type",
+    "ixf_state",
+    "speed",
+    "ipaddr4",
+    "ipaddr6",
+    "macaddr",
+    "as_macro_override",
+    "is_rs_peer",
+)
+
+
+def member_rows(queryset):
+    """
+    Returns the member value rows needed for the export from
+    an `InternetExchangeMember` queryset
+
+    Rows are ordered by asn so they can be grouped in one pass
+    """
+
+    return queryset.order_by("asn", "ix_id", "id").values(*MEMBER_FIELDS)
+
+
+class Renderer:
+    """
+    Renders ix-f documents of a specific schema version from
+    member rows (see `member_rows`)
+
+    Renderers only serialize, all database work happens before
+    rows are handed to them, so any number of schema versions
+    can be rendered from a single pass over the members.
+    """
+
+    version = None
+
+    def vlan(self, row, address):
+        return {"address": f"{address}", "routeserver": row["is_rs_peer"]}
+
+    def connection(self, row):
+        """
+        Returns ix-f connection `dict` for a member row
+        """
+
+        vlan_list = [{}]
+
+        if row["ipaddr4"]:
+            vlan_list[0]["ipv4"] = self.vlan(row, row["ipaddr4"])
+        if row["ipaddr6"]:
+            vlan_list[0]["ipv6"] = self.vlan(row, row["ipaddr6"])
+
+        return {
+            "ixp_id": row["ix_id"],
+            "state": row["ixf_state"],
+            "if_list": [{"if_speed": row["speed"]}],
+            "vlan_list": vlan_list,
+        }
+
+    def member(self, asn, connections):
+        """
+        Returns ix-f member `dict` for all connection rows of an asn
+
+        The member type is taken from the first connection of the asn.
+        """
+
+        return {
+            "asnum": asn,
+            "member_type": connections[0]["ixf_member_type"],
+            "connection_list": [self.connection(row) for row in connections],
+        }
+
+    def iter_member_list(self, rows):
+        """
+        Yields ix-f member entries from member rows ordered by asn
+
+        All connections of an asn are grouped into a single member entry
+        """
+
+        for asn, connections in groupby(rows, key=itemgetter("asn")):
+            yield self.member(asn, list(connections))
+
+    def member_list(self, rows):
+        return list(self.iter_member_list(rows))
+
+    def ixp_list(self, *exchanges):
+        return [{"ixp_id": ix.id, "shortname": ix.name} for ix in exchanges]
+
+    def document(self, member_list, exchanges, timestamp=None):
+        """
+        Returns the ix-f document `dict`
+
+        Argument(s):
+
+        - member_list (`list`): rendered member entries
+        - exchanges (`list` of `InternetExchange`): exchanges to list
+          in the ixp list
+        """
+
+        return {
+            "version": self.version,
+            "timestamp": format_timestamp(timestamp),
+            "member_list": member_list,
+            "ixp_list": self.ixp_list(*exchanges),
+        }
+
+
+class Renderer06(Renderer):
+    version = "0.6"
+
+
+class Renderer07(Renderer06):
+    """
+    0.7 adds member names, as-macros and mac addresses
+    """
+
+    version = "0.7"
+
+    def vlan(self, row, address):
+        vlan = super().vlan(row, address)
+        if row["as_macro_override"]:
+            vlan["as_macro"] = row["as_macro_override"]
+        if row["macaddr"]:
+            vlan["mac_addresses"] = [f"{row['macaddr']}"]
+        return vlan
+
+    def member(self, asn, connections):
+        member = super().member(asn, connections)
+        name = connections[0]["name"]
+        if name:
+            member["name"] = name
+        return member
+
+
+class Renderer10(Renderer07):
+    version = "1.0"
+
+
+RENDERERS = {
+    renderer.version: renderer() for renderer in (Renderer06, Renderer07, Renderer10)
+}
+
+DEFAULT_VERSION = "0.6"
 
-    for ix in [ix]:
-        asns = []
-        for member in ix.member_set.all():
-            if member.asn in asns:
-                continue
-            connection_list = []
-            member_dict = {
-                "asnum": member.asn,
-                "member_type": member.ixf_member_type,
-                "connection_list": connection_list,
-            }
-            member_list.append(member_dict)
-            asns.append(member.asn)
-            for _member in ix.member_set.filter(asn=member.asn):
-                vlan_list = [{}]
-                connection = {
-                    "ixp_id": _member.ix.id,
-                    "state": _member.ixf_state,
-                    "if_list": [{"if_speed": _member.speed}],
-                    "vlan_list": vlan_list,
-                }
-                connection_list.append(connection)
-
-                if _member.ipaddr4:
-                    vlan_list[0]["ipv4"] = {
-                        "address": f"{_member.ipaddr4}",
-                        "routeserver": _member.is_rs_peer,
-                    }
-                if _member.ipaddr6:
-                    vlan_list[0]["ipv6"] = {
-                        "address": f"{_member.ipaddr6}",
-                        "routeserver": _member.is_rs_peer,
-                    }
 
+def get_renderer(version=None):
+    """
+    Returns the renderer for the specified ix-f schema version
+
+    Raises `ValueError` for unsupported versions
+    """
+
+    try:
+        return RENDERERS[version or DEFAULT_VERSION]
+    except KeyError:
+        raise ValueError(f"Unsupported IX-F schema version: {version}")
+
+
+def format_timestamp(timestamp=None):
+    if not timestamp:
+        timestamp = datetime.datetime.now()
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def dumps(data, pretty=False):
     if pretty:
-        return json.dumps(rv, indent=2)
+        return json.dumps(data, indent=2)
     else:
-        return json.dumps(rv)
+        return json.dumps(data)
+
+
+def export(ix, pretty=False, timestamp=None, version=None, rows=None):
+    """
+    Export the exchange's members as an ix-f document
+
+    Keyword Argument(s):
+
+    - pretty (`bool`): indent output
+    - timestamp (`datetime`): export timestamp, defaults to now
+    - version (`str`): ix-f schema version, defaults to `DEFAULT_VERSION`
+    - rows (`list`): member rows, loaded from the database if not specified
+    """
+
+    renderer = get_renderer(version)
+
+    if rows is None:
+        rows = member_rows(ix.member_set.all())
+
+    return dumps(renderer.document(renderer.member_list(rows), [ix], timestamp), pretty)
+
+
+def export_instance(instance, pretty=False, timestamp=None, version=None):
+    """
+    Export all public exchanges of an ixctl instance into one
+    ix-f document
+
+    Members holding connections at several of the exchanges are listed
+    once, with their connections grouped across exchanges.
+
+    Argument(s):
+
+    - instance (`Instance`)
+
+    Keyword Argument(s):
+
+    - pretty (`bool`): indent output
+    - timestamp (`datetime`): export timestamp, defaults to now
+    - version (`str`): ix-f schema version, defaults to `DEFAULT_VERSION`
+    """
+
+    renderer = get_renderer(version)
+
+    exchanges = instance.ix_set.filter(ixf_export_privacy="public").order_by("id")
+
+    members = django_ixctl.models.InternetExchangeMember.objects.filter(
+        ix__instance=instance, ix__ixf_export_privacy="public"
+    )
+
+    return dumps(
+        renderer.document(
+            renderer.member_list(member_rows(members)), list(exchanges), timestamp
+        ),
+        pretty,
+    )
+
+
+def export_stream(ix, timestamp=None, version=None):
+    """
+    Yields the compact export of the exchange as json encoded chunks
+
+    Members are read through a server-side cursor and encoded one at a
+    time, so memory use stays flat regardless of exchange size.
+
+    The joined output is byte-identical to `export(ix, pretty=False)`
+    for the same timestamp and version.
+    """
+
+    renderer = get_renderer(version)
+
+    rows = member_rows(ix.member_set.all()).iterator(
+        chunk_size=settings.IXCTL_IXF_EXPORT_STREAM_CHUNK_SIZE
+    )
+
+    # render the document with an empty member list and split it
+    # around it, so the envelope always matches the renderer
+
+    head, tail = json.dumps(renderer.document([], [ix], timestamp)).split(
+        '"member_list": []', 1
+    )
+
+    yield f'{head}"member_list": ['
+
+    chunk = []
+
+    for idx, member in enumerate(renderer.iter_member_list(rows)):
+        if idx:
+            chunk.append(", ")
+        chunk.append(json.dumps(member))
+
+        if len(chunk) >= settings.IXCTL_IXF_EXPORT_STREAM_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+
+    chunk.append(f"]{tail}")
+
+    yield "".join(chunk)
+
+
+def cache_key(ix_id, variant):
+    return f"ixctl.ixf_export.{ix_id}.{variant}"
+
+
+def export_variant(pretty=False, version=None):
+    """
+    Returns the variant name an export is cached and tagged under
+
+    Exports of the default schema version are named by format only
+    """
+
+    variant = "compact"
+    if pretty:
+        variant = "pretty"
+    if version and version != DEFAULT_VERSION:
+        variant = f"{variant}-{version}"
+    return variant
+
+
+def export_version(ix):
+    """
+    Returns the version key, last modification time and member count
+    for the current export state of the exchange
+
+    The version key is derived from the exchange and its members'
+    `updated` timestamps, the member count and the most recent member
+    change log entry, so it changes whenever a member is added, changed
+    or removed. Removed members leave no `updated` timestamp behind,
+    their change log entry moves the modification time forward.
+
+    Returns:
+
+    - `dict` with `version` (`str`), `last_modified` (`datetime`) and
+      `members` (`int`) keys
+    """
+
+    state = ix.member_set.order_by().aggregate(
+        last_updated=Max("updated"), count=Count("id")
+    )
+
+    last_change = (
+        ix.member_change_set.order_by("-created")
+        .values_list("created", flat=True)
+        .first()
+    )
+
+    last_modified = max(
+        timestamp
+        for timestamp in (ix.updated, state["last_updated"], last_change)
+        if timestamp
+    )
+
+    version = hashlib.sha1(
+        f"{ix.id}:{ix.updated.isoformat()}:"
+        f"{state['last_updated']}:{state['count']}:{last_change}".encode()
+    ).hexdigest()
+
+    return {
+        "version": version,
+        "last_modified": last_modified,
+        "members": state["count"],
+    }
+
+
+def export_state(ix):
+    """
+    Returns the cached export state of the exchange, see `export_version`
+
+    This is what conditional requests are answered from, so it is
+    cached separately from the (much bigger) rendered snapshots.
+    """
+
+    key = cache_key(ix.id, "state")
+    state = cache.get(key)
+
+    if state is None:
+        state = export_version(ix)
+        cache.set(key, state, timeout=settings.IXCTL_IXF_EXPORT_CACHE_TIMEOUT)
+
+    return state
+
+
+def compress(body, encoding):
+    """
+    Returns the body compressed with the specified content encoding
+    """
+
+    if encoding == "gzip":
+        # fixed mtime so the compressed output only depends on the body
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def snapshot_rows(ix):
+    """
+    Returns the cached member rows of the exchange, loading and
+    caching them if they do not exist yet
+
+    Snapshots of all schema versions and formats are rendered from
+    these, so the members are only read from the database once
+    per change.
+    """
+
+    key = cache_key(ix.id, "rows")
+    rows = cache.get(key)
+
+    if rows is None:
+        rows = list(member_rows(ix.member_set.all()))
+        cache.set(key, rows, timeout=settings.IXCTL_IXF_EXPORT_CACHE_TIMEOUT)
+
+    return rows
+
+
+def snapshot(ix, pretty=False, version=None):
+    """
+    Returns the cached export snapshot for the exchange, rendering
+    and caching it if it does not exist yet
+
+    Each format and ix-f schema version is cached separately.
+
+    Snapshots are invalidated through `invalidate` whenever the
+    exchange or one of its members is saved or deleted.
+
+    Compressed encodings of the body are stored with the snapshot,
+    so compression happens once per change.
+
+    Returns:
+
+    - `dict` with `version`, `last_modified`, `body` (`bytes`) and
+      `encoded` (`dict` of content encoding to compressed `bytes`) keys
+    """
+
+    key = cache_key(ix.id, export_variant(pretty, version))
+    data = cache.get(key)
+
+    if data is not None:
+        return data
+
+    state = export_state(ix)
+    body = export(
+        ix,
+        pretty=pretty,
+        timestamp=state["last_modified"],
+        version=version,
+        rows=snapshot_rows(ix),
+    ).encode("utf-8")
+
+    data = {
+        "version": state["version"],
+        "last_modified": state["last_modified"],
+        "body": body,
+        "encoded": {
+            encoding: compress(body, encoding) for encoding in EXPORT_ENCODINGS
+        },
+    }
+
+    cache.set(key, data, timeout=settings.IXCTL_IXF_EXPORT_CACHE_TIMEOUT)
+
+    return data
+
+
+def invalidate(ix_id):
+    """
+    Removes all cached export snapshots, member rows and the export
+    state for the exchange
+    """
+
+    cache.delete_many(
+        [
+            cache_key(ix_id, export_variant(pretty, version))
+            for pretty in (False, True)
+            for version in RENDERERS
+        ]
+        + [cache_key(ix_id, "rows"), cache_key(ix_id, "state")]
+    )
+
+
+def encode_cursor(change_id):
+    """
+    Returns the opaque delta feed cursor for a change log id
+    """
+
+    return base64.urlsafe_b64encode(f"c{change_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns the change log id for an opaque delta feed cursor
+
+    Raises `ValueError` on invalid cursors
+    """
+
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    if not value.startswith("c") or not value[1:].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return int(value[1:])
+
+
+def delta_start(ix, since):
+    """
+    Returns the change log id a delta for changes made after
+    `since` (`datetime`) starts from
+    """
+
+    return (
+        ix.member_change_set.filter(created__lte=since)
+        .order_by("-id")
+        .values_list("id", flat=True)
+        .first()
+        or 0
+    )
+
+
+def export_delta(ix, cursor=0, pretty=False, limit=None, timestamp=None, version=None):
+    """
+    Export the members of the exchange that were added, changed
+    or removed after the specified change log position
+
+    Changes are read from the member change log and collapsed to their
+    net effect per member, so a member that was changed several times
+    is listed once and a member that was added and removed again
+    within the window is not listed at all.
+
+    Argument(s):
+
+    - ix (`InternetExchange`)
+
+    Keyword Argument(s):
+
+    - cursor (`int`): change log id to start after, see `decode_cursor`
+      and `delta_start`
+    - pretty (`bool`): indent output
+    - limit (`int`): max number of change log entries to process,
+      defaults to `IXCTL_IXF_DELTA_LIMIT`. If more changes exist `more`
+      is set and the returned cursor continues from there.
+    - timestamp (`datetime`): export timestamp, defaults to now
+    - version (`str`): ix-f schema version, defaults to `DEFAULT_VERSION`
+    """
+
+    renderer = get_renderer(version)
+
+    if limit is None:
+        limit = settings.IXCTL_IXF_DELTA_LIMIT
+
+    changes = list(
+        ix.member_change_set.filter(id__gt=cursor)
+        .order_by("id")
+        .values("id", "member_id", "asn", "action")[: limit + 1]
+    )
+
+    more = len(changes) > limit
+    changes = changes[:limit]
+
+    if changes:
+        cursor = changes[-1]["id"]
+
+    # net effect per member, keyed by member id
+
+    first_action = {}
+    asns = {}
+
+    for change in changes:
+        first_action.setdefault(change["member_id"], change["action"])
+        asns[change["member_id"]] = change["asn"]
+
+    rows = {}
+
+    if first_action:
+        for row in ix.member_set.filter(id__in=list(first_action.keys())).values(
+            "id", *MEMBER_FIELDS
+        ):
+            rows[row["id"]] = row
+
+    added = []
+    changed = []
+    removed = []
+
+    for member_id, action in first_action.items():
+        row = rows.get(member_id)
+
+        if row is None:
+            if action != "add":
+                removed.append({"member_id": member_id, "asnum": asns[member_id]})
+            continue
+
+        entry = {
+            "member_id": member_id,
+            "asnum": row["asn"],
+            "member_type": row["ixf_member_type"],
+            "connection": renderer.connection(row),
+        }
+
+        if action == "add":
+            added.append(entry)
+        else:
+            changed.append(entry)
+
+    rv = {
+        "version": renderer.version,
+        "timestamp": format_timestamp(timestamp),
+        "ixp_list": renderer.ixp_list(ix),
+        "cursor": encode_cursor(cursor),
+        "more": more,
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+    }
+
+    return dumps(rv, pretty)
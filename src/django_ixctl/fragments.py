@@ -0,0 +1,159 @@
+"""
+Per-client fragments of generated bird route server configs
+
+arouteserver renders the complete config in one go. The bird config
+it renders has one section per client (AS-SET / R-SET functions,
+filters and the bgp protocol). These are split out of the generated
+config into one fragment per client asn, leaving a main file that
+includes them in their original place.
+
+Fragments are stored with a digest of their content, so a route
+server only needs to fetch the fragments that changed since its
+last update. The header line ixctl adds to generated configs holds
+the generation time, it is left out so the main file only changes
+with the config.
+
+See `RouteserverConfigFragment`.
+"""
+
+import hashlib
+import re
+
+# first line of a client section
+
+SECTION_START_RE = re.compile(r"^# AS-SET for AS(\d+)_\S+$")
+
+# bgp protocol of a client, the section ends with its closing brace
+
+PROTOCOL_RE = re.compile(r"^protocol bgp \S+ \{$")
+
+INCLUDE_RE = re.compile(r'^include "(?:.*/)?([^/"]+)\.conf";$')
+
+# header line ixctl starts generated configs with, see
+# `RouteserverConfig.run_arouteserver`
+
+HEADER_RE = re.compile(r"# generated by ixctl-\S* at \S+\n")
+
+MAIN = "main"
+
+
+def get_digest(body):
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def fragment_name(asn):
+    return f"AS{asn}"
+
+
+def fragment_filename(name, ip_version=4, split_ip_versions=False):
+    """
+    Returns the file name a fragment is included as
+
+    Route servers with a config per ip version (bird v1) get the
+    ip version in the file name of IPv6 fragments.
+    """
+
+    if split_ip_versions and ip_version == 6:
+        return f"{name}.ipv6.conf"
+    return f"{name}.conf"
+
+
+def split_config(body, include_dir, ip_version=4, split_ip_versions=False):
+    """
+    Splits a generated bird config into a main file and per client
+    fragments
+
+    The ixctl header line is left out of the main file.
+
+    Argument(s):
+
+    - body (`str`): generated config
+    - include_dir (`str`): directory the route server keeps fragments in
+
+    Keyword Argument(s):
+
+    - ip_version (`int`): ip version of the config
+    - split_ip_versions (`bool`): route server has a config per ip version
+
+    Returns:
+
+    - `dict` of fragment name to content, the main file is named "main"
+    - `None` if the config does not have the expected layout
+    """
+
+    header = HEADER_RE.match(body)
+    if header:
+        body = body[header.end() :]
+
+    main = []
+    fragments = {}
+
+    asn = None
+    name = None
+    in_protocol = False
+
+    # position in the main file after the most recent client section
+    section_end = 0
+
+    for line in body.splitlines(keepends=True):
+        stripped = line.rstrip("\n")
+
+        if asn is None:
+            match = SECTION_START_RE.match(stripped)
+            if not match:
+                main.append(line)
+                continue
+
+            asn = int(match.group(1))
+
+            if fragment_name(asn) not in fragments:
+                name = fragment_name(asn)
+                fragments[name] = []
+                filename = fragment_filename(name, ip_version, split_ip_versions)
+                main.append(f'include "{include_dir}/{filename}";\n')
+            elif fragment_name(asn) == name and not "".join(main[section_end:]).strip():
+                # next section of the same asn, the blank lines
+                # in between belong to the fragment
+                fragments[name].extend(main[section_end:])
+                del main[section_end:]
+            else:
+                # sections of an asn are not next to each other
+                return None
+
+        fragments[name].append(line)
+
+        if PROTOCOL_RE.match(stripped):
+            in_protocol = True
+        elif in_protocol and stripped == "}":
+            asn = None
+            in_protocol = False
+            section_end = len(main)
+
+    if asn is not None:
+        # client section did not end
+        return None
+
+    fragments = {name: "".join(lines) for name, lines in fragments.items()}
+    fragments[MAIN] = "".join(main)
+
+    return fragments
+
+
+def assemble(fragments):
+    """
+    Returns the complete config from fragments created by
+    `split_config`, replacing includes with the fragments
+    """
+
+    lines = []
+
+    for line in fragments[MAIN].splitlines(keepends=True):
+        match = INCLUDE_RE.match(line.rstrip("\n"))
+        if match:
+            name = match.group(1).split(".")[0]
+            if name in fragments:
+                lines.append(fragments[name])
+                continue
+        lines.append(line)
+
+    return "".join(lines)
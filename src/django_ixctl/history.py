@@ -0,0 +1,137 @@
+"""
+Compressed, delta based storage for route server config history
+
+Each history entry stores the generated config either in full or as
+a line based delta against the entry before it, compressed with zlib.
+A full entry is written every `IXCTL_RSCONF_HISTORY_FULL_INTERVAL`
+entries, so rebuilding a past version never has to apply more than
+that many deltas.
+
+See `RouteserverConfigHistory`.
+"""
+
+import difflib
+import json
+import zlib
+
+# config content kept in the history, `body` and `body6` are read from
+# the artifact store (see `RouteserverConfig.get_history_values`)
+
+FIELDS = ("body", "body6", "ars_general", "ars_clients")
+
+
+def compress(data):
+    """
+    Returns `dict` data json encoded and zlib compressed
+    """
+
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(bytes(data)).decode("utf-8"))
+
+
+def make_delta(old, new):
+    """
+    Returns the line based delta that turns `old` into `new`
+
+    The delta is a list of operations, `["=", start, end]` copies
+    lines `start` to `end` from the old text, `["+", lines]` inserts
+    new lines. Lines missing from the delta are removed.
+
+    Argument(s):
+
+    - old (`str`)
+    - new (`str`)
+
+    Returns:
+
+    - `list`
+    """
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+
+    # lines both versions start and end with are matched up front, so
+    # the (worst case quadratic) matcher only looks at the region that
+    # changed
+
+    start = 0
+    while (
+        start < len(old_lines)
+        and start < len(new_lines)
+        and old_lines[start] == new_lines[start]
+    ):
+        start += 1
+
+    old_end = len(old_lines)
+    new_end = len(new_lines)
+    while (
+        old_end > start
+        and new_end > start
+        and old_lines[old_end - 1] == new_lines[new_end - 1]
+    ):
+        old_end -= 1
+        new_end -= 1
+
+    delta = []
+
+    if start:
+        delta.append(["=", 0, start])
+
+    matcher = difflib.SequenceMatcher(
+        None, old_lines[start:old_end], new_lines[start:new_end]
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append(["=", start + i1, start + i2])
+        elif tag in ("replace", "insert"):
+            delta.append(["+", new_lines[start + j1 : start + j2]])
+
+    if old_end < len(old_lines):
+        delta.append(["=", old_end, len(old_lines)])
+
+    return delta
+
+
+def apply_delta(old, delta):
+    """
+    Returns the text a delta created by `make_delta` turns `old` into
+    """
+
+    old_lines = old.splitlines(keepends=True)
+
+    lines = []
+
+    for op in delta:
+        if op[0] == "=":
+            lines.extend(old_lines[op[1] : op[2]])
+        else:
+            lines.extend(op[1])
+
+    return "".join(lines)
+
+
+def make_field_deltas(old, new):
+    """
+    Returns the deltas for all history fields
+
+    Fields that are `None` in the new version are stored as `None`
+    """
+
+    return {
+        field: None
+        if new.get(field) is None
+        else make_delta(old.get(field) or "", new[field])
+        for field in FIELDS
+    }
+
+
+def apply_field_deltas(old, deltas):
+    return {
+        field: None
+        if deltas.get(field) is None
+        else apply_delta(old.get(field) or "", deltas[field])
+        for field in FIELDS
+    }
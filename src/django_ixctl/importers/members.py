@@ -0,0 +1,418 @@
+"""
+Bulk import of exchange members from ix-f json or csv files
+
+Files are parsed as a stream and validated against in-memory sets of
+the exchange's existing addresses, then members are created and updated
+in batches inside a single transaction.
+
+Bulk writes do not fire model signals, so the side effects normally
+handled there (ix-f export cache invalidation, member change log and
+route server config regeneration) are applied once per import instead.
+"""
+
+import csv
+import io
+import ipaddress
+import json
+import re
+
+import structlog
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from fullctl.django.inet.validators import validate_as_set
+
+import django_ixctl.enum
+import django_ixctl.exporters.ixf
+import django_ixctl.models as models
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = structlog.get_logger(__name__)
+
+FORMATS = ("csv", "ixf")
+
+# member fields that can be set through an import
+
+IMPORT_FIELDS = (
+    "asn",
+    "name",
+    "ipaddr4",
+    "ipaddr6",
+    "macaddr",
+    "speed",
+    "is_rs_peer",
+    "ixf_state",
+    "ixf_member_type",
+    "as_macro_override",
+)
+
+MACADDR_RE = re.compile(r"(?i)^([0-9a-f]{2}[-:]){5}[0-9a-f]{2}$")
+
+TRUE_VALUES = ("1", "true", "yes", "y")
+
+
+class MemberImportError(ValueError):
+    """
+    Raised when an import file does not validate
+
+    The `errors` attribute holds the list of error messages
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+def detect_format(filename):
+    """
+    Returns the import format for a file name, defaulting to csv
+    """
+
+    if filename and filename.lower().endswith(".json"):
+        return "ixf"
+    return "csv"
+
+
+def parse_csv(fileobj):
+    """
+    Yields member rows from a csv file with a header line naming
+    the member fields (see `IMPORT_FIELDS`)
+    """
+
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8-sig")
+
+    try:
+        for row in csv.DictReader(fileobj):
+            yield {
+                field: (row.get(field) or "").strip()
+                for field in IMPORT_FIELDS
+                if field in row
+            }
+    except csv.Error as exc:
+        raise ValueError(f"Invalid csv: {exc}")
+
+
+def iter_ixf_members(fileobj):
+    """
+    Yields the member entries of an ix-f json file
+
+    Uses `ijson` to parse incrementally if it is installed
+    """
+
+    if ijson:
+        try:
+            yield from ijson.items(fileobj, "member_list.item")
+        except ijson.JSONError as exc:
+            raise ValueError(f"Invalid json: {exc}")
+    else:
+        logger.warning("ijson is not installed, loading the whole ix-f file")
+        yield from json.load(fileobj).get("member_list", [])
+
+
+def parse_ixf(fileobj, ixp_id=None):
+    """
+    Yields member rows from an ix-f json file, one row for each
+    vlan of each connection
+
+    Keyword Argument(s):
+
+    - ixp_id (`int`): only import connections at this ix-f ixp id
+    """
+
+    for member in iter_ixf_members(fileobj):
+        for conn in member.get("connection_list", []):
+            if ixp_id is not None and conn.get("ixp_id") != ixp_id:
+                continue
+
+            if_list = conn.get("if_list") or [{}]
+
+            for vlan in conn.get("vlan_list", []):
+                ipv4 = vlan.get("ipv4") or {}
+                ipv6 = vlan.get("ipv6") or {}
+
+                row = {
+                    "asn": member.get("asnum"),
+                    "ixf_member_type": member.get("member_type") or "",
+                    "ixf_state": conn.get("state") or "",
+                    "speed": if_list[0].get("if_speed"),
+                    "ipaddr4": ipv4.get("address") or "",
+                    "ipaddr6": ipv6.get("address") or "",
+                    "is_rs_peer": bool(
+                        ipv4.get("routeserver") or ipv6.get("routeserver")
+                    ),
+                }
+
+                # fields older schema versions do not have are only
+                # set if the file provides them
+
+                if member.get("name"):
+                    row["name"] = member["name"]
+
+                mac_addresses = ipv4.get("mac_addresses") or ipv6.get("mac_addresses")
+                if mac_addresses:
+                    row["macaddr"] = mac_addresses[0]
+
+                as_macro = ipv4.get("as_macro") or ipv6.get("as_macro")
+                if as_macro:
+                    row["as_macro_override"] = as_macro
+
+                yield row
+
+
+def parse(fileobj, fmt="csv", ixp_id=None):
+    if fmt == "ixf":
+        return parse_ixf(fileobj, ixp_id=ixp_id)
+    if fmt == "csv":
+        return parse_csv(fileobj)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def clean_address(value, version):
+    if not value:
+        return None
+    address = ipaddress.ip_address(f"{value}".strip())
+    if address.version != version:
+        raise ValueError(f"Not an IPv{version} address: {value}")
+    return f"{address}"
+
+
+def clean_row(row):
+    """
+    Validates and normalizes a parsed member row
+
+    Fields missing from the row are left out, so updates only touch
+    the fields the import file provides.
+
+    Raises `ValueError` on invalid values
+    """
+
+    cleaned = {}
+
+    try:
+        cleaned["asn"] = int(row.get("asn") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid asn: {row.get('asn')}")
+    if cleaned["asn"] <= 0:
+        raise ValueError("asn required")
+
+    cleaned["ipaddr4"] = clean_address(row.get("ipaddr4"), 4)
+    cleaned["ipaddr6"] = clean_address(row.get("ipaddr6"), 6)
+
+    if not cleaned["ipaddr4"] and not cleaned["ipaddr6"]:
+        raise ValueError("Input required for IPv4 or IPv6")
+
+    if "speed" in row:
+        try:
+            cleaned["speed"] = int(row["speed"] or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid speed: {row['speed']}")
+
+    if "macaddr" in row:
+        macaddr = row["macaddr"] or None
+        if macaddr and not MACADDR_RE.match(macaddr):
+            raise ValueError(f"Invalid mac address: {macaddr}")
+        cleaned["macaddr"] = macaddr.lower().replace("-", ":") if macaddr else None
+
+    if "is_rs_peer" in row:
+        value = row["is_rs_peer"]
+        if isinstance(value, str):
+            value = value.lower() in TRUE_VALUES
+        cleaned["is_rs_peer"] = bool(value)
+
+    for field, choices in (
+        ("ixf_state", django_ixctl.enum.MEMBER_STATE),
+        ("ixf_member_type", django_ixctl.enum.IXF_MEMBER_TYPE),
+    ):
+        if row.get(field):
+            if row[field] not in dict(choices):
+                raise ValueError(f"Invalid {field}: {row[field]}")
+            cleaned[field] = row[field]
+
+    if "as_macro_override" in row:
+        as_macro = row["as_macro_override"] or None
+        if as_macro:
+            try:
+                validate_as_set(as_macro)
+            except ValidationError as exc:
+                raise ValueError("; ".join(exc.messages))
+        cleaned["as_macro_override"] = as_macro
+
+    if "name" in row:
+        cleaned["name"] = row["name"] or None
+
+    return cleaned
+
+
+def plan(ix, rows):
+    """
+    Validates parsed member rows against each other and the
+    existing members of the exchange
+
+    Existing members are matched by ip address. Uniqueness of ip and
+    mac addresses is checked in memory against sets of the addresses
+    of existing members and of previous rows.
+
+    Returns:
+
+    - `tuple` (`list` of new `InternetExchangeMember`, `list` of changed
+      `InternetExchangeMember`, `set` of changed field names)
+
+    Raises `MemberImportError` if any rows do not validate
+    """
+
+    existing = {}
+    owners = {}
+
+    for member in ix.member_set.all():
+        existing[member.id] = member
+        for field in ("ipaddr4", "ipaddr6", "macaddr"):
+            value = getattr(member, field)
+            if value:
+                owners[(field, f"{value}")] = member.id
+
+    errors = []
+    seen = set()
+    create = []
+    update = {}
+    changed_fields = set()
+
+    for line, row in enumerate(rows, start=1):
+        try:
+            cleaned = clean_row(row)
+        except ValueError as exc:
+            errors.append(f"Row {line}: {exc}")
+            continue
+
+        matches = {
+            owners.get((field, cleaned[field]))
+            for field in ("ipaddr4", "ipaddr6")
+            if cleaned[field]
+        }
+        matches.discard(None)
+
+        if len(matches) > 1:
+            errors.append(
+                f"Row {line}: IPv4 and IPv6 address belong to different members"
+            )
+            continue
+
+        member_id = matches.pop() if matches else None
+
+        row_errors = []
+        for field in ("ipaddr4", "ipaddr6", "macaddr"):
+            value = cleaned.get(field)
+            if not value:
+                continue
+            if (field, value) in seen:
+                row_errors.append(f"{field} {value} appears more than once")
+            owner = owners.get((field, value))
+            if owner and owner != member_id:
+                row_errors.append(f"{field} {value} exists already in this exchange")
+            seen.add((field, value))
+
+        if row_errors:
+            errors.extend(f"Row {line}: {error}" for error in row_errors)
+            continue
+
+        if member_id is None:
+            cleaned.setdefault("speed", 0)
+            create.append(models.InternetExchangeMember(ix=ix, **cleaned))
+            continue
+
+        member = existing[member_id]
+        for field, value in cleaned.items():
+            if f"{getattr(member, field) or ''}" != f"{value or ''}":
+                setattr(member, field, value)
+                changed_fields.add(field)
+                update[member.id] = member
+
+    if errors:
+        raise MemberImportError(errors)
+
+    return create, list(update.values()), changed_fields
+
+
+def import_members(ix, rows, max_members=None, batch_size=None):
+    """
+    Create and update members of an exchange from parsed member rows
+
+    All writes happen in a single transaction, nothing is written if
+    any row fails validation.
+
+    Argument(s):
+
+    - ix (`InternetExchange`)
+    - rows (`iterable` of `dict`): parsed member rows, see `parse`
+
+    Keyword Argument(s):
+
+    - max_members (`int`): member limit of the exchange
+    - batch_size (`int`): number of members written per query,
+      defaults to `IXCTL_MEMBER_IMPORT_BATCH_SIZE`
+
+    Returns:
+
+    - `dict` with `created` and `updated` member counts
+
+    Raises `MemberImportError` if the rows do not validate
+    """
+
+    if batch_size is None:
+        batch_size = settings.IXCTL_MEMBER_IMPORT_BATCH_SIZE
+
+    create, update, changed_fields = plan(ix, rows)
+
+    if max_members is not None:
+        num_members = ix.member_set.count() + len(create)
+        if num_members > max_members:
+            raise MemberImportError(
+                [
+                    f"Import exceeds the limit of allowed networks ({max_members})."
+                    " Please upgrade your ixCtl subscription to add"
+                    " additional networks."
+                ]
+            )
+
+    now = timezone.now()
+    for member in update:
+        member.updated = now
+
+    with transaction.atomic():
+        models.InternetExchangeMember.objects.bulk_create(create, batch_size=batch_size)
+
+        if update:
+            models.InternetExchangeMember.objects.bulk_update(
+                update, list(changed_fields) + ["updated"], batch_size=batch_size
+            )
+
+        models.InternetExchangeMemberChange.objects.bulk_create(
+            [
+                models.InternetExchangeMemberChange(
+                    ix=ix, member_id=member.id, asn=member.asn, action=action
+                )
+                for action, members in (("add", create), ("change", update))
+                for member in members
+            ],
+            batch_size=batch_size,
+        )
+
+    if create or update:
+        django_ixctl.exporters.ixf.invalidate(ix.id)
+        queue_routeserver_configs(ix)
+
+    return {"created": len(create), "updated": len(update)}
+
+
+def queue_routeserver_configs(ix):
+    """
+    Queue a config regeneration for each route server of the exchange
+    """
+
+    for routeserver in ix.rs_set.all():
+        routeserver.routeserver_config.queue_generate()
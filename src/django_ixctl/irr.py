@@ -0,0 +1,452 @@
+"""
+Local IRR data store fed from RPSL dump files
+
+as-set, route and route6 objects are imported from RPSL dumps
+(for example ripe.db.as-set.gz) into the database. AS-SET expansion
+and prefix lists are then resolved from the imported data and written
+to the arouteserver cache ahead of a run, so arouteserver does not
+have to query IRR through bgpq4.
+
+Enabled with `IXCTL_IRR_LOCAL`.
+"""
+
+import contextlib
+import gzip
+import ipaddress
+import json
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from pierky.arouteserver.config.validators import ValidatorPrefixListEntry
+from pierky.arouteserver.irrdb import ASSet, RSet
+
+import django_ixctl.models as models
+
+# rpsl object classes that are imported
+
+OBJECT_CLASSES = ("as-set", "route", "route6")
+
+ASN_RE = re.compile(r"(?i)^AS(\d+)$")
+
+
+def open_dump(path):
+    """
+    Opens an RPSL dump file for reading, gzip compressed files
+    are decompressed on the fly
+    """
+
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="latin-1")
+    return open(path, encoding="latin-1")
+
+
+def parse_rpsl(fileobj, object_classes=OBJECT_CLASSES):
+    """
+    Yields RPSL objects as (`str` object class, `dict` attributes)
+
+    Attribute values are lists of strings, since attributes can
+    repeat. Continuation lines are joined and end of line comments
+    are stripped.
+
+    Keyword Argument(s):
+
+    - object_classes (`tuple`): only yield objects of these classes
+    """
+
+    obj = []
+
+    def finish():
+        if not obj:
+            return None
+        object_class = obj[0][0]
+        if object_class not in object_classes:
+            return None
+        attrs = {}
+        for key, value in obj:
+            attrs.setdefault(key, []).append(value.strip())
+        return object_class, attrs
+
+    for line in fileobj:
+        line = line.rstrip("\n")
+
+        if not line.strip():
+            result = finish()
+            obj = []
+            if result:
+                yield result
+            continue
+
+        if line[0] in "%#":
+            continue
+
+        value = line.split("#", 1)[0]
+
+        if line[0] in " \t+":
+            # continuation of the previous attribute
+            if obj:
+                obj[-1] = (obj[-1][0], f"{obj[-1][1]} {value[1:].strip()}")
+            continue
+
+        key, sep, value = value.partition(":")
+        if not sep:
+            continue
+        obj.append((key.strip().lower(), value))
+
+    result = finish()
+    if result:
+        yield result
+
+
+def split_members(values):
+    return [
+        member.upper()
+        for value in values
+        for member in re.split(r"[,\s]+", value)
+        if member
+    ]
+
+
+def import_rpsl(fileobj, default_source=None, batch_size=None):
+    """
+    Import as-set, route and route6 objects from an RPSL dump
+
+    Objects of a source and object class present in the dump replace
+    the previously imported objects of the same source and class, so
+    split dumps (one file per object class) can be imported one after
+    another. Everything is written in a single transaction.
+
+    Argument(s):
+
+    - fileobj: file like object opened in text mode
+
+    Keyword Argument(s):
+
+    - default_source (`str`): source for objects without a `source`
+      attribute
+    - batch_size (`int`): number of objects written per query,
+      defaults to `IXCTL_IRR_IMPORT_BATCH_SIZE`
+
+    Returns:
+
+    - `dict` of imported object counts per object class
+    """
+
+    if batch_size is None:
+        batch_size = settings.IXCTL_IRR_IMPORT_BATCH_SIZE
+
+    sources = {}
+    replaced = set()
+    counts = {object_class: 0 for object_class in OBJECT_CLASSES}
+    as_sets = []
+    routes = []
+
+    def get_source(attrs):
+        name = (attrs.get("source") or [default_source or ""])[0].upper()
+        if not name:
+            raise ValueError("RPSL object without source, specify a default source")
+        if name not in sources:
+            sources[name], _ = models.IrrSource.objects.get_or_create(name=name)
+        return sources[name]
+
+    def replace(source, object_class):
+        # remove the objects imported previously for this source and class
+        if (source.id, object_class) in replaced:
+            return
+        replaced.add((source.id, object_class))
+        if object_class == "as-set":
+            source.as_set_set.all().delete()
+        else:
+            ip_version = 4 if object_class == "route" else 6
+            source.route_set.filter(ip_version=ip_version).delete()
+
+    def flush(force=False):
+        if force or len(as_sets) >= batch_size:
+            models.IrrAsSet.objects.bulk_create(as_sets)
+            as_sets.clear()
+        if force or len(routes) >= batch_size:
+            models.IrrRoute.objects.bulk_create(routes)
+            routes.clear()
+
+    with transaction.atomic():
+        for object_class, attrs in parse_rpsl(fileobj):
+            source = get_source(attrs)
+            replace(source, object_class)
+
+            try:
+                if object_class == "as-set":
+                    as_sets.append(
+                        models.IrrAsSet(
+                            source=source,
+                            name=attrs["as-set"][0].upper(),
+                            members=split_members(attrs.get("members", [])),
+                        )
+                    )
+                else:
+                    prefix = ipaddress.ip_network(attrs[object_class][0], strict=False)
+                    match = ASN_RE.match(attrs["origin"][0])
+                    if not match:
+                        continue
+                    routes.append(
+                        models.IrrRoute(
+                            source=source,
+                            prefix=prefix,
+                            origin=int(match.group(1)),
+                            ip_version=prefix.version,
+                        )
+                    )
+            except (KeyError, ValueError):
+                # skip malformed objects
+                continue
+
+            counts[object_class] += 1
+            flush()
+
+        flush(force=True)
+
+        now = timezone.now()
+        for source in sources.values():
+            source.imported = now
+            source.save(update_fields=["imported"])
+
+    return counts
+
+
+def get_serial():
+    """
+    Returns a value that changes whenever IRR data is imported
+    """
+
+    imported = (
+        models.IrrSource.objects.order_by("-imported")
+        .values_list("imported", flat=True)
+        .first()
+    )
+    return imported.isoformat() if imported else ""
+
+
+def strip_source(name):
+    """
+    Strips the "SOURCE::" prefix from an as-set name
+
+    Returns:
+
+    - `tuple` (`str` source or `None`, `str` name)
+    """
+
+    source, sep, name = name.upper().rpartition("::")
+    return (source or None), name
+
+
+class Resolver:
+    """
+    Resolves AS-SET bundles to asns and prefixes from the local
+    IRR store
+
+    Looked up as-sets and routes are kept on the instance, so resolving
+    many bundles only queries each as-set and origin asn once.
+    """
+
+    def __init__(self):
+        self.as_sets = {}
+        self.routes = {}
+
+    def load_as_sets(self, names):
+        """
+        Load the specified as-set objects, merging the members of
+        objects with the same name in different sources
+        """
+
+        names = {name for name in names if name not in self.as_sets}
+        if not names:
+            return
+
+        for name in names:
+            self.as_sets[name] = set()
+
+        for as_set in models.IrrAsSet.objects.filter(
+            name__in={strip_source(name)[1] for name in names}
+        ).select_related("source"):
+            for name in names:
+                source, as_set_name = strip_source(name)
+                if as_set_name != as_set.name:
+                    continue
+                if source and source != as_set.source.name:
+                    continue
+                self.as_sets[name].update(as_set.members)
+
+    def expand(self, object_names):
+        """
+        Returns the sorted list of asns the specified objects
+        (asns and as-sets) expand to
+
+        Nested as-sets are expanded one level at a time, with one
+        query per level.
+        """
+
+        asns = set()
+        seen = set()
+        pending = {name.upper() for name in object_names}
+
+        while pending:
+            as_set_names = set()
+
+            for name in pending:
+                seen.add(name)
+                match = ASN_RE.match(strip_source(name)[1])
+                if match:
+                    asns.add(int(match.group(1)))
+                else:
+                    as_set_names.add(name)
+
+            self.load_as_sets(as_set_names)
+
+            pending = {
+                member
+                for name in as_set_names
+                for member in self.as_sets[name]
+                if member not in seen
+            }
+
+        return sorted(asns)
+
+    def load_routes(self, asns):
+        asns = {asn for asn in asns if asn not in self.routes}
+        if not asns:
+            return
+
+        for asn in asns:
+            self.routes[asn] = set()
+
+        for origin, prefix in models.IrrRoute.objects.filter(
+            origin__in=asns
+        ).values_list("origin", "prefix"):
+            self.routes[origin].add(ipaddress.ip_network(f"{prefix}"))
+
+    def prefixes(self, asns, ip_version):
+        """
+        Returns the sorted list of prefixes originated by the specified
+        asns
+        """
+
+        self.load_routes(asns)
+
+        return sorted(
+            {
+                prefix
+                for asn in asns
+                for prefix in self.routes[asn]
+                if prefix.version == ip_version
+            }
+        )
+
+
+def get_bundles(ars_clients):
+    """
+    Returns the AS-SET bundles arouteserver expands for the clients
+    config, as lists of object names
+
+    Every client gets a bundle of its own asn and, if it has any,
+    a bundle of its as-sets.
+    """
+
+    bundles = []
+
+    for client in ars_clients.get("clients", []):
+        bundles.append([f"AS{client['asn']}"])
+        as_sets = (
+            client.get("cfg", {})
+            .get("filtering", {})
+            .get("irrdb", {})
+            .get("as_sets", [])
+        )
+        if as_sets:
+            bundles.append(list(as_sets))
+
+    return bundles
+
+
+def write_cache_file(cached_object, data):
+    """
+    Writes data to the arouteserver cache file of a cached object
+
+    The file is written to a temporary file first and moved into place,
+    so concurrent runs never read a partially written file.
+    """
+
+    path = cached_object._get_object_filepath()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"ts": int(time.time()), "data": data}, fh)
+        os.replace(tmp_path, path)
+    except Exception:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def seed_cache(cache_dir, ars_general, ars_clients):
+    """
+    Resolves the AS-SET bundles of an arouteserver config from the
+    local IRR store and writes them to the arouteserver cache
+
+    Argument(s):
+
+    - cache_dir (`str`): arouteserver cache directory
+    - ars_general (`dict`): general config, see `Routeserver.ars_general`
+    - ars_clients (`dict`): clients config, see `Routeserver.ars_clients`
+
+    Returns:
+
+    - `int`: number of seeded bundles
+    """
+
+    allow_longer_prefixes = (
+        ars_general.get("cfg", {})
+        .get("filtering", {})
+        .get("irrdb", {})
+        .get("allow_longer_prefixes", False)
+    )
+
+    resolver = Resolver()
+    seeded = set()
+
+    # arouteserver only needs the bgpq path to build the objects
+    kwargs = {"cache_dir": cache_dir, "bgpq3_path": "bgpq4"}
+
+    for object_names in get_bundles(ars_clients):
+        as_set = ASSet(object_names, **kwargs)
+        if as_set.id in seeded:
+            continue
+        seeded.add(as_set.id)
+
+        asns = resolver.expand(object_names)
+        write_cache_file(as_set, asns)
+
+        for ip_version in (4, 6):
+            write_cache_file(
+                RSet(object_names, ip_version, allow_longer_prefixes, **kwargs),
+                [
+                    ValidatorPrefixListEntry().validate(
+                        {
+                            "prefix": f"{prefix.network_address}",
+                            "length": prefix.prefixlen,
+                            "exact": not allow_longer_prefixes,
+                            "le": prefix.max_prefixlen
+                            if allow_longer_prefixes
+                            else None,
+                        }
+                    )
+                    for prefix in resolver.prefixes(asns, ip_version)
+                ],
+            )
+
+    return len(seeded)
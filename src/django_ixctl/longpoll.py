@@ -0,0 +1,134 @@
+"""
+Long-polling for route server config changes
+
+Route server agents wait for a new config with a request that is held
+until the config digest differs from the one the agent has, or until a
+timeout passes. The config is checked every
+`IXCTL_RSCONF_WAIT_INTERVAL` seconds, with the same single row query the
+plain config endpoint uses.
+
+Waiting requests occupy a worker thread each, so every process holds at
+most `IXCTL_RSCONF_WAIT_MAX_WAITERS` of them. Requests beyond that are
+refused instead of queued (see `WaitersFull`).
+"""
+
+import contextlib
+import threading
+import time
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_semaphore = None
+
+# suffixes the content encoding adds to the ETag of the plain config
+
+ENCODING_SUFFIXES = ("-gzip", "-br", "-zstd")
+
+
+class WaitersFull(Exception):
+    """
+    Raised when a process holds the max number of waiting requests
+    """
+
+
+def get_semaphore():
+    """
+    Returns the semaphore bounding the waiting requests of this process
+    """
+
+    global _semaphore
+
+    with _lock:
+        if _semaphore is None:
+            _semaphore = threading.BoundedSemaphore(
+                settings.IXCTL_RSCONF_WAIT_MAX_WAITERS
+            )
+        return _semaphore
+
+
+@contextlib.contextmanager
+def waiter():
+    """
+    Context manager holding a waiter slot of this process
+
+    Raises `WaitersFull` if no slot is free
+    """
+
+    semaphore = get_semaphore()
+
+    if not semaphore.acquire(blocking=False):
+        raise WaitersFull()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def get_timeout(requested=None):
+    """
+    Returns the number of seconds to wait, the requested timeout is
+    capped at `IXCTL_RSCONF_WAIT_TIMEOUT`
+
+    Raises `ValueError` if the requested timeout is invalid
+    """
+
+    timeout = settings.IXCTL_RSCONF_WAIT_TIMEOUT
+    if requested is None or requested == "":
+        return timeout
+
+    requested = float(requested)
+    # also rejects nan
+    if not requested >= 0:
+        raise ValueError("Timeout must not be negative")
+    return min(requested, timeout)
+
+
+def normalize_digest(value):
+    """
+    Returns the config digest of a digest or plain config ETag, as
+    agents may pass the ETag as they got it
+
+    Quotes, the weak `W/` prefix and content encoding suffixes are
+    removed.
+    """
+
+    value = value.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+
+    for suffix in ENCODING_SUFFIXES:
+        if value.endswith(suffix):
+            return value[: -len(suffix)]
+    return value
+
+
+def wait(get_state, digest, timeout):
+    """
+    Waits for the digest of a config to change
+
+    Argument(s):
+
+    - get_state (`callable`): returns the current state of the config,
+      a `dict` with at least a `digest` key
+    - digest (`str`): digest the caller has
+    - timeout (`float`): seconds to wait at most
+
+    Returns:
+
+    - `tuple` (`bool` changed, `dict` state)
+    """
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        state = get_state()
+        if state["digest"] != digest:
+            return True, state
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, state
+
+        time.sleep(min(settings.IXCTL_RSCONF_WAIT_INTERVAL, remaining))
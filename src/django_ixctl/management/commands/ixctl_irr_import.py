@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import django_ixctl.irr as irr
+
+
+class Command(BaseCommand):
+    """
+    Import as-set, route and route6 objects from RPSL dump files
+    into the local IRR store
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths", nargs="+", help="RPSL dump files, optionally gzip compressed"
+        )
+        parser.add_argument(
+            "--source",
+            help="IRR source for objects that do not specify one",
+        )
+
+    def handle(self, *args, **kwargs):
+        for path in kwargs["paths"]:
+            self.stdout.write(f"Importing IRR objects from {path}")
+
+            try:
+                with irr.open_dump(path) as fh:
+                    counts = irr.import_rpsl(fh, default_source=kwargs["source"])
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"{path}: {exc}")
+
+            self.stdout.write(
+                ", ".join(
+                    f"{count} {object_class}" for object_class, count in counts.items()
+                )
+            )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import django_ixctl.importers.members as importers
+from django_ixctl.models import InternetExchange
+
+
+class Command(BaseCommand):
+    """
+    Bulk import exchange members from an ix-f json or csv file
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("ix", help="internet exchange id", type=int)
+        parser.add_argument("path", help="ix-f json or csv file")
+        parser.add_argument(
+            "--format",
+            choices=importers.FORMATS,
+            help="file format, detected from the file name if not specified",
+        )
+        parser.add_argument(
+            "--ixp-id",
+            type=int,
+            help="only import connections at this ix-f ixp id (ix-f format only)",
+        )
+
+    def handle(self, *args, **kwargs):
+        try:
+            ix = InternetExchange.objects.get(id=kwargs["ix"])
+        except InternetExchange.DoesNotExist:
+            raise CommandError(f"Internet exchange {kwargs['ix']} does not exist")
+
+        fmt = kwargs["format"] or importers.detect_format(kwargs["path"])
+
+        self.stdout.write(f"Importing members into {ix} from {kwargs['path']}")
+
+        with open(kwargs["path"], "rb") as fh:
+            try:
+                result = importers.import_members(
+                    ix, importers.parse(fh, fmt, ixp_id=kwargs["ixp_id"])
+                )
+            except importers.MemberImportError as exc:
+                for error in exc.errors:
+                    self.stderr.write(error)
+                raise CommandError(f"{len(exc.errors)} rows failed validation")
+            except ValueError as exc:
+                raise CommandError(f"{exc}")
+
+        self.stdout.write(
+            f"Created {result['created']} and updated {result['updated']} members"
+        )
@@ -1,8 +1,42 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 
 from django_ixctl.models import Routeserver, RouteserverConfig
 
 
+def generate(routeserver_id, force=False):
+    """
+    Generate the config of a single route server
+
+    Runs in a worker process when the command is called with `--jobs`,
+    so it takes an id and loads the config through the worker's own
+    database connection.
+
+    Returns:
+
+    - `tuple` (`str` result or `None`, `str` error or `None`,
+      `float` duration in seconds)
+    """
+
+    start = time.perf_counter()
+
+    try:
+        routeserver_config = RouteserverConfig.objects.get(
+            routeserver_id=routeserver_id
+        )
+        result = routeserver_config.generate(force=force)
+        error = None
+    except Exception as exc:
+        result = None
+        error = f"{exc}".strip() or exc.__class__.__name__
+
+    return result, error, time.perf_counter() - start
+
+
 class Command(BaseCommand):
 
     """
@@ -14,9 +48,16 @@ class Command(BaseCommand):
         parser.add_argument(
             "--force", action="store_true", help="force regen of configs"
         )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="number of route server configs to generate in parallel",
+        )
 
     def handle(self, *args, **kwargs):
         force = kwargs["force"]
+        jobs = max(kwargs["jobs"], 1)
 
         if kwargs["only_id"]:
             pk = kwargs["only_id"]
@@ -26,11 +67,69 @@ class Command(BaseCommand):
         else:
             qset = Routeserver.objects.all()
 
-        for rs in qset:
-            routeserver_config, created = RouteserverConfig.objects.get_or_create(
-                routeserver=rs
+        # newly created configs always need to be generated
+
+        created = RouteserverConfig.create_missing(qset)
+
+        configs = RouteserverConfig.objects.filter(routeserver__in=qset)
+        if not force:
+            configs = RouteserverConfig.get_outdated(configs) | configs.filter(
+                id__in=[routeserver_config.id for routeserver_config in created]
+            )
+
+        routeservers = {
+            routeserver_config.routeserver_id: routeserver_config.routeserver
+            for routeserver_config in configs.select_related("routeserver").only(
+                "id", "routeserver"
             )
-            if force or created or rs.routeserver_config.outdated:
+        }
+
+        start = time.perf_counter()
+        failed = {}
+
+        for rs_id, (result, error, duration) in self.run(routeservers, force, jobs):
+            rs = routeservers[rs_id]
+            if error:
+                failed[rs] = error
+                self.stderr.write(f"Failed {rs} after {duration:.2f}s: {error}")
+            elif result == "no-op":
+                self.stdout.write(f"Inputs unchanged for {rs}, skipped")
+            else:
+                self.stdout.write(f"Regenerated {rs} in {duration:.2f}s")
+
+        self.stdout.write(
+            f"Processed {len(routeservers)} route servers in"
+            f" {time.perf_counter() - start:.2f}s, {len(failed)} failed"
+        )
+
+        if failed:
+            for rs, error in failed.items():
+                self.stderr.write(f"- {rs}: {error}")
+            raise CommandError(f"{len(failed)} route server config(s) failed")
+
+    def run(self, routeservers, force, jobs):
+        """
+        Yields (route server id, generate result) for each route server
+
+        Generates one after another if `jobs` is 1, otherwise in a pool
+        of `jobs` worker processes.
+        """
+
+        if jobs == 1:
+            for rs_id, rs in routeservers.items():
                 self.stdout.write(f"Regenerating {rs}")
-                rs.routeserver_config.generate()
-                self.stdout.write("Done")
+                yield rs_id, generate(rs_id, force)
+            return
+
+        # forked workers must not share the parent's database connection
+
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            futures = {
+                executor.submit(generate, rs_id, force): rs_id for rs_id in routeservers
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import django_ixctl.rpki as rpki
+
+
+class Command(BaseCommand):
+    """
+    Load a VRP export (rpki-client / RIPE validator json or csv)
+    as the new RPKI snapshot
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="VRP export file")
+        parser.add_argument(
+            "--format",
+            choices=rpki.FORMATS,
+            help="file format, detected from the file name if not specified",
+        )
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"Loading VRPs from {kwargs['path']}")
+
+        try:
+            snapshot = rpki.load_snapshot(kwargs["path"], fmt=kwargs["format"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"{exc}")
+
+        self.stdout.write(f"Loaded {snapshot.count} VRPs into snapshot {snapshot.id}")
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0017_internetexchangemember_port"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InternetExchangeMemberChange",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("member_id", models.PositiveIntegerField()),
+                ("asn", models.PositiveIntegerField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("add", "Added"),
+                            ("change", "Changed"),
+                            ("remove", "Removed"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "ix",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="member_change_set",
+                        to="django_ixctl.internetexchange",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Internet Exchange Member Change",
+                "verbose_name_plural": "Internet Exchange Member Changes",
+                "db_table": "ixctl_member_change",
+                "indexes": [
+                    models.Index(
+                        fields=["ix", "id"], name="ixctl_membe_ix_id_29e123_idx"
+                    ),
+                    models.Index(
+                        fields=["ix", "created"], name="ixctl_membe_ix_id_b2356f_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
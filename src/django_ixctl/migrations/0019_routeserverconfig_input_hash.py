@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0018_internetexchangememberchange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="input_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="Fingerprint of the arouteserver inputs of the last generation",
+                max_length=64,
+                null=True,
+            ),
+        ),
+    ]
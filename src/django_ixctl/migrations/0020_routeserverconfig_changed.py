@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0019_routeserverconfig_input_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="changed",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Time the config inputs were last reported as changed",
+                null=True,
+            ),
+        ),
+    ]
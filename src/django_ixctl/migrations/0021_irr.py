@@ -0,0 +1,117 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:25
+
+import django.core.validators
+import django.db.models.deletion
+import django_inet.models
+import netfields.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0020_routeserverconfig_changed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IrrSource",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                (
+                    "imported",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Time of the most recent import",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "IRR Source",
+                "verbose_name_plural": "IRR Sources",
+                "db_table": "ixctl_irr_source",
+            },
+        ),
+        migrations.CreateModel(
+            name="IrrRoute",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", netfields.fields.CidrAddressField(max_length=43)),
+                (
+                    "origin",
+                    django_inet.models.ASNField(
+                        validators=[django.core.validators.MinValueValidator(0)]
+                    ),
+                ),
+                ("ip_version", models.PositiveSmallIntegerField()),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="route_set",
+                        to="django_ixctl.irrsource",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "IRR Route",
+                "verbose_name_plural": "IRR Routes",
+                "db_table": "ixctl_irr_route",
+                "indexes": [
+                    models.Index(
+                        fields=["origin"], name="ixctl_irr_r_origin_2422fc_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="IrrAsSet",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("members", models.JSONField(default=list)),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="as_set_set",
+                        to="django_ixctl.irrsource",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "IRR AS-SET",
+                "verbose_name_plural": "IRR AS-SETs",
+                "db_table": "ixctl_irr_as_set",
+                "indexes": [
+                    models.Index(fields=["name"], name="ixctl_irr_a_name_6cc239_idx")
+                ],
+                "unique_together": {("source", "name")},
+            },
+        ),
+    ]
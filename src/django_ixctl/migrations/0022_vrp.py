@@ -0,0 +1,98 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:29
+
+import django.core.validators
+import django.db.models.deletion
+import django_inet.models
+import netfields.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0021_irr"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VrpSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "source",
+                    models.CharField(
+                        help_text="File the snapshot was loaded from", max_length=255
+                    ),
+                ),
+                (
+                    "buildtime",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Build time reported by the validator",
+                        null=True,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "VRP Snapshot",
+                "verbose_name_plural": "VRP Snapshots",
+                "db_table": "ixctl_vrp_snapshot",
+            },
+        ),
+        migrations.CreateModel(
+            name="Vrp",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "asn",
+                    django_inet.models.ASNField(
+                        validators=[django.core.validators.MinValueValidator(0)]
+                    ),
+                ),
+                ("prefix", netfields.fields.CidrAddressField(max_length=43)),
+                ("max_length", models.PositiveSmallIntegerField()),
+                ("ta", models.CharField(max_length=32)),
+                (
+                    "expires",
+                    models.PositiveIntegerField(
+                        blank=True, help_text="Expiry as unix timestamp", null=True
+                    ),
+                ),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vrp_set",
+                        to="django_ixctl.vrpsnapshot",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "VRP",
+                "verbose_name_plural": "VRPs",
+                "db_table": "ixctl_vrp",
+                "indexes": [
+                    models.Index(
+                        fields=["snapshot", "asn"], name="ixctl_vrp_snapsho_c8beef_idx"
+                    )
+                ],
+            },
+        ),
+    ]
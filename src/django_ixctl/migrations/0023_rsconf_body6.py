@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0022_vrp"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="body6",
+            field=models.TextField(
+                blank=True,
+                help_text="IPv6 config content, for route servers that need a config per ip version",
+                null=True,
+            ),
+        ),
+    ]
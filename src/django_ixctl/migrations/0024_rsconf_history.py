@@ -0,0 +1,62 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0023_rsconf_body6"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteserverConfigHistory",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("input_hash", models.CharField(blank=True, max_length=64, null=True)),
+                (
+                    "full",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Stores the complete config instead of a delta",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Uncompressed size of the config content"
+                    ),
+                ),
+                (
+                    "routeserver_config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="history_set",
+                        to="django_ixctl.routeserverconfig",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Routeserver Config History",
+                "verbose_name_plural": "Routeserver Config History",
+                "db_table": "ixctl_rsconf_history",
+                "indexes": [
+                    models.Index(
+                        fields=["routeserver_config", "full"],
+                        name="ixctl_rscon_routese_9b6eaa_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0024_rsconf_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteserverConfigFragment",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(help_text="main or AS{asn}", max_length=32)),
+                ("ip_version", models.PositiveSmallIntegerField(default=4)),
+                ("body", models.TextField()),
+                (
+                    "digest",
+                    models.CharField(help_text="sha256 of the content", max_length=64),
+                ),
+                (
+                    "updated",
+                    models.DateTimeField(help_text="Time the content last changed"),
+                ),
+                (
+                    "routeserver_config",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fragment_set",
+                        to="django_ixctl.routeserverconfig",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Routeserver Config Fragment",
+                "verbose_name_plural": "Routeserver Config Fragments",
+                "db_table": "ixctl_rsconf_fragment",
+                "unique_together": {("routeserver_config", "name", "ip_version")},
+            },
+        ),
+    ]
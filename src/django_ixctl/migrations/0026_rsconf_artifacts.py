@@ -0,0 +1,99 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+import django_ixctl.artifacts
+
+
+def move_to_artifacts(apps, schema_editor):
+    RouteserverConfig = apps.get_model("django_ixctl", "RouteserverConfig")
+
+    for rs_config in RouteserverConfig._default_manager.only(
+        "id", "body", "body6"
+    ).iterator():
+        fields = {}
+        if rs_config.body:
+            fields["body_digest"], fields["body_size"] = django_ixctl.artifacts.put(
+                rs_config.body
+            )
+        if rs_config.body6:
+            fields["body6_digest"], fields["body6_size"] = django_ixctl.artifacts.put(
+                rs_config.body6
+            )
+        if fields:
+            RouteserverConfig._default_manager.filter(id=rs_config.id).update(**fields)
+
+
+def move_from_artifacts(apps, schema_editor):
+    RouteserverConfig = apps.get_model("django_ixctl", "RouteserverConfig")
+
+    for rs_config in RouteserverConfig._default_manager.only(
+        "id", "body_digest", "body6_digest"
+    ).iterator():
+        fields = {}
+        if rs_config.body_digest:
+            fields["body"] = django_ixctl.artifacts.read(rs_config.body_digest)
+        if rs_config.body6_digest:
+            fields["body6"] = django_ixctl.artifacts.read(rs_config.body6_digest)
+        if fields:
+            RouteserverConfig._default_manager.filter(id=rs_config.id).update(**fields)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0025_rsconf_fragment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="body6_digest",
+            field=models.CharField(
+                blank=True,
+                help_text="sha256 of the IPv6 config content, for route servers that need a config per ip version",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="body6_size",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Size of the IPv6 config content in bytes",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="body_digest",
+            field=models.CharField(
+                blank=True,
+                help_text="sha256 of the config content",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="routeserverconfig",
+            name="body_size",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Size of the config content in bytes", null=True
+            ),
+        ),
+        migrations.RunPython(move_to_artifacts, move_from_artifacts),
+        # blank so the column can be added back when migrating backwards
+        migrations.AlterField(
+            model_name="routeserverconfig",
+            name="body",
+            field=models.TextField(blank=True, help_text="Config content"),
+        ),
+        migrations.RemoveField(
+            model_name="routeserverconfig",
+            name="body",
+        ),
+        migrations.RemoveField(
+            model_name="routeserverconfig",
+            name="body6",
+        ),
+    ]
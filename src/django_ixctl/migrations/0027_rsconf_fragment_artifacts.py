@@ -0,0 +1,52 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+import django_ixctl.artifacts
+
+
+def move_to_artifacts(apps, schema_editor):
+    RouteserverConfigFragment = apps.get_model(
+        "django_ixctl", "RouteserverConfigFragment"
+    )
+
+    # the fragment digest is the sha256 of its content, same as the
+    # artifact digest
+
+    for fragment in RouteserverConfigFragment._default_manager.only(
+        "id", "body"
+    ).iterator():
+        django_ixctl.artifacts.put(fragment.body)
+
+
+def move_from_artifacts(apps, schema_editor):
+    RouteserverConfigFragment = apps.get_model(
+        "django_ixctl", "RouteserverConfigFragment"
+    )
+
+    for fragment in RouteserverConfigFragment._default_manager.only(
+        "id", "digest"
+    ).iterator():
+        RouteserverConfigFragment._default_manager.filter(id=fragment.id).update(
+            body=django_ixctl.artifacts.read(fragment.digest)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_ixctl", "0026_rsconf_artifacts"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_artifacts, move_from_artifacts),
+        # blank so the column can be added back when migrating backwards
+        migrations.AlterField(
+            model_name="routeserverconfigfragment",
+            name="body",
+            field=models.TextField(blank=True),
+        ),
+        migrations.RemoveField(
+            model_name="routeserverconfigfragment",
+            name="body",
+        ),
+    ]
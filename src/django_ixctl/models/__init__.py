@@ -1,2 +1,4 @@
+from django_ixctl.models.irr import *  # noqa: F401, F403
 from django_ixctl.models.ixctl import *  # noqa: F401, F403
+from django_ixctl.models.rpki import *  # noqa: F401, F403
 from django_ixctl.models.tasks import *  # noqa: F401, F403
@@ -0,0 +1,72 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from django_inet.models import ASNField
+from netfields import CidrAddressField
+
+
+class IrrSource(models.Model):
+    """
+    An IRR database (RIPE, RADB, ..) imported from RPSL dump files
+
+    Tracks when objects of the source were last imported
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    imported = models.DateTimeField(
+        null=True, blank=True, help_text=_("Time of the most recent import")
+    )
+
+    class Meta:
+        db_table = "ixctl_irr_source"
+        verbose_name = _("IRR Source")
+        verbose_name_plural = _("IRR Sources")
+
+    def __str__(self):
+        return self.name
+
+
+class IrrAsSet(models.Model):
+    """
+    RPSL as-set object
+
+    Members are stored as listed in the object (asns and
+    nested as-sets), expansion happens at lookup time.
+    """
+
+    source = models.ForeignKey(
+        IrrSource, related_name="as_set_set", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+    members = models.JSONField(default=list)
+
+    class Meta:
+        db_table = "ixctl_irr_as_set"
+        verbose_name = _("IRR AS-SET")
+        verbose_name_plural = _("IRR AS-SETs")
+        unique_together = (("source", "name"),)
+        indexes = [models.Index(fields=["name"])]
+
+    def __str__(self):
+        return f"{self.source}::{self.name}"
+
+
+class IrrRoute(models.Model):
+    """
+    RPSL route or route6 object
+    """
+
+    source = models.ForeignKey(
+        IrrSource, related_name="route_set", on_delete=models.CASCADE
+    )
+    prefix = CidrAddressField()
+    origin = ASNField()
+    ip_version = models.PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = "ixctl_irr_route"
+        verbose_name = _("IRR Route")
+        verbose_name_plural = _("IRR Routes")
+        indexes = [models.Index(fields=["origin"])]
+
+    def __str__(self):
+        return f"{self.prefix} AS{self.origin}"
@@ -1,7 +1,7 @@
+import hashlib
 import os.path
 import re
-import subprocess
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from secrets import token_urlsafe
 
@@ -25,8 +25,10 @@ import structlog
 import yaml
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_grainy.decorators import grainy_model
 from django_inet.models import ASNField
@@ -34,10 +36,19 @@ from fullctl.django.fields.service_bridge import ReferencedObjectField
 from fullctl.django.inet.validators import validate_as_set
 from fullctl.django.models.abstract.base import HandleRefModel, PdbRefModel
 from fullctl.django.models.concrete import Instance, Organization
+from fullctl.django.models.concrete.tasks import TaskLimitError
 from netfields import InetAddressField, MACAddressField
+from pierky.arouteserver.version import __version__ as ARS_VERSION
 
+import django_ixctl.ars
+import django_ixctl.artifacts
 import django_ixctl.enum
+import django_ixctl.fragments
+import django_ixctl.history
+import django_ixctl.irr
 import django_ixctl.models.tasks
+import django_ixctl.rpki
+from django_ixctl.models.rpki import VrpSnapshot
 
 logger = structlog.get_logger(__name__)
 
@@ -82,7 +93,6 @@ class PermissionRequest(HandleRefModel):
     namespace="ix", namespace_instance="ix.{instance.org.permission_id}.{instance.id}"
 )
 class InternetExchange(PdbRefModel):
-
     """
     Describes an internet exchange
 
@@ -262,6 +272,142 @@ class InternetExchange(PdbRefModel):
     def org(self):
         return self.instance.org
 
+    def get_ars_rs_peers(self):
+        """
+        Returns a `list` of the exchange's rs peers with their networks
+        preloaded from the source of truth
+
+        Ordered so unchanged inputs always render the same config, see
+        `RouteserverConfig.get_input_hash`
+        """
+
+        return list(
+            InternetExchangeMember.preload_networks(
+                self.member_set.filter(is_rs_peer=True).order_by("id")
+            )
+        )
+
+    def get_ars_clients_key(self, rs_peers=None):
+        """
+        Returns the cache key of the arouteserver clients config for
+        the current state of the exchange's rs peers
+
+        The key is derived from the rs peer fields that end up in the
+        clients config, including the as-sets resolved from the source
+        of truth, so it changes whenever one of those changes.
+
+        Keyword Argument(s):
+
+        - rs_peers (`list`): rs peers as returned by `get_ars_rs_peers`,
+          loaded if not specified
+        """
+
+        if rs_peers is None:
+            rs_peers = self.get_ars_rs_peers()
+
+        digest = hashlib.sha256()
+        for member in rs_peers:
+            row = (
+                member.id,
+                member.asn,
+                member.ipaddr4,
+                member.ipaddr6,
+                member.md5,
+                member.as_sets,
+            )
+            digest.update(f"{row}".encode("utf-8"))
+            digest.update(b"\0")
+        return f"ixctl:ars_clients:{self.id}:{digest.hexdigest()}"
+
+    def build_ars_clients(self, rs_peers=None):
+        """
+        Generate and return `dict` for ARouteserver clients config
+
+        Keyword Argument(s):
+
+        - rs_peers (`list`): rs peers as returned by `get_ars_rs_peers`,
+          loaded if not specified
+        """
+
+        asns = []
+        asn_as_sets = {}
+        clients = {}
+
+        # TODO
+        # where to get ASN sets from ??
+        # peeringdb network ??
+
+        if rs_peers is None:
+            rs_peers = self.get_ars_rs_peers()
+
+        for member in rs_peers:
+            if member.asn not in asns:
+                asns.append(member.asn)
+            if member.asn not in clients:
+                clients[member.asn] = {"asn": member.asn, "ip": [], "cfg": {}}
+
+            if member.ipaddr4:
+                clients[member.asn]["ip"].append(f"{member.ipaddr4}")
+
+            if member.ipaddr6:
+                clients[member.asn]["ip"].append(f"{member.ipaddr6}")
+
+            if member.as_macro:
+                clients[member.asn]["cfg"].update(
+                    filtering={
+                        "irrdb": {
+                            "as_sets": member.as_sets,
+                        }
+                    }
+                )
+
+            if member.md5:
+                clients[member.asn]["password"] = f"{member.md5}"
+
+        # these aren't needed since they're already defined from SoT in the
+        # more specific members list
+        #
+        # if asns:
+        #     for net in pdbctl.Network().objects(asns=asns):
+        #         if net.irr_as_set:
+        #             asn_as_sets[f"AS{net.asn}"] = {
+        #                 "as_sets": get_as_set(net.irr_as_set)
+        #             }
+
+        return {"asns": asn_as_sets, "clients": list(clients.values())}
+
+    def get_ars_clients(self):
+        """
+        Returns the arouteserver clients config shared by all route
+        servers of the exchange
+
+        The config is built and dumped to yaml once and cached under
+        `get_ars_clients_key`, so route servers of the same exchange
+        reuse it. The rs peers and their networks are still loaded
+        for every call, since the key depends on their as-sets.
+
+        Returns:
+
+        - `dict` with `key` (`str`), `cfg` (`dict`) and `yaml` (`str`) keys
+        """
+
+        rs_peers = self.get_ars_rs_peers()
+        key = self.get_ars_clients_key(rs_peers)
+        ars_clients = cache.get(key)
+
+        if ars_clients is None:
+            cfg = self.build_ars_clients(rs_peers)
+            ars_clients = {
+                "key": key,
+                "cfg": cfg,
+                "yaml": yaml.dump(cfg, Dumper=Dumper),
+            }
+            cache.set(
+                key, ars_clients, timeout=settings.IXCTL_ARS_CLIENTS_CACHE_TIMEOUT
+            )
+
+        return ars_clients
+
     def __str__(self):
         return f"{self.name} ({self.id})"
 
@@ -303,7 +449,6 @@ class OrganizationDefaultExchange(models.Model):
     ),
 )
 class InternetExchangeMember(PdbRefModel):
-
     """
     Describes a member at an internet exchange
 
@@ -512,6 +657,59 @@ class InternetExchangeMember(PdbRefModel):
         return f"AS{self.asn} - {self.ipaddr4} - {self.ipaddr6} ({self.id})"
 
 
+class InternetExchangeMemberChange(models.Model):
+    """
+    Change log entry for an `InternetExchangeMember` write
+
+    One entry is written every time a member is added, changed or
+    removed. The log drives the incremental ix-f delta feed, so
+    polling for changes scales with the number of changes rather
+    than with the size of the exchange.
+
+    The member is referenced by id only, so entries outlive
+    the member they describe.
+    """
+
+    ix = models.ForeignKey(
+        InternetExchange,
+        related_name="member_change_set",
+        on_delete=models.CASCADE,
+    )
+    member_id = models.PositiveIntegerField()
+    asn = models.PositiveIntegerField()
+    action = models.CharField(
+        max_length=16, choices=django_ixctl.enum.MEMBER_CHANGE_ACTIONS
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "ixctl_member_change"
+        verbose_name = _("Internet Exchange Member Change")
+        verbose_name_plural = _("Internet Exchange Member Changes")
+        indexes = [
+            models.Index(fields=["ix", "id"]),
+            models.Index(fields=["ix", "created"]),
+        ]
+
+    @classmethod
+    def log(cls, member, action):
+        """
+        Write a change log entry for a member
+
+        Argument(s):
+
+        - member (`InternetExchangeMember`)
+        - action (`str`): one of "add", "change" or "remove"
+        """
+
+        return cls.objects.create(
+            ix_id=member.ix_id, member_id=member.id, asn=member.asn, action=action
+        )
+
+    def __str__(self):
+        return f"AS{self.asn} {self.action} ({self.member_id})"
+
+
 @reversion.register
 @grainy_model(
     namespace="rs",
@@ -520,7 +718,6 @@ class InternetExchangeMember(PdbRefModel):
     ),
 )
 class Routeserver(HandleRefModel):
-
     """
     Describes a routeserver at an internet exchange
     """
@@ -699,68 +896,43 @@ class Routeserver(HandleRefModel):
     @property
     def ars_clients(self):
         """
-        Generate and return `dict` for ARouteserver clients config
-        """
-
-        asns = []
-        asn_as_sets = {}
-        clients = {}
-
-        # TODO
-        # where to get ASN sets from ??
-        # peeringdb network ??
-        rs_peers = InternetExchangeMember.preload_networks(
-            self.ix.member_set.filter(is_rs_peer=True)
-        )
-
-        for member in rs_peers:
-            if member.asn not in asns:
-                asns.append(member.asn)
-            if member.asn not in clients:
-                clients[member.asn] = {"asn": member.asn, "ip": [], "cfg": {}}
-
-            if member.ipaddr4:
-                clients[member.asn]["ip"].append(f"{member.ipaddr4}")
+        Return `dict` for ARouteserver clients config
 
-            if member.ipaddr6:
-                clients[member.asn]["ip"].append(f"{member.ipaddr6}")
+        Shared by all route servers of the exchange, see
+        `InternetExchange.get_ars_clients`
+        """
 
-            if member.as_macro:
-                clients[member.asn]["cfg"].update(
-                    filtering={
-                        "irrdb": {
-                            "as_sets": member.as_sets,
-                        }
-                    }
-                )
+        return self.ix.get_ars_clients()["cfg"]
 
-            if member.md5:
-                clients[member.asn]["password"] = f"{member.md5}"
+    def __str__(self):
+        return f"Routeserver {self.name} AS{self.asn}"
 
-        # these aren't needed since they're already defined from SoT in the
-        # more specific members list
-        #
-        # if asns:
-        #     for net in pdbctl.Network().objects(asns=asns):
-        #         if net.irr_as_set:
-        #             asn_as_sets[f"AS{net.asn}"] = {
-        #                 "as_sets": get_as_set(net.irr_as_set)
-        #             }
 
-        return {"asns": asn_as_sets, "clients": list(clients.values())}
+# generated config content is kept by `RouteserverConfigHistory`
+# instead of being copied into every reversion version, reverting a
+# version leaves the config artifacts alone
 
-    def __str__(self):
-        return f"Routeserver {self.name} AS{self.asn}"
+RSCONF_CONTENT_FIELDS = (
+    "body_digest",
+    "body_size",
+    "body6_digest",
+    "body6_size",
+    "ars_general",
+    "ars_clients",
+)
 
 
-@reversion.register
+@reversion.register(exclude=RSCONF_CONTENT_FIELDS)
 class RouteserverConfig(HandleRefModel):
-
     """
     Describes a configuration (arouteserver generated) for a
     `Routeserver` instance
     """
 
+    # route server types that need a separate config for each ip
+    # version (bird v1)
+    SPLIT_IP_VERSIONS_ARS_TYPES = ("bird",)
+
     routeserver = models.OneToOneField(
         Routeserver,
         on_delete=models.CASCADE,
@@ -777,7 +949,32 @@ class RouteserverConfig(HandleRefModel):
     # i sort of want the `config` attribute to be
     # reserved for confu config fields though.
 
-    body = models.TextField(help_text=_("Config content"))
+    # config content is kept in the artifact store, see `body`
+
+    body_digest = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_("sha256 of the config content"),
+    )
+    body_size = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Size of the config content in bytes")
+    )
+
+    body6_digest = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_(
+            "sha256 of the IPv6 config content, for route servers that need"
+            " a config per ip version"
+        ),
+    )
+    body6_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text=_("Size of the IPv6 config content in bytes"),
+    )
 
     ars_general = models.TextField(
         help_text=("ARouteserver general config"), null=True, blank=True
@@ -790,6 +987,19 @@ class RouteserverConfig(HandleRefModel):
         help_text=("Routeserver response"), null=True, blank=True
     )
 
+    changed = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Time the config inputs were last reported as changed"),
+    )
+
+    input_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_("Fingerprint of the arouteserver inputs of the last generation"),
+    )
+
     task = models.ForeignKey(
         "django_ixctl.RsConfGenerate",
         on_delete=models.CASCADE,
@@ -807,6 +1017,67 @@ class RouteserverConfig(HandleRefModel):
     class Meta:
         db_table = "ixctl_rsconf"
 
+    @classmethod
+    def create_missing(cls, queryset=None):
+        """
+        Creates configs for route servers that do not have one yet
+
+        Keyword Argument(s):
+
+        - queryset (`Routeserver` queryset): limit to these route servers
+
+        Returns:
+
+        - `list` of created `RouteserverConfig`
+        """
+
+        if queryset is None:
+            queryset = Routeserver.objects.all()
+
+        return cls.objects.bulk_create(
+            [
+                cls(routeserver_id=routeserver_id)
+                for routeserver_id in queryset.filter(
+                    routeserverconfig__isnull=True
+                ).values_list("id", flat=True)
+            ]
+        )
+
+    @classmethod
+    def get_outdated(cls, queryset=None):
+        """
+        Returns a queryset of the configs that need to be regenerated
+
+        A config is outdated if its route server or any of the exchange's
+        rs peers have been updated since it was generated. The most
+        recent rs peer update is annotated as `last_member_update`.
+
+        Keyword Argument(s):
+
+        - queryset (`RouteserverConfig` queryset): limit to these configs
+        """
+
+        if queryset is None:
+            queryset = cls.objects.all()
+
+        last_member_update = (
+            InternetExchangeMember.objects.filter(
+                ix_id=models.OuterRef("routeserver__ix_id"), is_rs_peer=True
+            )
+            .order_by()
+            .values("ix_id")
+            .annotate(last_update=models.Max("updated"))
+            .values("last_update")
+        )
+
+        return queryset.annotate(
+            last_member_update=models.Subquery(last_member_update)
+        ).filter(
+            models.Q(generated__isnull=True)
+            | models.Q(generated__lt=models.F("routeserver__updated"))
+            | models.Q(generated__lt=models.F("last_member_update"))
+        )
+
     @property
     def outdated(self):
         """
@@ -820,94 +1091,800 @@ class RouteserverConfig(HandleRefModel):
 
         # RS Peer has been updated since last generation
 
-        for member in self.routeserver.ix.member_set.filter(is_rs_peer=True):
-            if self.generated < member.updated:
-                return True
+        if self.routeserver.ix.member_set.filter(
+            is_rs_peer=True, updated__gt=self.generated
+        ).exists():
+            return True
         return False
 
     def queue_generate(self):
         """
-        Queue task to regenerate config
-        """
-        self.task = django_ixctl.models.tasks.RsConfGenerate.create_task(self.id)
-        self.rs_response = {}
-        self.save()
+        Mark the config as changed and queue task to regenerate it
 
-    def generate(self):
-        """
-        Generate the route server config using arouteserver
+        The task waits for a quiet period (`IXCTL_RSCONF_QUIET_PERIOD`)
+        after the most recent change before it runs. Changes made while
+        a task is pending are coalesced into it, changes made while a
+        generation is running queue exactly one follow-up task.
+
+        Returns:
+
+        - `RsConfGenerate`: the pending task
         """
 
-        routeserver = self.routeserver
-        ars_general = routeserver.ars_general
-        ars_clients = routeserver.ars_clients
+        now = timezone.now()
 
-        config_dir = tempfile.mkdtemp(prefix="ixctl_routeserver_config")
+        # update the timestamp on its own so concurrent changes
+        # do not overwrite each other's config state
+        RouteserverConfig.objects.filter(id=self.id).update(changed=now)
+        self.changed = now
 
-        general_config_file = os.path.join(config_dir, "general.yaml")
-        clients_config_file = os.path.join(config_dir, "clients.yaml")
-        outfile = os.path.join(config_dir, "generated-config.txt")
+        try:
+            self.task = django_ixctl.models.tasks.RsConfGenerate.create_task(self.id)
+        except TaskLimitError:
+            # a pending task exists and will pick up this change
+            return django_ixctl.models.tasks.RsConfGenerate.objects.filter(
+                limit_id=self.id, status="pending"
+            ).first()
+
+        # only the queueing state, a generation that finished in the
+        # meantime must not be overwritten with this instance's config
+        self.rs_response = {}
+        self.save(update_fields=["task", "rs_response"])
+        return self.task
 
-        with open(general_config_file, "w") as fh:
-            as_yaml = yaml.dump(ars_general, Dumper=Dumper)
-            self.ars_general = as_yaml
-            fh.write(as_yaml)
+    @classmethod
+    def get_input_hash(
+        cls, ars_type, ars_general, ars_clients, irr_serial=None, vrp_serial=None
+    ):
+        """
+        Returns the fingerprint of the inputs of an arouteserver run
 
-        with open(clients_config_file, "w") as fh:
-            as_yaml = yaml.dump(ars_clients, Dumper=Dumper)
-            self.ars_clients = as_yaml
-            fh.write(as_yaml)
+        Argument(s):
 
-        # no reasonable way found to call an arouteserver
-        # python api - so lets just run the command
+        - ars_type (`str`): routeserver ars type
+        - ars_general (`str`): general config yaml
+        - ars_clients (`str`): clients config yaml
 
-        if routeserver.ars_type in ["bird", "bird2"]:
-            ars_type = "bird"
-        else:
-            ars_type = routeserver.ars_type
+        Keyword Argument(s):
 
-        cmd = [
-            "arouteserver",
-            ars_type,
-            "--general",
-            general_config_file,
-            "--clients",
-            clients_config_file,
-            "--use-local-files",
-            "logging",
-            "--local-files-dir",
-            "/srv/bird/etc",
-            "-o",
-            outfile,
-        ]
-        logger.debug(f"running command {cmd}")
+        - irr_serial (`str`): local IRR store serial, see
+          `django_ixctl.irr.get_serial`
+        - vrp_serial (`int`): id of the local VRP snapshot used
+        """
 
-        # TODO: bird v1 needs to generate
-        # separate for each ip version
-        #
-        # how to store?
+        values = [ARS_VERSION, ars_type, ars_general, ars_clients]
+        if irr_serial is not None:
+            values.append(irr_serial)
+        if vrp_serial is not None:
+            values.append(f"vrp:{vrp_serial}")
 
-        if routeserver.ars_type == "bird":
-            cmd += ["--ip-ver", "4"]
-        elif routeserver.ars_type == "bird2":
-            cmd += ["--target-version", "2.0.10"]
+        digest = hashlib.sha256()
+        for value in values:
+            digest.update(f"{value}".encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
 
-        process = subprocess.Popen(cmd, stderr=subprocess.PIPE)
-        _, err = process.communicate(timeout=600)
+    @property
+    def split_ip_versions(self):
+        """
+        Returns whether the route server needs a separate config
+        for each ip version (bird v1)
+        """
 
-        if process.returncode:
-            if err:
-                err = err.decode("utf-8")
-                raise OSError(err)
-            else:
-                raise OSError(f"Process returned {process.returncode}")
+        return self.routeserver.ars_type in self.SPLIT_IP_VERSIONS_ARS_TYPES
+
+    def read_artifact(self, digest):
+        """
+        Returns the content of an artifact, artifacts read once are
+        kept on the instance
+        """
+
+        if not digest:
+            return None
+
+        artifacts = self.__dict__.setdefault("_artifacts", {})
+        if digest not in artifacts:
+            artifacts[digest] = django_ixctl.artifacts.read(digest)
+        return artifacts[digest]
+
+    def write_artifact(self, content):
+        """
+        Stores content in the artifact store
+
+        Returns:
+
+        - `tuple` (`str` digest, `int` size), (`None`, `None`) if there
+          is no content
+        """
+
+        if not content:
+            return None, None
+
+        digest, size = django_ixctl.artifacts.put(content)
+        self.__dict__.setdefault("_artifacts", {})[digest] = content
+        return digest, size
+
+    @property
+    def body(self):
+        """
+        Config content, read from the artifact store
+        """
+
+        return self.read_artifact(self.body_digest) or ""
+
+    @body.setter
+    def body(self, content):
+        self.body_digest, self.body_size = self.write_artifact(content)
+
+    @property
+    def body6(self):
+        """
+        IPv6 config content for route servers that need a config per
+        ip version, read from the artifact store
+        """
+
+        return self.read_artifact(self.body6_digest)
+
+    @body6.setter
+    def body6(self, content):
+        self.body6_digest, self.body6_size = self.write_artifact(content)
+
+    def has_artifacts(self):
+        """
+        Returns whether the generated configs exist in the artifact
+        store, only checks for the files without reading them
+        """
+
+        digests = [self.body_digest]
+        if self.split_ip_versions:
+            digests.append(self.body6_digest)
+
+        try:
+            for digest in digests:
+                if not digest:
+                    return False
+                django_ixctl.artifacts.find(digest)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def get_history_values(self):
+        """
+        Returns the config content kept in the history, see
+        `django_ixctl.history.FIELDS`
+
+        Returns `None` if a generated config is missing from the
+        artifact store
+        """
+
+        try:
+            return {
+                field: getattr(self, field) for field in django_ixctl.history.FIELDS
+            }
+        except FileNotFoundError:
+            return None
+
+    def get_artifact(self, ip_version=None):
+        """
+        Returns the artifact of the config for an ip version
+
+        Route servers that do not need a config per ip version
+        return the same config for either version.
+
+        Keyword Argument(s):
+
+        - ip_version (`int`): 4 or 6, defaults to 4
+
+        Returns:
+
+        - `tuple` (`str` digest, `int` size), digest is `None` if the
+          config has not been generated
+        """
+
+        if ip_version == 6 and self.split_ip_versions:
+            return self.body6_digest, self.body6_size
+        return self.body_digest, self.body_size
+
+    def get_body(self, ip_version=None):
+        """
+        Returns the config content for an ip version, see `get_artifact`
+        """
+
+        digest, _ = self.get_artifact(ip_version)
+        return self.read_artifact(digest)
+
+    @classmethod
+    def get_artifact_state(cls, routeserver, ip_version=None):
+        """
+        Returns the artifact of a route server's config for an ip
+        version, see `get_artifact`
+
+        Only reads the generation time, route server type and artifact
+        columns, the config itself is not loaded.
+
+        Argument(s):
+
+        - routeserver (`dict`): lookup of the `Routeserver`
+
+        Keyword Argument(s):
+
+        - ip_version (`int`): 4 or 6, defaults to 4
+
+        Returns:
+
+        - `dict` with `generated`, `digest`, `size` and
+          `split_ip_versions` keys
+
+        Raises `RouteserverConfig.DoesNotExist` if the config does not
+        exist
+        """
+
+        lookup = {f"routeserver__{key}": value for key, value in routeserver.items()}
+
+        generated, ars_type, *artifacts = (
+            cls.objects.filter(**lookup)
+            .values_list(
+                "generated",
+                "routeserver__ars_type",
+                "body_digest",
+                "body_size",
+                "body6_digest",
+                "body6_size",
+            )
+            .get()
+        )
+
+        split_ip_versions = ars_type in cls.SPLIT_IP_VERSIONS_ARS_TYPES
+
+        if ip_version == 6 and split_ip_versions:
+            digest, size = artifacts[2:]
+        else:
+            digest, size = artifacts[:2]
+
+        return {
+            "generated": generated,
+            "digest": digest,
+            "size": size,
+            "split_ip_versions": split_ip_versions,
+        }
+
+    @classmethod
+    def remove_unused_artifacts(cls, now=None):
+        """
+        Removes artifacts that no config or config fragment refers to,
+        once they are older than `IXCTL_RSCONF_ARTIFACT_GRACE`
+
+        Artifacts stored by a generation that has not saved its config
+        yet are not old enough to be removed, see
+        `django_ixctl.artifacts.remove_stale`.
+
+        Keyword Argument(s):
+
+        - now (`float`): unix timestamp
+
+        Returns:
+
+        - `int`: number of removed artifacts
+        """
+
+        digests = set(django_ixctl.artifacts.iter_digests())
+
+        used = (
+            set(cls.objects.values_list("body_digest", flat=True))
+            | set(cls.objects.values_list("body6_digest", flat=True))
+            | set(RouteserverConfigFragment.objects.values_list("digest", flat=True))
+        )
+
+        removed = 0
+        for digest in digests - used:
+            if django_ixctl.artifacts.remove_stale(digest, now=now):
+                removed += 1
+        return removed
+
+    @classmethod
+    def maybe_remove_unused_artifacts(cls, now=None):
+        """
+        Removes unused artifacts if that was not done within the last
+        `IXCTL_RSCONF_ARTIFACT_GC_INTERVAL` seconds, see
+        `django_ixctl.artifacts.gc_due`
+
+        Keyword Argument(s):
+
+        - now (`float`): unix timestamp
+
+        Returns:
+
+        - `int`: number of removed artifacts, `None` if it was not due
+        """
+
+        if not django_ixctl.artifacts.gc_due(now):
+            return None
+
+        return cls.remove_unused_artifacts(now=now)
+
+    @classmethod
+    def run_arouteserver(
+        cls, ars_type, ars_general, ars_clients, config_dir, ip_version=4
+    ):
+        """
+        Runs arouteserver and returns the generated config
+
+        The shared arouteserver cache directory is passed along so
+        IRR lookups are reused across runs.
+
+        Argument(s):
+
+        - ars_type (`str`): routeserver ars type
+        - ars_general (`str`): general config yaml
+        - ars_clients (`str`): clients config yaml
+        - config_dir (`str`): directory for the input and output files
+          of this run
+
+        Keyword Argument(s):
+
+        - ip_version (`int`): ip version to generate the config for,
+          only used by bird v1
+
+        Returns:
+
+        - `str`: config body
+        """
+
+        general_config_file = os.path.join(config_dir, "general.yaml")
+        clients_config_file = os.path.join(config_dir, "clients.yaml")
+        outfile = os.path.join(config_dir, "generated-config.txt")
+
+        with open(general_config_file, "w") as fh:
+            fh.write(ars_general)
+
+        with open(clients_config_file, "w") as fh:
+            fh.write(ars_clients)
+
+        # no reasonable way found to call an arouteserver
+        # python api - so lets run the command, on the warm
+        # worker pool if enabled
+
+        cmd = [
+            "bird" if ars_type in ["bird", "bird2"] else ars_type,
+            "--general",
+            general_config_file,
+            "--clients",
+            clients_config_file,
+            "--cache-dir",
+            django_ixctl.ars.get_cache_dir(),
+            "--use-local-files",
+            "logging",
+            "--local-files-dir",
+            "/srv/bird/etc",
+            "-o",
+            outfile,
+        ]
+        if ars_type == "bird":
+            cmd += ["--ip-ver", f"{ip_version}"]
+        elif ars_type == "bird2":
+            cmd += ["--target-version", "2.0.10"]
+
+        logger.debug(f"running arouteserver {cmd}")
+
+        django_ixctl.ars.run(cmd)
 
         with open(outfile) as fh:
-            self.body = f"# generated by ixctl-{settings.PACKAGE_VERSION} at {datetime.now().isoformat()}\n"
-            self.body += fh.read()
+            body = f"# generated by ixctl-{settings.PACKAGE_VERSION} at {datetime.now().isoformat()}\n"
+            body += fh.read()
+
+        return body
+
+    @classmethod
+    def run_arouteserver_split(cls, ars_type, ars_general, ars_clients, config_dir):
+        """
+        Runs arouteserver for IPv4 and IPv6 at the same time
 
+        Each run gets its own directory below `config_dir`, both share
+        the arouteserver cache.
+
+        Returns:
+
+        - `tuple` (`str` IPv4 config body, `str` IPv6 config body)
+        """
+
+        def run(ip_version):
+            run_dir = os.path.join(config_dir, f"ipv{ip_version}")
+            os.makedirs(run_dir, exist_ok=True)
+            return cls.run_arouteserver(
+                ars_type, ars_general, ars_clients, run_dir, ip_version=ip_version
+            )
+
+        # the runs wait on arouteserver processes, so threads are enough
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return tuple(executor.map(run, (4, 6)))
+
+    def generate(self, force=False):
+        """
+        Generate the route server config using arouteserver
+
+        The arouteserver run is skipped if its inputs are unchanged
+        since the last generation.
+
+        If `IXCTL_IRR_LOCAL` is enabled, AS-SETs and prefix lists are
+        resolved from the local IRR store and seeded into the
+        arouteserver cache before the run.
+
+        If `IXCTL_VRP_LOCAL` is enabled and the config needs ROAs, the
+        most recent VRP snapshot is written to the arouteserver cache.
+
+        Route servers that need a config per ip version (bird v1) get
+        the IPv4 and IPv6 configs generated by two concurrent
+        arouteserver runs, stored in `body` and `body6`.
+
+        Keyword Argument(s):
+
+        - force (`bool`): run arouteserver even if the inputs are unchanged
+
+        Returns:
+
+        - `str`: "generated" or "no-op" if the run was skipped
+        """
+
+        routeserver = self.routeserver
+        irr_local = settings.IXCTL_IRR_LOCAL
+
+        ars_general_cfg = routeserver.ars_general
+        ars_general = yaml.dump(ars_general_cfg, Dumper=Dumper)
+
+        # built once for all route servers of the exchange
+        shared_clients = routeserver.ix.get_ars_clients()
+        ars_clients_cfg = shared_clients["cfg"]
+        ars_clients = shared_clients["yaml"]
+
+        vrp_snapshot = None
+        if settings.IXCTL_VRP_LOCAL and django_ixctl.rpki.rpki_roas_needed(
+            ars_general_cfg
+        ):
+            vrp_snapshot = VrpSnapshot.get_latest()
+
+        input_hash = self.get_input_hash(
+            routeserver.ars_type,
+            ars_general,
+            ars_clients,
+            irr_serial=django_ixctl.irr.get_serial() if irr_local else None,
+            vrp_serial=vrp_snapshot.id if vrp_snapshot else None,
+        )
+
+        split_ip_versions = self.split_ip_versions
+
+        if not force and self.input_hash == input_hash and self.has_artifacts():
+            logger.debug(f"inputs unchanged for {routeserver}, skipping generation")
+            # bump the generation time so the config is no longer outdated
+            self.save(update_fields=["generated"])
+            return "no-op"
+
+        self.ars_general = ars_general
+        self.ars_clients = ars_clients
+
+        # the history stores the new version as a delta against this one
+        previous = self.get_history_values()
+        if previous is not None:
+            previous["input_hash"] = self.input_hash
+
+        with django_ixctl.ars.workspace() as config_dir:
+            if irr_local:
+                django_ixctl.irr.seed_cache(
+                    django_ixctl.ars.get_cache_dir(), ars_general_cfg, ars_clients_cfg
+                )
+
+            if vrp_snapshot:
+                django_ixctl.rpki.seed_cache(
+                    django_ixctl.ars.get_cache_dir(), vrp_snapshot
+                )
+
+            if split_ip_versions:
+                self.body, self.body6 = self.run_arouteserver_split(
+                    routeserver.ars_type, ars_general, ars_clients, config_dir
+                )
+            else:
+                self.body = self.run_arouteserver(
+                    routeserver.ars_type, ars_general, ars_clients, config_dir
+                )
+                self.body6 = None
+
+        self.input_hash = input_hash
         self.save()
 
+        RouteserverConfigHistory.record(self, previous=previous)
+        RouteserverConfigFragment.update_fragments(self)
+
+        self.maybe_remove_unused_artifacts()
+
+        return "generated"
+
+
+class RouteserverConfigHistory(models.Model):
+    """
+    A past version of a generated `RouteserverConfig`
+
+    Stores the config either in full or as a delta against the
+    previous version, compressed, see `django_ixctl.history`
+    """
+
+    routeserver_config = models.ForeignKey(
+        RouteserverConfig, related_name="history_set", on_delete=models.CASCADE
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    input_hash = models.CharField(max_length=64, null=True, blank=True)
+    full = models.BooleanField(
+        default=False,
+        help_text=_("Stores the complete config instead of a delta"),
+    )
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(
+        default=0, help_text=_("Uncompressed size of the config content")
+    )
+
+    class Meta:
+        db_table = "ixctl_rsconf_history"
+        verbose_name = _("Routeserver Config History")
+        verbose_name_plural = _("Routeserver Config History")
+        indexes = [models.Index(fields=["routeserver_config", "full"])]
+
+    @classmethod
+    def record(cls, routeserver_config, previous=None):
+        """
+        Adds the current version of a config to its history
+
+        Writes a full entry every `IXCTL_RSCONF_HISTORY_FULL_INTERVAL`
+        entries, a delta otherwise, then removes entries beyond
+        `IXCTL_RSCONF_HISTORY_KEEP`.
+
+        Keyword Argument(s):
+
+        - previous (`dict`): content of the version before this one
+          and its `input_hash`, as the generation still has it. Deltas
+          are made against it instead of rebuilding the previous
+          version from the history.
+
+        Returns:
+
+        - `RouteserverConfigHistory`
+        """
+
+        values = routeserver_config.get_history_values()
+
+        history = routeserver_config.history_set.order_by("-id")
+        last = history.first()
+        last_full = history.filter(full=True).first()
+
+        full = (
+            last is None
+            or last_full is None
+            or history.filter(id__gt=last_full.id).count() + 1
+            >= settings.IXCTL_RSCONF_HISTORY_FULL_INTERVAL
+        )
+
+        if full:
+            data = values
+        else:
+            # the version passed in is only used if it is the one the
+            # most recent entry recorded
+            if previous is None or previous["input_hash"] != last.input_hash:
+                previous = last.rebuild()
+            data = django_ixctl.history.make_field_deltas(previous, values)
+
+        entry = cls.objects.create(
+            routeserver_config=routeserver_config,
+            input_hash=routeserver_config.input_hash,
+            full=full,
+            data=django_ixctl.history.compress(data),
+            size=sum(len((value or "").encode("utf-8")) for value in values.values()),
+        )
+
+        cls.prune(routeserver_config)
+
+        return entry
+
+    @classmethod
+    def prune(cls, routeserver_config, keep=None):
+        """
+        Removes history entries beyond the most recent `keep` ones
+
+        Entries older than that are kept if a newer kept delta still
+        depends on them.
+
+        Keyword Argument(s):
+
+        - keep (`int`): defaults to `IXCTL_RSCONF_HISTORY_KEEP`
+
+        Returns:
+
+        - `int`: number of removed entries
+        """
+
+        if keep is None:
+            keep = settings.IXCTL_RSCONF_HISTORY_KEEP
+
+        history = routeserver_config.history_set.order_by("-id")
+
+        oldest_kept = history.values_list("id", flat=True)[keep - 1 : keep].first()
+        if oldest_kept is None:
+            return 0
+
+        base = history.filter(full=True, id__lte=oldest_kept).first()
+        if base is None:
+            return 0
+
+        deleted, _ = history.filter(id__lt=base.id).delete()
+        return deleted
+
+    def rebuild(self):
+        """
+        Rebuilds the config of this version from the most recent full
+        entry and the deltas after it
+
+        Returns:
+
+        - `dict` of `body`, `body6`, `ars_general` and `ars_clients`
+        """
+
+        chain = list(
+            self.routeserver_config.history_set.filter(
+                id__gte=models.Subquery(
+                    self.routeserver_config.history_set.filter(
+                        full=True, id__lte=self.id
+                    )
+                    .order_by("-id")
+                    .values("id")[:1]
+                ),
+                id__lte=self.id,
+            )
+            .order_by("id")
+            .values_list("data", flat=True)
+        )
+
+        if not chain:
+            raise ValueError(f"No full history entry found for {self}")
+
+        values = django_ixctl.history.decompress(chain[0])
+        for data in chain[1:]:
+            values = django_ixctl.history.apply_field_deltas(
+                values, django_ixctl.history.decompress(data)
+            )
+
+        return values
+
+    def __str__(self):
+        return f"{self.routeserver_config_id} {self.created}"
+
+
+class RouteserverConfigFragment(models.Model):
+    """
+    Part of a generated bird `RouteserverConfig`, either the config
+    section of a single client asn or the main file including them
+
+    Like the configs, the content is kept in the artifact store under
+    its digest.
+
+    See `django_ixctl.fragments`
+    """
+
+    routeserver_config = models.ForeignKey(
+        RouteserverConfig, related_name="fragment_set", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=32, help_text=_("main or AS{asn}"))
+    ip_version = models.PositiveSmallIntegerField(default=4)
+    digest = models.CharField(max_length=64, help_text=_("sha256 of the content"))
+    updated = models.DateTimeField(help_text=_("Time the content last changed"))
+
+    class Meta:
+        db_table = "ixctl_rsconf_fragment"
+        verbose_name = _("Routeserver Config Fragment")
+        verbose_name_plural = _("Routeserver Config Fragments")
+        unique_together = (("routeserver_config", "name", "ip_version"),)
+
+    @property
+    def body(self):
+        """
+        Fragment content, read from the artifact store
+        """
+
+        return django_ixctl.artifacts.read(self.digest)
+
+    @property
+    def filename(self):
+        return django_ixctl.fragments.fragment_filename(
+            self.name,
+            self.ip_version,
+            self.routeserver_config.split_ip_versions,
+        )
+
+    @classmethod
+    def update_fragments(cls, routeserver_config):
+        """
+        Splits the generated configs of a route server config into
+        fragments and stores the fragments whose content changed
+
+        Fragments of clients that are gone are removed. Route servers
+        that are not running bird have no fragments.
+
+        Returns:
+
+        - `int`: number of created, changed or removed fragments
+        """
+
+        split_ip_versions = routeserver_config.split_ip_versions
+        fragments = {}
+
+        if routeserver_config.routeserver.ars_type in ("bird", "bird2"):
+            for ip_version, body in (
+                (4, routeserver_config.body),
+                (6, routeserver_config.body6),
+            ):
+                if not body:
+                    continue
+
+                parts = django_ixctl.fragments.split_config(
+                    body,
+                    settings.IXCTL_RSCONF_FRAGMENT_DIR,
+                    ip_version=ip_version,
+                    split_ip_versions=split_ip_versions,
+                )
+
+                if parts is None:
+                    logger.warning(
+                        f"could not split config of {routeserver_config.routeserver}"
+                        " into fragments"
+                    )
+                    fragments = {}
+                    break
+
+                for name, content in parts.items():
+                    fragments[(name, ip_version)] = content
+
+        existing = {
+            (fragment.name, fragment.ip_version): fragment
+            for fragment in routeserver_config.fragment_set.only(
+                "id", "name", "ip_version", "digest"
+            )
+        }
+
+        now = timezone.now()
+        created = []
+        changed = []
+
+        for (name, ip_version), content in fragments.items():
+            digest = django_ixctl.fragments.get_digest(content)
+            fragment = existing.get((name, ip_version))
+
+            if fragment is not None and fragment.digest == digest:
+                continue
+
+            django_ixctl.artifacts.put(content)
+
+            if fragment is None:
+                created.append(
+                    cls(
+                        routeserver_config=routeserver_config,
+                        name=name,
+                        ip_version=ip_version,
+                        digest=digest,
+                        updated=now,
+                    )
+                )
+            else:
+                fragment.digest = digest
+                fragment.updated = now
+                changed.append(fragment)
+
+        removed = [
+            fragment.id for key, fragment in existing.items() if key not in fragments
+        ]
+
+        cls.objects.bulk_create(created)
+        cls.objects.bulk_update(changed, ["digest", "updated"])
+        cls.objects.filter(id__in=removed).delete()
+
+        return len(created) + len(changed) + len(removed)
+
 
 @reversion.register()
 @grainy_model(
@@ -915,7 +1892,6 @@ class RouteserverConfig(HandleRefModel):
     namespace_instance="net.{instance.org.permission_id}.{instance.asn}",
 )
 class Network(PdbRefModel):
-
     """
     Describes a network
 
@@ -0,0 +1,59 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from django_inet.models import ASNField
+from netfields import CidrAddressField
+
+
+class VrpSnapshot(models.Model):
+    """
+    A set of validated ROA payloads (VRPs) loaded from a validator export
+
+    Route server config generation uses the most recent snapshot
+    """
+
+    created = models.DateTimeField(auto_now_add=True)
+    source = models.CharField(
+        max_length=255, help_text=_("File the snapshot was loaded from")
+    )
+    buildtime = models.DateTimeField(
+        null=True, blank=True, help_text=_("Build time reported by the validator")
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "ixctl_vrp_snapshot"
+        verbose_name = _("VRP Snapshot")
+        verbose_name_plural = _("VRP Snapshots")
+
+    @classmethod
+    def get_latest(cls):
+        return cls.objects.order_by("-id").first()
+
+    def __str__(self):
+        return f"VRP snapshot {self.id} ({self.count} VRPs)"
+
+
+class Vrp(models.Model):
+    """
+    Validated ROA payload
+    """
+
+    snapshot = models.ForeignKey(
+        VrpSnapshot, related_name="vrp_set", on_delete=models.CASCADE
+    )
+    asn = ASNField()
+    prefix = CidrAddressField()
+    max_length = models.PositiveSmallIntegerField()
+    ta = models.CharField(max_length=32)
+    expires = models.PositiveIntegerField(
+        null=True, blank=True, help_text=_("Expiry as unix timestamp")
+    )
+
+    class Meta:
+        db_table = "ixctl_vrp"
+        verbose_name = _("VRP")
+        verbose_name_plural = _("VRPs")
+        indexes = [models.Index(fields=["snapshot", "asn"])]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.max_length} AS{self.asn}"
@@ -1,9 +1,52 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from fullctl.django.models import Task
+from fullctl.django.models.concrete.tasks import TaskLimitError
 from fullctl.django.tasks import register
+from fullctl.django.tasks.qualifiers import Base
 
 import django_ixctl.models.ixctl as models
 
 
+class QuietPeriod(Base):
+
+    """
+    Qualifies a routeserver config generation task once its config
+    has not changed for `IXCTL_RSCONF_QUIET_PERIOD` seconds and no
+    other generation of the config is running
+    """
+
+    def __str__(self):
+        return f"{self.__class__.__name__}"
+
+    def ids(self, task):
+        return {"limit_id": task.limit_id}
+
+    def check(self, task):
+        if (
+            task.__class__.objects.filter(
+                op=task.op, limit_id=task.limit_id, status="running"
+            )
+            .exclude(id=task.id)
+            .exists()
+        ):
+            return False
+
+        changed = (
+            models.RouteserverConfig.objects.filter(id=task.param["args"][0])
+            .values_list("changed", flat=True)
+            .first()
+        )
+
+        if not changed:
+            return True
+
+        quiet_period = timedelta(seconds=settings.IXCTL_RSCONF_QUIET_PERIOD)
+        return timezone.now() - changed >= quiet_period
+
+
 @register
 class RsConfGenerate(Task):
 
@@ -17,9 +60,10 @@ class RsConfGenerate(Task):
     """
 
     class TaskMeta:
-        # limit of 1, but this will be per rs
-        # see generate_limit_id below
+        # limit of 1 pending task, but this will be per rs
+        # see generate_limit_id and validate_limits below
         limit = 1
+        qualifiers = [QuietPeriod()]
 
     class Meta:
         proxy = True
@@ -35,6 +79,19 @@ class RsConfGenerate(Task):
         """
         return self.param["args"][0]
 
+    def validate_limits(self):
+        """
+        Only pending tasks count towards the limit, so a change made
+        while a generation is running can queue a follow-up task
+        """
+
+        count = self._meta.model.objects.filter(
+            op=self.HandleRef.tag, limit_id=self.generate_limit_id, status="pending"
+        ).count()
+
+        if self.limit <= count:
+            raise TaskLimitError(self)
+
     def run(self, routeserver_config_id, *args, **kwargs):
         """
         Regenerate the routeserver_config
@@ -42,4 +99,4 @@ class RsConfGenerate(Task):
         routeserver_config = models.RouteserverConfig.objects.get(
             id=routeserver_config_id
         )
-        routeserver_config.generate()
+        return routeserver_config.generate()
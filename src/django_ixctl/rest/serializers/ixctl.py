@@ -318,6 +318,45 @@ class RouteserverConfig(ModelSerializer):
             "routeserver",
             "generated",
             "body",
+            "body6",
+            "body_digest",
+            "body_size",
+            "body6_digest",
+            "body6_size",
+        ]
+
+
+@register
+class RouteserverConfigOutdated(ModelSerializer):
+    ref_tag = "rsconf_outdated"
+
+    name = serializers.CharField(source="routeserver.name", read_only=True)
+    last_member_update = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = models.RouteserverConfig
+        fields = [
+            "routeserver",
+            "name",
+            "generated",
+            "last_member_update",
+        ]
+
+
+@register
+class RouteserverConfigFragment(ModelSerializer):
+    ref_tag = "rsconf_fragment"
+
+    filename = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = models.RouteserverConfigFragment
+        fields = [
+            "name",
+            "ip_version",
+            "filename",
+            "digest",
+            "updated",
         ]
 
 
@@ -1,8 +1,16 @@
+from calendar import timegm
+
 import fullctl.service_bridge.aaactl as aaactl
 import fullctl.service_bridge.pdbctl as pdbctl
 from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
+from fullctl.django.auditlog import Context as AuditLogContext
 from fullctl.django.auditlog import auditlog
+from fullctl.django.inet.util import get_client_ip
 from fullctl.django.rest.api_schema import PeeringDBImportSchema
 from fullctl.django.rest.core import BadRequest
 from fullctl.django.rest.decorators import load_object
@@ -13,11 +21,15 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+import django_ixctl.artifacts
+import django_ixctl.importers.members as importers
+import django_ixctl.longpoll
 import django_ixctl.models as models
 import django_ixctl.rest.filters as filters
 from django_ixctl.rest.decorators import grainy_endpoint
 from django_ixctl.rest.route.ixctl import route
 from django_ixctl.rest.serializers.ixctl import Serializers
+from django_ixctl.util import select_content_encoding
 
 
 class IxOrgQuerysetMixin:
@@ -301,6 +313,69 @@ class Member(CachedObjectMixin, IxOrgQuerysetMixin, viewsets.GenericViewSet):
 
         return Response(serializer.data)
 
+    @action(detail=False, methods=["POST"])
+    @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
+    @grainy_endpoint(
+        namespace="member.{request.org.permission_id}.{ix.pk}",
+    )
+    def bulk_import(self, request, org, instance, ix, *args, **kwargs):
+        """
+        Create and update members from an uploaded ix-f json or csv file
+
+        Existing members are matched by ip address. Nothing is written
+        if any row fails validation.
+
+        ix-f files listing several exchanges import the connections of
+        the exchange specified with `ixp_id` only.
+        """
+
+        upload = request.FILES.get("file")
+
+        if not upload:
+            return BadRequest({"file": ["Import file required"]})
+
+        fmt = request.data.get("format") or importers.detect_format(upload.name)
+
+        if fmt not in importers.FORMATS:
+            return BadRequest({"format": [f"Unsupported import format: {fmt}"]})
+
+        ixp_id = request.data.get("ixp_id")
+        if ixp_id in (None, ""):
+            ixp_id = None
+        else:
+            try:
+                ixp_id = int(ixp_id)
+            except ValueError:
+                return BadRequest({"ixp_id": ["Must be an integer"]})
+
+        # retrieve max. memmbers count according
+        # to active ixctl plan for org, once for the whole import
+
+        max_members = aaactl.OrganizationProduct().get_product_property(
+            "ixctl", org.slug, "members", component_object_id=ix.id
+        )
+
+        try:
+            result = importers.import_members(
+                ix, importers.parse(upload, fmt, ixp_id=ixp_id), max_members=max_members
+            )
+        except importers.MemberImportError as exc:
+            return BadRequest({"non_field_errors": exc.errors})
+        except ValueError as exc:
+            return BadRequest({"file": [f"{exc}"]})
+
+        # the uploaded file is not serializable into the auditlog
+        # request data, so the context is set up here instead of
+        # through the `auditlog` decorator
+
+        with AuditLogContext() as ctx:
+            ctx.set("user", request.user)
+            ctx.set("org", org)
+            ctx.set("ip_address", get_client_ip(request))
+            ctx.log("member:import", log_object=ix, **result)
+
+        return Response(result)
+
     @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
     @load_object("member", models.InternetExchangeMember, ix="ix", id="member_id")
     @grainy_endpoint(
@@ -441,27 +516,264 @@ class RouteserverConfig(CachedObjectMixin, IxOrgQuerysetMixin, viewsets.GenericV
         )
         return Response(serializer.data)
 
+    @action(detail=False, methods=["GET"])
+    @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
+    @grainy_endpoint(
+        namespace="config.routeserver.{request.org.permission_id}",
+    )
+    def outdated(self, request, org, instance, ix, *args, **kwargs):
+        """
+        Lists the route server configs of the exchange that need
+        to be regenerated
+        """
+
+        queryset = (
+            models.RouteserverConfig.get_outdated(
+                models.RouteserverConfig.objects.filter(routeserver__ix=ix)
+            )
+            .select_related("routeserver")
+            .only("id", "generated", "routeserver__id", "routeserver__name")
+            .order_by("routeserver__name")
+        )
+
+        serializer = Serializers.rsconf_outdated(instance=queryset, many=True)
+        return Response(serializer.data)
+
     @action(
-        detail=True, methods=["GET", "OPTIONS"], renderer_classes=[PlainTextRenderer]
+        detail=True,
+        methods=["GET", "HEAD", "OPTIONS"],
+        renderer_classes=[PlainTextRenderer],
     )
     @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
     @grainy_endpoint(
         namespace="config.routeserver.{request.org.permission_id}",
+        enable_apply_perms=False,
     )
     def plain(self, request, org, instance, ix, name, *args, **kwargs):
-        rs_config = models.RouteserverConfig.objects.get(
-            routeserver__name=name, routeserver__ix=ix
-        )
+        """
+        Returns the config content as plain text
+
+        Route servers that need a config per ip version (bird v1)
+        return the IPv6 config with `?ip_version=6`.
+
+        The content is streamed from the artifact store, compressed
+        according to `Accept-Encoding`. The body digest is sent as
+        ETag, so polling route servers can fetch the config with
+        `If-None-Match` or `If-Modified-Since` and only download it
+        when it changed.
+        """
 
         if request.method == "OPTIONS":
+            rs_config = models.RouteserverConfig.objects.select_related(
+                "routeserver"
+            ).get(routeserver__name=name, routeserver__ix=ix)
             return self._options(request, rs_config)
 
-        serializer = Serializers.config__routeserver(
-            instance=rs_config,
-            many=False,
+        ip_version = request.GET.get("ip_version", "4")
+        if ip_version not in ("4", "6"):
+            return BadRequest({"ip_version": ["Must be 4 or 6"]})
+
+        # GET and HEAD only need the artifact digest, the config
+        # itself is never loaded
+
+        state = models.RouteserverConfig.get_artifact_state(
+            {"name": name, "ix": ix}, int(ip_version)
+        )
+        digest, size = state["digest"], state["size"]
+
+        if not digest:
+            if ip_version == "6" and state["split_ip_versions"]:
+                return Response(status=404)
+            # not generated yet
+            return Response("")
+
+        encoding = select_content_encoding(request, django_ixctl.artifacts.ENCODINGS)
+
+        # HEAD requests do not create encoded copies, without one the
+        # headers of the unencoded content are sent
+
+        if (
+            encoding
+            and request.method == "HEAD"
+            and not django_ixctl.artifacts.has_encoded(digest, encoding)
+        ):
+            encoding = None
+
+        if encoding:
+            etag = quote_etag(f"{digest}-{encoding}")
+        else:
+            etag = quote_etag(digest)
+        last_modified = timegm(state["generated"].utctimetuple())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+
+        if response is None:
+            if encoding:
+                path, size = django_ixctl.artifacts.get_encoded(digest, encoding)
+
+            if request.method == "HEAD":
+                response = HttpResponse(content_type="text/plain; charset=utf-8")
+            elif encoding:
+                response = FileResponse(
+                    open(path, "rb"), content_type="text/plain; charset=utf-8"
+                )
+            else:
+                response = FileResponse(
+                    django_ixctl.artifacts.open_stream(digest),
+                    content_type="text/plain; charset=utf-8",
+                )
+
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Content-Length"] = size
+
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    @action(detail=True, methods=["GET"])
+    @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
+    @grainy_endpoint(
+        namespace="config.routeserver.{request.org.permission_id}",
+    )
+    def fragments(self, request, org, instance, ix, name, *args, **kwargs):
+        """
+        Lists the config fragments of a bird route server with their
+        digests, so the route server can fetch only the fragments that
+        changed
+
+        `?since=<iso timestamp>` limits the list to fragments changed
+        after that time.
+        """
+
+        rs_config = models.RouteserverConfig.objects.select_related("routeserver").get(
+            routeserver__name=name, routeserver__ix=ix
+        )
+
+        queryset = rs_config.fragment_set.order_by("ip_version", "name")
+
+        since = request.GET.get("since")
+        if since:
+            since = parse_datetime(since)
+            if not since:
+                return BadRequest({"since": ["Invalid timestamp"]})
+            queryset = queryset.filter(updated__gt=since)
+
+        for fragment in queryset:
+            fragment.routeserver_config = rs_config
+
+        serializer = Serializers.rsconf_fragment(instance=queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=["GET"], renderer_classes=[PlainTextRenderer])
+    @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
+    @grainy_endpoint(
+        namespace="config.routeserver.{request.org.permission_id}",
+        enable_apply_perms=False,
+    )
+    def fragment(self, request, org, instance, ix, name, *args, **kwargs):
+        """
+        Returns the content of a config fragment as plain text
+
+        Specified with `?fragment=<main or AS{asn}>` and optionally
+        `?ip_version=6`.
+
+        The fragment digest is sent as ETag, `If-None-Match` and
+        `If-Modified-Since` are answered with 304 like for the plain
+        config.
+        """
+
+        try:
+            fragment = models.RouteserverConfigFragment.objects.get(
+                routeserver_config__routeserver__name=name,
+                routeserver_config__routeserver__ix=ix,
+                name=request.GET.get("fragment", ""),
+                ip_version=request.GET.get("ip_version", "4"),
+            )
+        except (models.RouteserverConfigFragment.DoesNotExist, ValueError):
+            return Response(status=404)
+
+        etag = quote_etag(fragment.digest)
+        last_modified = timegm(fragment.updated.utctimetuple())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+
+        if response is None:
+            response = FileResponse(
+                django_ixctl.artifacts.open_stream(fragment.digest),
+                content_type="text/plain; charset=utf-8",
+            )
+
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+
+    @action(detail=True, methods=["GET"])
+    @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
+    @grainy_endpoint(
+        namespace="config.routeserver.{request.org.permission_id}",
+        enable_apply_perms=False,
+    )
+    def wait(self, request, org, instance, ix, name, *args, **kwargs):
+        """
+        Waits for a new config (long-poll)
+
+        Route server agents call this with the digest of the config
+        they have (`?digest=`, the ETag of the plain config) and
+        optionally `?ip_version=6`. The request is answered as soon as
+        the config digest differs, with the new digest, or with 304
+        once `?timeout=` (capped at `IXCTL_RSCONF_WAIT_TIMEOUT`)
+        seconds passed without a change.
+
+        Answers with 503 if the process holds the max number of
+        waiting requests already.
+        """
+
+        ip_version = request.GET.get("ip_version", "4")
+        if ip_version not in ("4", "6"):
+            return BadRequest({"ip_version": ["Must be 4 or 6"]})
+
+        try:
+            timeout = django_ixctl.longpoll.get_timeout(request.GET.get("timeout"))
+        except ValueError:
+            return BadRequest({"timeout": ["Invalid timeout"]})
+
+        digest = django_ixctl.longpoll.normalize_digest(request.GET.get("digest", ""))
+
+        def get_state():
+            state = models.RouteserverConfig.get_artifact_state(
+                {"name": name, "ix": ix}, int(ip_version)
+            )
+            # not generated yet
+            state["digest"] = state["digest"] or ""
+            return state
+
+        try:
+            with django_ixctl.longpoll.waiter():
+                changed, state = django_ixctl.longpoll.wait(get_state, digest, timeout)
+        except django_ixctl.longpoll.WaitersFull:
+            response = Response(status=503)
+            response.headers["Retry-After"] = settings.IXCTL_RSCONF_WAIT_INTERVAL
+            return response
+
+        if not changed:
+            response = HttpResponseNotModified()
+            response.headers["ETag"] = quote_etag(digest)
+            return response
+
+        return Response(
+            {
+                "ip_version": int(ip_version),
+                "digest": state["digest"],
+                "size": state["size"],
+                "generated": state["generated"],
+            }
         )
-        # return Response(serializer.instance.body)
-        return Response(serializer.instance.body)
 
     @action(detail=True, methods=["POST"])
     @load_object("ix", models.InternetExchange, instance="instance", slug="ix_tag")
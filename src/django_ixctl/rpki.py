@@ -0,0 +1,324 @@
+"""
+Local RPKI VRP snapshots for route server config generation
+
+VRP exports of a relying party (rpki-client / RIPE validator json,
+or csv) are loaded into a snapshot table. Route server generations
+write the most recent snapshot to the arouteserver cache in place of
+the ROA file arouteserver would otherwise download and parse for
+every run.
+
+The snapshot is rendered to arouteserver's ROA format once and kept
+in the workspace, runs only copy it into the cache. Expired VRPs are
+left out of the render, so it is rendered again once the first of its
+VRPs expires.
+
+Enabled with `IXCTL_VRP_LOCAL`.
+"""
+
+import csv
+import datetime
+import io
+import ipaddress
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from pierky.arouteserver.ripe_rpki_cache import RIPE_RPKI_ROAs
+
+import django_ixctl.ars
+import django_ixctl.models as models
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = structlog.get_logger(__name__)
+
+FORMATS = ("json", "csv")
+
+ASN_RE = re.compile(r"(?i)^(?:AS)?(\d+)$")
+
+
+def detect_format(filename):
+    """
+    Returns the export format for a file name, defaulting to json
+    """
+
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "json"
+
+
+def parse_json(fileobj):
+    """
+    Yields VRP dicts from a json export with a `roas` list
+
+    Uses `ijson` to parse incrementally if it is installed
+    """
+
+    if ijson:
+        try:
+            yield from ijson.items(fileobj, "roas.item")
+        except ijson.JSONError as exc:
+            raise ValueError(f"Invalid json: {exc}")
+    else:
+        logger.warning("ijson is not installed, loading the whole VRP export")
+        yield from json.load(fileobj).get("roas", [])
+
+
+def parse_buildtime(fileobj):
+    """
+    Returns the build time from the metadata of a json export
+    """
+
+    if ijson:
+        metadata = next(ijson.items(fileobj, "metadata"), {})
+    else:
+        metadata = json.load(fileobj).get("metadata", {})
+
+    buildtime = metadata.get("buildtime")
+    if buildtime:
+        return datetime.datetime.strptime(buildtime, "%Y-%m-%dT%H:%M:%SZ").replace(
+            tzinfo=datetime.timezone.utc
+        )
+
+    generated = metadata.get("generated")
+    if generated:
+        return datetime.datetime.fromtimestamp(int(generated), datetime.timezone.utc)
+
+    return None
+
+
+def parse_csv(fileobj):
+    """
+    Yields VRP dicts from a csv export with ASN, IP Prefix,
+    Max Length and Trust Anchor columns, as written by
+    routinator and the RIPE validator
+    """
+
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8-sig")
+
+    for row in csv.reader(fileobj):
+        if len(row) < 4 or not ASN_RE.match(row[0].strip()):
+            # header or empty line
+            continue
+        yield {
+            "asn": row[0].strip(),
+            "prefix": row[1].strip(),
+            "maxLength": row[2].strip(),
+            "ta": row[3].strip(),
+        }
+
+
+def clean_vrp(vrp):
+    """
+    Validates and normalizes a parsed VRP
+
+    Returns:
+
+    - `dict` with asn, prefix, max_length, ta and expires
+
+    Raises `ValueError` on invalid values
+    """
+
+    match = ASN_RE.match(f"{vrp.get('asn', '')}".strip())
+    if not match:
+        raise ValueError(f"Invalid asn: {vrp.get('asn')}")
+
+    prefix = ipaddress.ip_network(f"{vrp.get('prefix', '')}".strip())
+
+    max_length = int(vrp.get("maxLength") or prefix.prefixlen)
+    if not prefix.prefixlen <= max_length <= prefix.max_prefixlen:
+        raise ValueError(f"Invalid max length: {max_length}")
+
+    expires = vrp.get("expires")
+
+    return {
+        "asn": int(match.group(1)),
+        "prefix": prefix,
+        "max_length": max_length,
+        "ta": f"{vrp.get('ta') or ''}".strip(),
+        "expires": int(expires) if expires else None,
+    }
+
+
+def load_snapshot(path, fmt=None, batch_size=None):
+    """
+    Loads a VRP export into a new snapshot
+
+    Older snapshots beyond `IXCTL_VRP_SNAPSHOTS_KEEP` are removed.
+    Invalid VRPs are skipped.
+
+    Argument(s):
+
+    - path (`str`): export file
+
+    Keyword Argument(s):
+
+    - fmt (`str`): "json" or "csv", detected from the file name if
+      not specified
+    - batch_size (`int`): number of VRPs written per query,
+      defaults to `IXCTL_VRP_IMPORT_BATCH_SIZE`
+
+    Returns:
+
+    - `VrpSnapshot`
+    """
+
+    if fmt is None:
+        fmt = detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported VRP format: {fmt}")
+    if batch_size is None:
+        batch_size = settings.IXCTL_VRP_IMPORT_BATCH_SIZE
+
+    buildtime = None
+    if fmt == "json":
+        with open(path, "rb") as fh:
+            buildtime = parse_buildtime(fh)
+
+    with transaction.atomic():
+        snapshot = models.VrpSnapshot.objects.create(
+            source=os.path.basename(path), buildtime=buildtime
+        )
+
+        vrps = []
+        count = 0
+
+        with open(path, "rb") as fh:
+            rows = parse_json(fh) if fmt == "json" else parse_csv(fh)
+
+            for row in rows:
+                try:
+                    vrps.append(models.Vrp(snapshot=snapshot, **clean_vrp(row)))
+                except (TypeError, ValueError):
+                    continue
+
+                if len(vrps) >= batch_size:
+                    models.Vrp.objects.bulk_create(vrps)
+                    count += len(vrps)
+                    vrps = []
+
+        models.Vrp.objects.bulk_create(vrps)
+        count += len(vrps)
+
+        snapshot.count = count
+        snapshot.save(update_fields=["count"])
+
+        keep = models.VrpSnapshot.objects.order_by("-id").values_list("id", flat=True)[
+            : settings.IXCTL_VRP_SNAPSHOTS_KEEP
+        ]
+        models.VrpSnapshot.objects.exclude(id__in=list(keep)).delete()
+
+    return snapshot
+
+
+def rpki_roas_needed(ars_general):
+    """
+    Returns whether arouteserver needs ROAs from the ROA file for
+    a general config
+    """
+
+    cfg = ars_general.get("cfg", {})
+    filtering = cfg.get("filtering", {})
+
+    if cfg.get("rpki_roas", {}).get("source", "ripe-rpki-validator-cache") == "rtr":
+        return False
+
+    return bool(
+        filtering.get("rpki_bgp_origin_validation", {}).get("enabled")
+        or filtering.get("irrdb", {})
+        .get("use_rpki_roas_as_route_objects", {})
+        .get("enabled")
+    )
+
+
+def get_rendered_path(snapshot, now=None):
+    """
+    Returns the path of the snapshot rendered to arouteserver's ROA
+    format, rendering it on first use
+
+    Expired VRPs are left out. The render is named after the time the
+    first of its VRPs expires (0 if none does) and rendered again once
+    that time passed. Other renders are removed.
+    """
+
+    if now is None:
+        now = int(time.time())
+
+    render_dir = os.path.join(django_ixctl.ars.get_work_dir(), "vrp")
+    os.makedirs(render_dir, exist_ok=True)
+
+    name_prefix = f"vrp-{snapshot.id}-"
+
+    for filename in os.listdir(render_dir):
+        if filename.startswith(name_prefix) and filename.endswith(".json"):
+            valid_until = int(filename[len(name_prefix) : -len(".json")])
+            if not valid_until or now <= valid_until:
+                return os.path.join(render_dir, filename)
+
+    valid_until = None
+
+    fd, tmp_path = tempfile.mkstemp(dir=render_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as fh:
+        fh.write('{"roas": [')
+        first = True
+        for asn, prefix, max_length, ta, expires in snapshot.vrp_set.values_list(
+            "asn", "prefix", "max_length", "ta", "expires"
+        ).iterator(chunk_size=10000):
+            if expires:
+                if expires < now:
+                    continue
+                valid_until = min(valid_until or expires, expires)
+            if not first:
+                fh.write(",")
+            first = False
+            json.dump(
+                {
+                    "asn": f"AS{asn}",
+                    "prefix": f"{prefix}",
+                    "maxLength": max_length,
+                    "ta": ta,
+                },
+                fh,
+            )
+        fh.write("]}")
+
+    filename = f"{name_prefix}{valid_until or 0}.json"
+    path = os.path.join(render_dir, filename)
+    os.replace(tmp_path, path)
+
+    for other in os.listdir(render_dir):
+        if other != filename and other.startswith("vrp-"):
+            os.remove(os.path.join(render_dir, other))
+
+    return path
+
+
+def seed_cache(cache_dir, snapshot):
+    """
+    Writes a snapshot to the arouteserver ROA cache file
+
+    The file is written to a temporary file first and moved into
+    place, so concurrent runs never read a partially written file.
+    """
+
+    roas = RIPE_RPKI_ROAs(cache_dir=cache_dir)
+    path = roas._get_object_filepath()
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as fh, open(get_rendered_path(snapshot)) as rendered:
+        fh.write(f'{{"ts": {int(time.time())}, "data": ')
+        shutil.copyfileobj(rendered, fh)
+        fh.write("}")
+    os.replace(tmp_path, path)
+
+    return path
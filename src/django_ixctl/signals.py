@@ -1,9 +1,15 @@
 from django.contrib.auth.signals import user_logged_in
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from fullctl.django.models.concrete.tasks import TaskLimitError
 
-from django_ixctl.models import InternetExchangeMember, Routeserver
+import django_ixctl.exporters.ixf
+from django_ixctl.models import (
+    InternetExchange,
+    InternetExchangeMember,
+    InternetExchangeMemberChange,
+    Routeserver,
+)
 from django_ixctl.util import create_networks_from_verified_asns
 
 
@@ -19,7 +25,39 @@ def update_routeserver(sender, instance, **kwargs):
     internet_exchange = instance.ix
     routeservers = Routeserver.objects.filter(ix=internet_exchange)
     for routeserver in routeservers:
-        try:
-            routeserver.routeserver_config.queue_generate()
-        except TaskLimitError:
-            pass
+        routeserver.routeserver_config.queue_generate()
+
+
+# invalidate cached ix-f export snapshots when the exchange or
+# any of its members change
+#
+# invalidated once the change is committed, an export rendered by a
+# concurrent request before the commit would otherwise be cached
+# with the old data
+@receiver(post_save, sender=InternetExchange)
+@receiver(post_delete, sender=InternetExchange)
+def invalidate_ixf_export_ix(sender, instance, **kwargs):
+    ix_id = instance.id
+    transaction.on_commit(lambda: django_ixctl.exporters.ixf.invalidate(ix_id))
+
+
+@receiver(post_save, sender=InternetExchangeMember)
+@receiver(post_delete, sender=InternetExchangeMember)
+def invalidate_ixf_export_member(sender, instance, **kwargs):
+    ix_id = instance.ix_id
+    transaction.on_commit(lambda: django_ixctl.exporters.ixf.invalidate(ix_id))
+
+
+# write the member change log that drives the ix-f delta feed
+@receiver(post_save, sender=InternetExchangeMember)
+def log_member_save(sender, instance, created, **kwargs):
+    InternetExchangeMemberChange.log(instance, "add" if created else "change")
+
+
+@receiver(post_delete, sender=InternetExchangeMember)
+def log_member_delete(sender, instance, origin=None, **kwargs):
+    # members removed along with their exchange take the exchange's
+    # change log with them, nothing left to record
+    if isinstance(origin, InternetExchange):
+        return
+    InternetExchangeMemberChange.log(instance, "remove")
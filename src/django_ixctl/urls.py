@@ -61,11 +61,21 @@ urlpatterns += [
         "api/",
         include(("django_ixctl.rest.urls.ixctl", "ixctl_api"), namespace="ixctl_api"),
     ),
+    path(
+        "<str:org_tag>/export/memberlist.json",
+        views.export_ixf_instance,
+        name="ixf export instance",
+    ),
     path(
         "<str:org_tag>/<str:ix_tag>/export/memberlist.json",
         views.export_ixf,
         name="ixf export",
     ),
+    path(
+        "<str:org_tag>/<str:ix_tag>/export/memberlist.delta.json",
+        views.export_ixf_delta,
+        name="ixf export delta",
+    ),
     path("<str:org_tag>/<str:ix_tag>/", views.view_instance_load_ix, name="ixctl-home"),
     path("<str:org_tag>/", views.view_instance, name="ixctl-home"),
     path("", views.org_redirect),
@@ -1,3 +1,5 @@
+import re
+
 import fullctl.service_bridge.pdbctl as pdbctl
 from fullctl.django.auth import permissions
 
@@ -33,3 +35,46 @@ def create_networks_from_verified_asns(user):
                 Network.create_from_pdb(instance, pdb_net)
             else:
                 Network.objects.create(name=f"AS{asn}", asn=asn, instance=instance)
+
+
+def select_content_encoding(request, available):
+    """
+    Returns the content encoding to use for a response to the request
+
+    Argument(s):
+
+    - request (`HttpRequest`)
+    - available (`list`): content encodings available for the response,
+      in order of server preference
+
+    Returns:
+
+    - content encoding (`str`) or `None` if the response should not be encoded
+    """
+
+    accepted = {}
+
+    for token in request.headers.get("Accept-Encoding", "").split(","):
+        parts = [part.strip() for part in token.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            match = re.match(r"^q=([0-9.]+)$", param)
+            if match:
+                try:
+                    quality = float(match.group(1))
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+
+    selected = None
+    selected_quality = 0.0
+
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > selected_quality:
+            selected = encoding
+            selected_quality = quality
+
+    return selected
@@ -1,11 +1,24 @@
+from calendar import timegm
+from datetime import timezone
+
 from django.conf import settings
-from django.http import Http404, HttpResponse
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from django.utils.timezone import is_naive, make_aware
 from fullctl.django.decorators import load_instance, require_auth
 
 import django_ixctl.exporters.ixf
 from django_ixctl.context_processors import check_trial_available
 from django_ixctl.models import InternetExchange
+from django_ixctl.util import select_content_encoding
 
 # Create your views here.
 
@@ -48,8 +61,28 @@ def org_redirect(request):
     return redirect(f"/{request.org.slug}/")
 
 
-@load_instance(public=True)
-def export_ixf(request, instance, ix_tag, **kwargs):
+def stream_ixf_export(state, pretty):
+    """
+    Returns whether the ix-f export should be streamed for the
+    specified export state
+    """
+
+    threshold = settings.IXCTL_IXF_EXPORT_STREAM_THRESHOLD
+
+    if pretty or not threshold:
+        return False
+
+    return state["members"] >= threshold
+
+
+def get_ixf_export_ix(request, instance, ix_tag):
+    """
+    Returns the exchange for an ix-f export request
+
+    Raises `Http404` if the exchange does not exist or if its export
+    is private and the request does not provide the secret
+    """
+
     try:
         ix = InternetExchange.objects.get(instance=instance, slug=ix_tag)
     except InternetExchange.DoesNotExist:
@@ -60,10 +93,154 @@ def export_ixf(request, instance, ix_tag, **kwargs):
         if request.GET.get("secret") != ix.urlkey:
             raise Http404
 
+    return ix
+
+
+def get_ixf_export_version(request):
+    """
+    Returns the ix-f schema version requested through the `version`
+    parameter
+
+    Raises `ValueError` for unsupported versions
+    """
+
+    version = request.GET.get("version") or None
+    django_ixctl.exporters.ixf.get_renderer(version)
+    return version
+
+
+@load_instance(public=True)
+def export_ixf(request, instance, ix_tag, **kwargs):
+    ix = get_ixf_export_ix(request, instance, ix_tag)
+
     if "pretty" in request.GET:
         pretty = True
     else:
         pretty = False
 
-    rv = django_ixctl.exporters.ixf.export(ix, pretty=pretty)
+    try:
+        version = get_ixf_export_version(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    # answer conditional requests from the cached export state
+    # before any export data is loaded or rendered
+
+    state = django_ixctl.exporters.ixf.export_state(ix)
+    stream = stream_ixf_export(state, pretty)
+
+    # streamed exports are sent unencoded, snapshots are stored
+    # pre-compressed
+
+    if stream:
+        encoding = None
+    else:
+        encoding = select_content_encoding(
+            request, django_ixctl.exporters.ixf.EXPORT_ENCODINGS
+        )
+
+    variant = django_ixctl.exporters.ixf.export_variant(pretty, version)
+    if encoding:
+        variant = f"{variant}-{encoding}"
+
+    last_modified = timegm(state["last_modified"].utctimetuple())
+    etag = quote_etag(f"{state['version']}-{variant}")
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None and stream:
+        # exports of very large exchanges are streamed from a
+        # server-side cursor instead of being rendered into a snapshot
+
+        response = StreamingHttpResponse(
+            django_ixctl.exporters.ixf.export_stream(
+                ix, timestamp=state["last_modified"], version=version
+            ),
+            content_type="application/json",
+        )
+
+    elif response is None:
+        snapshot = django_ixctl.exporters.ixf.snapshot(
+            ix, pretty=pretty, version=version
+        )
+        last_modified = timegm(snapshot["last_modified"].utctimetuple())
+        etag = quote_etag(f"{snapshot['version']}-{variant}")
+
+        if encoding:
+            response = HttpResponse(
+                snapshot["encoded"][encoding], content_type="application/json"
+            )
+            response.headers["Content-Encoding"] = encoding
+        else:
+            response = HttpResponse(snapshot["body"], content_type="application/json")
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@load_instance(public=True)
+def export_ixf_delta(request, instance, ix_tag, **kwargs):
+    """
+    Incremental ix-f export listing the members added, changed or
+    removed since the `cursor` or `since` (ISO 8601 timestamp)
+    parameter
+
+    Every response carries the cursor to continue from in the
+    next request.
+    """
+
+    ix = get_ixf_export_ix(request, instance, ix_tag)
+
+    if "pretty" in request.GET:
+        pretty = True
+    else:
+        pretty = False
+
+    try:
+        version = get_ixf_export_version(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    if request.GET.get("cursor"):
+        try:
+            cursor = django_ixctl.exporters.ixf.decode_cursor(request.GET["cursor"])
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+    elif request.GET.get("since"):
+        since = parse_datetime(request.GET["since"])
+        if not since:
+            return HttpResponseBadRequest("Invalid since timestamp")
+        if is_naive(since):
+            since = make_aware(since, timezone.utc)
+        cursor = django_ixctl.exporters.ixf.delta_start(ix, since)
+    else:
+        return HttpResponseBadRequest("Either cursor or since required")
+
+    rv = django_ixctl.exporters.ixf.export_delta(
+        ix, cursor=cursor, pretty=pretty, version=version
+    )
+    return HttpResponse(rv, content_type="application/json")
+
+
+@load_instance(public=True)
+def export_ixf_instance(request, instance, **kwargs):
+    """
+    Combined ix-f export of all public exchanges of the organization
+    """
+
+    if "pretty" in request.GET:
+        pretty = True
+    else:
+        pretty = False
+
+    try:
+        version = get_ixf_export_version(request)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    rv = django_ixctl.exporters.ixf.export_instance(
+        instance, pretty=pretty, version=version
+    )
     return HttpResponse(rv, content_type="application/json")
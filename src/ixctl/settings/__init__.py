@@ -63,6 +63,137 @@ settings_manager.set_twentyc_service()
 
 settings_manager.set_option("IXCTL_MODE", "MANY")
 
+# IX-F EXPORT
+
+# rendered ix-f export snapshots are kept in the cache for this
+# many seconds (snapshots are also invalidated whenever the exchange
+# or any of its members are saved or deleted)
+settings_manager.set_option("IXCTL_IXF_EXPORT_CACHE_TIMEOUT", 86400)
+
+# compact exports of exchanges with at least this many members are
+# streamed instead of being rendered into a cached snapshot
+# (0 disables streaming)
+settings_manager.set_option("IXCTL_IXF_EXPORT_STREAM_THRESHOLD", 5000)
+
+# number of members read from the database cursor and encoded
+# per streamed chunk
+settings_manager.set_option("IXCTL_IXF_EXPORT_STREAM_CHUNK_SIZE", 500)
+
+# max number of member change log entries processed per
+# ix-f delta feed response
+settings_manager.set_option("IXCTL_IXF_DELTA_LIMIT", 1000)
+
+# MEMBER IMPORT
+
+# number of members written per query during bulk member imports
+settings_manager.set_option("IXCTL_MEMBER_IMPORT_BATCH_SIZE", 500)
+
+# ROUTESERVER CONFIG
+
+# route server configs are regenerated once their inputs have not
+# changed for this many seconds
+settings_manager.set_option("IXCTL_RSCONF_QUIET_PERIOD", 30)
+
+# the arouteserver clients config of an exchange is built once and
+# shared by all of its route servers, it is kept in the cache for this
+# many seconds (changes to the exchange's rs peers key a new entry,
+# so this only bounds how long network data from the SoT is reused)
+settings_manager.set_option("IXCTL_ARS_CLIENTS_CACHE_TIMEOUT", 3600)
+
+# number of generated versions kept in the history of each route
+# server config
+settings_manager.set_option("IXCTL_RSCONF_HISTORY_KEEP", 50)
+
+# the history stores a full copy of the config every this many
+# versions and deltas against the previous version in between
+settings_manager.set_option("IXCTL_RSCONF_HISTORY_FULL_INTERVAL", 10)
+
+# directory bird route servers keep per client config fragments in,
+# the main config file includes the fragments from here
+settings_manager.set_option("IXCTL_RSCONF_FRAGMENT_DIR", "/srv/bird/etc/clients")
+
+# generated route server configs are stored in files below this
+# directory, named after the digest of their content
+settings_manager.set_option(
+    "IXCTL_RSCONF_ARTIFACT_DIR", os.path.join(BASE_DIR, "var", "rsconf")
+)
+
+# gzip compress stored route server configs
+settings_manager.set_option("IXCTL_RSCONF_ARTIFACT_COMPRESS", False)
+
+# stored route server configs nothing refers to are removed once they
+# were not stored for this many seconds
+settings_manager.set_option("IXCTL_RSCONF_ARTIFACT_GRACE", 3600)
+
+# generations look for route server configs to remove at most once
+# every this many seconds
+settings_manager.set_option("IXCTL_RSCONF_ARTIFACT_GC_INTERVAL", 600)
+
+# route server agents waiting for a new config (long-poll) are
+# answered after this many seconds at most if the config did not change
+settings_manager.set_option("IXCTL_RSCONF_WAIT_TIMEOUT", 55)
+
+# waiting requests check the config every this many seconds
+settings_manager.set_option("IXCTL_RSCONF_WAIT_INTERVAL", 1)
+
+# max number of waiting requests per process, further requests are
+# answered with 503
+settings_manager.set_option("IXCTL_RSCONF_WAIT_MAX_WAITERS", 10)
+
+# arouteserver runs in a temporary directory below this path
+# (defaults to a directory in the system temp dir)
+settings_manager.set_option("IXCTL_ARS_WORK_DIR", "")
+
+# arouteserver cache (IRR / bgpq4 results, PeeringDB and RPKI data)
+# shared by all runs (defaults to a "cache" directory in the work dir)
+settings_manager.set_option("IXCTL_ARS_CACHE_DIR", "")
+
+# cache files not refreshed for this many seconds are removed
+settings_manager.set_option("IXCTL_ARS_CACHE_TTL", 86400 * 7)
+
+# max total size of the cache in bytes, least recently refreshed
+# files are removed first
+settings_manager.set_option("IXCTL_ARS_CACHE_MAX_SIZE", 1024**3)
+
+# the cache is pruned by arouteserver runs at most once every this
+# many seconds
+settings_manager.set_option("IXCTL_ARS_CACHE_PRUNE_INTERVAL", 600)
+
+# how arouteserver is run: "pool" runs it on long-lived worker
+# processes that have arouteserver imported already, "cli" starts
+# the arouteserver command for every run
+settings_manager.set_option("IXCTL_ARS_RUNNER", "pool")
+
+# number of arouteserver pool worker processes
+settings_manager.set_option("IXCTL_ARS_POOL_SIZE", 2)
+
+# pool workers are replaced after this many runs (0 keeps them
+# for the lifetime of the pool)
+settings_manager.set_option("IXCTL_ARS_POOL_MAX_TASKS", 100)
+
+# IRR
+
+# resolve AS-SETs and prefix lists from IRR data imported from
+# RPSL dumps (ixctl_irr_import) instead of querying IRR during
+# route server config generation
+settings_manager.set_option("IXCTL_IRR_LOCAL", False)
+
+# number of IRR objects written per query during RPSL imports
+settings_manager.set_option("IXCTL_IRR_IMPORT_BATCH_SIZE", 5000)
+
+# RPKI
+
+# use the most recent VRP snapshot loaded with ixctl_vrp_import for
+# route servers that need ROAs, instead of letting arouteserver
+# download them
+settings_manager.set_option("IXCTL_VRP_LOCAL", False)
+
+# number of VRPs written per query during VRP imports
+settings_manager.set_option("IXCTL_VRP_IMPORT_BATCH_SIZE", 10000)
+
+# number of VRP snapshots kept
+settings_manager.set_option("IXCTL_VRP_SNAPSHOTS_KEEP", 2)
+
 # PEERINGDB
 
 TABLE_PREFIX = "peeringdb_"
@@ -11,9 +11,11 @@ _ = lambda s: s  # noqa: E731
 def reset_auto_fields():
     from django.core.management.color import no_style
     from django.db import connection
-    from django_ixctl.models import Organization
+    from django_ixctl.models import InternetExchange, Organization
 
-    sequence_sql = connection.ops.sequence_reset_sql(no_style(), [Organization])
+    sequence_sql = connection.ops.sequence_reset_sql(
+        no_style(), [Organization, InternetExchange]
+    )
     with connection.cursor() as cursor:
         for sql in sequence_sql:
             cursor.execute(sql)
@@ -176,3 +178,51 @@ def pdb_data():
 
     data_dir = os.path.join(os.path.dirname(__file__), "data")
     client.TEST_DATA_PATH = data_dir
+
+
+class FakeArouteserver:
+    """
+    Stands in for `subprocess.Popen` running the arouteserver cli
+
+    Records the commands it was called with and writes a config
+    naming the target to the output file, followed by `output`
+    if set.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.returncode = 0
+        self.output = ""
+
+    def __call__(self, cmd, *args, **kwargs):
+        self.calls.append(cmd)
+        outfile = cmd[cmd.index("-o") + 1]
+        with open(outfile, "w") as fh:
+            fh.write(f"# {cmd[1]} config\n")
+            fh.write(self.output)
+        return self
+
+    def communicate(self, timeout=None):
+        return b"", b""
+
+
+@pytest.fixture(autouse=True)
+def artifact_dir(settings, tmp_path):
+    """
+    Keeps generated route server configs in the test's temp dir
+    """
+
+    settings.IXCTL_RSCONF_ARTIFACT_DIR = str(tmp_path / "rsconf")
+    return settings.IXCTL_RSCONF_ARTIFACT_DIR
+
+
+@pytest.fixture
+def arouteserver(monkeypatch, settings, tmp_path):
+    import subprocess
+
+    settings.IXCTL_ARS_WORK_DIR = str(tmp_path / "arouteserver")
+    settings.IXCTL_ARS_RUNNER = "cli"
+
+    fake = FakeArouteserver()
+    monkeypatch.setattr(subprocess, "Popen", fake)
+    return fake
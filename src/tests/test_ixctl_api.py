@@ -1,6 +1,10 @@
+import gzip
 import json
 
+import django_ixctl.artifacts
+import django_ixctl.exporters.ixf as ixf
 import django_ixctl.models as models
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 
 
@@ -310,6 +314,81 @@ def test_ix_create_member_invalid(db, pdb_data, account_objects):
     }
 
 
+def test_ix_bulk_import_members(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+    count = ix.member_set.count()
+
+    upload = SimpleUploadedFile(
+        "members.csv", b"asn,ipaddr4,speed\n64500,10.0.0.1,1000\n64501,10.0.0.2,1000\n"
+    )
+
+    response = client.post(
+        reverse("ixctl_api:member-bulk-import", args=(org.slug, ix.slug)),
+        {"file": upload},
+        format="multipart",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [{"created": 2, "updated": 0}]
+    assert ix.member_set.count() == count + 2
+
+    upload = SimpleUploadedFile(
+        "members.csv", b"asn,ipaddr4,speed\n64502,10.0.0.3,1000\n64503,10.0.0.3,1000\n"
+    )
+
+    response = client.post(
+        reverse("ixctl_api:member-bulk-import", args=(org.slug, ix.slug)),
+        {"file": upload},
+        format="multipart",
+    )
+
+    assert response.status_code == 400
+    assert response.json()["errors"]["non_field_errors"] == [
+        "Row 2: ipaddr4 10.0.0.3 appears more than once"
+    ]
+    assert ix.member_set.count() == count + 2
+
+
+def test_ix_bulk_import_members_ixp_id(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+    count = ix.member_set.count()
+
+    data = ixf.export(ix, version="1.0").encode()
+    url = reverse("ixctl_api:member-bulk-import", args=(org.slug, ix.slug))
+
+    ix.member_set.all().delete()
+
+    # connections at other exchanges are skipped
+
+    response = client.post(
+        url,
+        {"file": SimpleUploadedFile("members.json", data), "ixp_id": 0},
+        format="multipart",
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [{"created": 0, "updated": 0}]
+
+    response = client.post(
+        url,
+        {"file": SimpleUploadedFile("members.json", data), "ixp_id": ix.id},
+        format="multipart",
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [{"created": count, "updated": 0}]
+
+    response = client.post(
+        url,
+        {"file": SimpleUploadedFile("members.json", data), "ixp_id": "first"},
+        format="multipart",
+    )
+    assert response.status_code == 400
+    assert "ixp_id" in response.json()["errors"]
+
+
 def test_ix_edit_member(db, pdb_data, account_objects):
     ix = account_objects.ix
     client = account_objects.api_client
@@ -489,6 +568,27 @@ def test_update_routeserver(db, pdb_data, account_objects):
     assert data[0]["ars_type"] == routeserver.ars_type
 
 
+def test_list_outdated_routeserverconfig(db, pdb_data, account_objects):
+    rs = account_objects.routeserver
+    rs.routeserver_config
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+
+    url = reverse("ixctl_api:config/routeserver-outdated", args=(org.slug, ix.slug))
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json()["data"] == []
+
+    rs.ars_type = "bird2"
+    rs.save()
+
+    response = client.get(url)
+    data = response.json()["data"]
+    assert [(row["routeserver"], row["name"]) for row in data] == [(rs.id, rs.name)]
+
+
 def test_retrieve_routeserverconfig(db, pdb_data, account_objects):
     rs = account_objects.routeserver
     rs.routeserver_config
@@ -512,3 +612,136 @@ def test_retrieve_routeserverconfig(db, pdb_data, account_objects):
         reverse("ixctl_api:config/routeserver-plain", args=(org.slug, ix.slug, rs.name))
     )
     assert response_plain.status_code == 200
+
+
+def test_routeserverconfig_plain_ip_version(
+    db, pdb_data, account_objects, arouteserver
+):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+
+    url = reverse(
+        "ixctl_api:config/routeserver-plain", args=(org.slug, ix.slug, rs.name)
+    )
+
+    # not generated yet
+
+    assert client.get(url, {"ip_version": 6}).status_code == 404
+
+    routeserver_config.generate()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.getvalue().decode() == routeserver_config.body
+
+    response = client.get(url, {"ip_version": 6})
+    assert response.status_code == 200
+    assert response.getvalue().decode() == routeserver_config.body6
+
+    assert client.get(url, {"ip_version": 5}).status_code == 400
+
+
+def test_routeserverconfig_plain_conditional(
+    db, pdb_data, account_objects, arouteserver
+):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+
+    url = reverse(
+        "ixctl_api:config/routeserver-plain", args=(org.slug, ix.slug, rs.name)
+    )
+
+    routeserver_config.generate()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert etag == f'"{routeserver_config.body_digest}"'
+
+    # unchanged config
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+    # each ip version has its own etag
+
+    response = client.get(url, {"ip_version": 6}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{routeserver_config.body6_digest}"'
+
+    # head
+
+    response = client.head(url)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+    assert int(response.headers["Content-Length"]) == routeserver_config.body_size
+    assert not response.content
+
+    # config changed
+
+    routeserver_config.body = "changed"
+    routeserver_config.save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.getvalue() == b"changed"
+    assert response.headers["ETag"] != etag
+
+
+def test_routeserverconfig_plain_encoding(db, pdb_data, account_objects, arouteserver):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+
+    url = reverse(
+        "ixctl_api:config/routeserver-plain", args=(org.slug, ix.slug, rs.name)
+    )
+
+    routeserver_config.generate()
+
+    # HEAD does not create an encoded copy
+
+    response = client.head(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == f'"{routeserver_config.body_digest}"'
+    assert int(response.headers["Content-Length"]) == routeserver_config.body_size
+    assert not django_ixctl.artifacts.has_encoded(
+        routeserver_config.body_digest, "gzip"
+    )
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.getvalue()).decode() == routeserver_config.body
+
+    etag = response.headers["ETag"]
+    assert etag != f'"{routeserver_config.body_digest}"'
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    response = client.head(url, HTTP_ACCEPT_ENCODING="gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == etag
+
+    # encoding refused
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0")
+    assert "Content-Encoding" not in response.headers
+    assert response.getvalue().decode() == routeserver_config.body
@@ -0,0 +1,222 @@
+import os
+
+import django_ixctl.ars as ars
+import django_ixctl.models as models
+import pytest
+
+
+def make_cache_file(cache_dir, name, size, mtime):
+    path = os.path.join(cache_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_cache_ttl(tmp_path):
+    cache_dir = str(tmp_path)
+    now = 1000000
+
+    fresh = make_cache_file(cache_dir, "as_set_AS-FRESH.json", 10, now - 10)
+    expired = make_cache_file(cache_dir, "irr/as_set_AS-OLD.json", 10, now - 100)
+
+    assert ars.prune_cache(cache_dir, ttl=50, max_size=0, now=now) == 1
+    assert os.path.exists(fresh)
+    assert not os.path.exists(expired)
+
+    # ttl of 0 disables expiry
+
+    assert ars.prune_cache(cache_dir, ttl=0, max_size=0, now=now + 1000) == 0
+
+
+def test_prune_cache_max_size(tmp_path):
+    cache_dir = str(tmp_path)
+    now = 1000000
+
+    paths = [
+        make_cache_file(cache_dir, f"as_set_AS-{idx}.json", 100, now - idx)
+        for idx in range(5)
+    ]
+
+    # least recently modified files are removed first
+
+    assert ars.prune_cache(cache_dir, ttl=0, max_size=250, now=now) == 3
+    assert [os.path.exists(path) for path in paths] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_workspace(settings, tmp_path):
+    settings.IXCTL_ARS_WORK_DIR = str(tmp_path)
+    settings.IXCTL_ARS_CACHE_TTL = 60
+
+    cache_dir = ars.get_cache_dir()
+    assert cache_dir == str(tmp_path / "cache")
+
+    expired = make_cache_file(cache_dir, "as_set_AS-OLD.json", 10, 0)
+
+    with ars.workspace() as run_dir:
+        assert os.path.dirname(run_dir) == str(tmp_path)
+        assert not os.path.exists(expired)
+
+    assert not os.path.exists(run_dir)
+    assert os.path.exists(cache_dir)
+
+
+def test_maybe_prune_cache(settings, tmp_path):
+    settings.IXCTL_ARS_WORK_DIR = str(tmp_path)
+    settings.IXCTL_ARS_CACHE_TTL = 60
+    settings.IXCTL_ARS_CACHE_PRUNE_INTERVAL = 600
+    now = 1000000
+
+    cache_dir = ars.get_cache_dir()
+    make_cache_file(cache_dir, "as_set_AS-OLD.json", 10, 0)
+
+    assert ars.maybe_prune_cache(now=now) == 1
+
+    # not due again within the interval
+
+    expired = make_cache_file(cache_dir, "as_set_AS-OLD.json", 10, 0)
+
+    assert ars.maybe_prune_cache(now=now + 300) is None
+    assert os.path.exists(expired)
+
+    assert ars.maybe_prune_cache(now=now + 600) == 1
+    assert not os.path.exists(expired)
+
+
+def test_generate_workspace(db, pdb_data, account_objects, arouteserver, settings):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    routeserver_config.generate()
+
+    cmd = arouteserver.calls[0]
+    assert cmd[cmd.index("--cache-dir") + 1] == ars.get_cache_dir()
+
+    # run directory was removed, only the shared cache and the
+    # pruning marker remain
+
+    assert sorted(os.listdir(settings.IXCTL_ARS_WORK_DIR)) == [
+        ".cache-pruned",
+        "cache",
+    ]
+    assert models.RouteserverConfig.objects.get(id=routeserver_config.id).body
+
+
+def test_run_command():
+    ars.init_worker()
+
+    assert ars.run_command(["unknown"]).startswith("Invalid arguments")
+
+    # no arouteserver program config in the test environment
+
+    error = ars.run_command(["bird", "--cfg", "/nonexistent/arouteserver.yml"])
+    assert "Configuration file not found" in error
+
+
+def test_run_command_exit(monkeypatch):
+    ars.init_worker()
+
+    class Command:
+        def __init__(self, args):
+            pass
+
+        def run(self):
+            raise SystemExit(2)
+
+    monkeypatch.setitem(ars._commands, "bird", Command)
+
+    # the worker survives a command exiting
+
+    assert ars.run_command(["bird"]) == "arouteserver exited with status 2"
+
+
+def test_run_pool(settings):
+    settings.IXCTL_ARS_RUNNER = "pool"
+    settings.IXCTL_ARS_POOL_SIZE = 1
+
+    try:
+        pool = ars.get_pool()
+        assert ars.get_pool() is pool
+
+        with pytest.raises(OSError, match="Configuration file not found"):
+            ars.run(["bird", "--cfg", "/nonexistent/arouteserver.yml"])
+
+        # the workers are reused
+
+        assert ars.get_pool() is pool
+    finally:
+        ars.close_pool()
+
+
+def test_run_pool_fallback(arouteserver, settings, monkeypatch):
+    settings.IXCTL_ARS_RUNNER = "pool"
+
+    def get_pool():
+        raise OSError("pool unavailable")
+
+    monkeypatch.setattr(ars, "get_pool", get_pool)
+
+    outfile = os.path.join(ars.get_work_dir(), "out.txt")
+    ars.run(["bird", "-o", outfile])
+
+    assert arouteserver.calls == [["arouteserver", "bird", "-o", outfile]]
+
+
+class StuckResult:
+    def get(self, timeout):
+        raise ars.multiprocessing.TimeoutError()
+
+
+class StuckPool:
+    def __init__(self):
+        self.closed = False
+        self.terminated = False
+
+    def apply_async(self, func, args):
+        return StuckResult()
+
+    def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.terminated = True
+
+
+def test_run_pool_timeout(arouteserver, settings, monkeypatch):
+    settings.IXCTL_ARS_RUNNER = "pool"
+
+    pool = StuckPool()
+    monkeypatch.setattr(ars, "get_pool", lambda: pool)
+
+    # a stuck run is not retried through the cli
+
+    with pytest.raises(TimeoutError):
+        ars.run(["bird"])
+
+    assert arouteserver.calls == []
+    assert pool.terminated
+    assert pool not in ars._pool_runs
+
+
+def test_retire_pool_in_flight(monkeypatch):
+    pool = StuckPool()
+    monkeypatch.setattr(ars, "get_pool", lambda: pool)
+
+    with ars.pool_run():
+        with ars.pool_run():
+            ars.retire_pool(pool)
+
+            # other runs on the pool may finish
+
+            assert pool.closed
+            assert not pool.terminated
+
+        assert not pool.terminated
+
+    assert pool.terminated
+    assert pool not in ars._retired_pools
@@ -0,0 +1,156 @@
+import gzip
+import os
+import time
+
+import django_ixctl.artifacts as artifacts
+import django_ixctl.models as models
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_put_read(settings, compress):
+    settings.IXCTL_RSCONF_ARTIFACT_COMPRESS = compress
+
+    digest, size = artifacts.put("config ✓\n")
+
+    assert size == len("config ✓\n".encode("utf-8"))
+    assert artifacts.read(digest) == "config ✓\n"
+
+    path, compressed = artifacts.find(digest)
+    assert compressed == compress
+    assert os.path.basename(os.path.dirname(path)) == digest[:2]
+
+    # same content is stored once
+
+    assert artifacts.put("config ✓\n") == (digest, size)
+
+    with artifacts.open_stream(digest) as fh:
+        assert fh.read() == "config ✓\n".encode("utf-8")
+
+    artifacts.remove(digest)
+
+    with pytest.raises(FileNotFoundError):
+        artifacts.find(digest)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_get_encoded(settings, compress):
+    settings.IXCTL_RSCONF_ARTIFACT_COMPRESS = compress
+
+    digest, size = artifacts.put("config\n" * 100)
+
+    path, encoded_size = artifacts.get_encoded(digest, "gzip")
+    assert path.endswith(".gz")
+    assert encoded_size == os.path.getsize(path)
+
+    with open(path, "rb") as fh:
+        assert gzip.decompress(fh.read()) == b"config\n" * 100
+
+    # compressed artifacts are served as they are stored
+
+    if compress:
+        assert artifacts.find(digest) == (path, True)
+
+    artifacts.remove(digest)
+
+    assert not os.path.exists(path)
+
+    with pytest.raises(FileNotFoundError):
+        artifacts.get_encoded(digest, "gzip")
+
+
+def test_routeserver_config_artifacts(
+    db, pdb_data, account_objects, arouteserver, settings
+):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+
+    assert routeserver_config.body == ""
+    assert routeserver_config.body6 is None
+
+    routeserver_config.generate()
+
+    body = routeserver_config.body
+    digest = routeserver_config.body_digest
+    digest6 = routeserver_config.body6_digest
+
+    assert routeserver_config.body_size == len(body.encode("utf-8"))
+    assert artifacts.read(digest) == body
+
+    # loaded from the artifact store
+
+    routeserver_config = models.RouteserverConfig.objects.get(id=routeserver_config.id)
+    assert routeserver_config.body == body
+    assert routeserver_config.body6 == artifacts.read(routeserver_config.body6_digest)
+
+    # artifacts of replaced configs are removed once stale
+
+    routeserver_config.generate(force=True)
+    assert routeserver_config.body_digest != digest
+    assert routeserver_config.body6_digest != digest6
+
+    assert models.RouteserverConfig.remove_unused_artifacts() == 0
+    artifacts.find(digest)
+
+    later = time.time() + settings.IXCTL_RSCONF_ARTIFACT_GRACE
+    assert models.RouteserverConfig.remove_unused_artifacts(now=later) == 2
+
+    with pytest.raises(FileNotFoundError):
+        artifacts.find(digest)
+    with pytest.raises(FileNotFoundError):
+        artifacts.find(digest6)
+    assert routeserver_config.body == artifacts.read(routeserver_config.body_digest)
+
+
+def test_remove_stale(settings):
+    settings.IXCTL_RSCONF_ARTIFACT_GRACE = 60
+
+    digest, _ = artifacts.put("config\n")
+    path, _ = artifacts.find(digest)
+    artifacts.get_encoded(digest, "gzip")
+
+    assert list(artifacts.iter_digests()) == [digest]
+
+    # storing the same content again refreshes the artifact
+
+    os.utime(path, (1000, 1000))
+    artifacts.put("config\n")
+
+    assert not artifacts.remove_stale(digest)
+    assert artifacts.remove_stale(digest, now=time.time() + 60)
+
+    with pytest.raises(FileNotFoundError):
+        artifacts.find(digest)
+    assert list(artifacts.iter_digests()) == []
+
+
+def test_maybe_remove_unused_artifacts(db, settings):
+    settings.IXCTL_RSCONF_ARTIFACT_GC_INTERVAL = 600
+
+    assert models.RouteserverConfig.maybe_remove_unused_artifacts(now=1000) == 0
+    assert models.RouteserverConfig.maybe_remove_unused_artifacts(now=1300) is None
+    assert models.RouteserverConfig.maybe_remove_unused_artifacts(now=1600) == 0
+
+
+def test_routeserver_config_artifacts_api(
+    db, pdb_data, account_objects, arouteserver, settings
+):
+    settings.IXCTL_RSCONF_ARTIFACT_COMPRESS = True
+
+    rs = account_objects.routeserver
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+    args = (org.slug, ix.slug, rs.name)
+
+    routeserver_config = rs.routeserver_config
+    routeserver_config.generate()
+
+    # streamed from the artifact store
+
+    response = client.get(reverse("ixctl_api:config/routeserver-plain", args=args))
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/plain; charset=utf-8"
+    assert int(response["Content-Length"]) == routeserver_config.body_size
+    assert b"".join(response.streaming_content).decode() == routeserver_config.body
@@ -0,0 +1,184 @@
+"""
+Benchmarks for the export and route server config hot paths
+
+Skipped unless the IXCTL_BENCHMARK environment variable is set.
+
+Synthetic exchanges are generated in the test database for each
+size in IXCTL_BENCHMARK_SIZES (comma separated, defaults to
+100,1000,10000). Wall time, query count and peak memory (tracemalloc)
+are recorded for each hot path and written as json to
+IXCTL_BENCHMARK_OUTPUT (defaults to benchmark.json), so results of
+successive runs can be compared.
+
+Example:
+
+    IXCTL_BENCHMARK=1 pytest tests/test_ixctl_benchmarks.py
+"""
+
+import datetime
+import json
+import os
+import platform
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import django
+import django_ixctl.exporters.ixf as ixf
+import django_ixctl.models as models
+import fullctl.service_bridge.sot as sot
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_ixctl.rest.serializers.ixctl import Serializers
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("IXCTL_BENCHMARK"), reason="IXCTL_BENCHMARK not set"
+)
+
+SIZES = [
+    int(size)
+    for size in os.environ.get("IXCTL_BENCHMARK_SIZES", "100,1000,10000").split(",")
+]
+
+OUTPUT = os.environ.get("IXCTL_BENCHMARK_OUTPUT", "benchmark.json")
+
+RESULTS = []
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_output():
+    yield
+
+    if not RESULTS:
+        return
+
+    with open(OUTPUT, "w") as fh:
+        json.dump(
+            {
+                "meta": {
+                    "timestamp": datetime.datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                },
+                "results": RESULTS,
+            },
+            fh,
+            indent=2,
+        )
+
+
+@pytest.fixture
+def sot_networks(monkeypatch):
+    """
+    Replaces source of truth network lookups with synthetic networks
+    so `preload_networks` does not depend on outside services
+    """
+
+    def objects(self, asns=None, **kwargs):
+        return [
+            SimpleNamespace(
+                asn=asn,
+                source="peerctl",
+                as_set=f"AS-BENCH{asn}",
+                prefix4=100,
+                prefix6=10,
+            )
+            for asn in asns or []
+        ]
+
+    monkeypatch.setattr(sot.Network, "objects", objects)
+
+
+def make_exchange(instance, size):
+    """
+    Creates a synthetic exchange with the specified number of members
+
+    Every member gets an ipv4 and ipv6 address, every other member is
+    a route server peer and every tenth asn has a second connection.
+    """
+
+    ix = models.InternetExchange.objects.create(
+        instance=instance, name=f"Benchmark {size}", slug=f"benchmark-{size}"
+    )
+
+    members = []
+
+    for idx in range(size):
+        asn = 64512 + idx - idx // 10
+        members.append(
+            models.InternetExchangeMember(
+                ix=ix,
+                asn=asn,
+                name=f"Network AS{asn}",
+                ipaddr4=f"10.{idx // 65536}.{idx // 256 % 256}.{idx % 256}",
+                ipaddr6=f"2001:db8::{idx:x}",
+                speed=10000,
+                is_rs_peer=not idx % 2,
+            )
+        )
+
+    models.InternetExchangeMember.objects.bulk_create(members, batch_size=1000)
+
+    return ix
+
+
+def measure(name, size, fn):
+    """
+    Runs `fn` and records wall time, query count and peak memory
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "members": size,
+        "wall_time": round(wall_time, 6),
+        "queries": len(ctx.captured_queries),
+        "peak_memory": peak,
+    }
+
+    RESULTS.append(result)
+    print(json.dumps(result))
+
+    return result
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_benchmark_ixf_export(db, pdb_data, account_objects, size):
+    ix = make_exchange(account_objects.ixctl_instance, size)
+
+    measure("ixf.export", size, lambda: ixf.export(ix))
+    measure("ixf.export_stream", size, lambda: "".join(ixf.export_stream(ix)))
+    measure("ixf.snapshot", size, lambda: ixf.snapshot(ix))
+    measure("ixf.snapshot (cached)", size, lambda: ixf.snapshot(ix))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_benchmark_ars_clients(db, pdb_data, account_objects, sot_networks, size):
+    ix = make_exchange(account_objects.ixctl_instance, size)
+    rs = models.Routeserver.objects.create(
+        ix=ix, name="benchmark", asn=64511, router_id="192.0.2.1"
+    )
+
+    measure("Routeserver.ars_clients", size, lambda: rs.ars_clients)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_benchmark_member_serializer(db, pdb_data, account_objects, sot_networks, size):
+    ix = make_exchange(account_objects.ixctl_instance, size)
+
+    def serialize():
+        queryset = ix.member_set.select_related("ix", "ix__instance")
+        members = models.InternetExchangeMember.preload_networks(queryset)
+        return Serializers.member(instance=members, many=True).data
+
+    measure("Serializers.member", size, serialize)
@@ -0,0 +1,368 @@
+import datetime
+import gzip
+import json
+
+import django_ixctl.exporters.ixf as ixf
+import django_ixctl.models as models
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def add_members(ix, count, asn_start=64500):
+    for idx in range(count):
+        models.InternetExchangeMember.objects.create(
+            ix=ix,
+            asn=asn_start + idx,
+            ipaddr4=f"10.0.{idx // 250}.{idx % 250 + 1}",
+            speed=10000,
+        )
+
+
+def test_ixf_export(db, pdb_data, account_objects):
+    ix = account_objects.ix
+
+    # second connection for an existing member asn
+    models.InternetExchangeMember.objects.create(
+        ix=ix,
+        asn=63311,
+        ipaddr6="2001:504:41:110::99",
+        speed=1000,
+        is_rs_peer=False,
+    )
+
+    data = json.loads(ixf.export(ix))
+
+    assert data["version"] == "0.6"
+    assert data["ixp_list"] == [{"ixp_id": ix.id, "shortname": ix.name}]
+
+    asns = [member["asnum"] for member in data["member_list"]]
+    assert asns == sorted(set(asns))
+
+    member = [m for m in data["member_list"] if m["asnum"] == 63311][0]
+    assert member["member_type"] == "peering"
+    assert len(member["connection_list"]) == ix.member_set.filter(asn=63311).count()
+
+    for conn in member["connection_list"]:
+        assert conn["ixp_id"] == ix.id
+        assert conn["state"] == "active"
+
+    assert {"ipv6": {"address": "2001:504:41:110::99", "routeserver": False}} in [
+        conn["vlan_list"][0] for conn in member["connection_list"]
+    ]
+
+
+def test_ixf_export_query_count(
+    db, pdb_data, account_objects, django_assert_num_queries
+):
+    ix = account_objects.ix
+
+    with django_assert_num_queries(1):
+        ixf.export(ix)
+
+    add_members(ix, 50)
+
+    with django_assert_num_queries(1):
+        data = json.loads(ixf.export(ix))
+
+    assert len(data["member_list"]) == len(
+        set(ix.member_set.values_list("asn", flat=True))
+    )
+
+
+def test_ixf_export_snapshot(db, pdb_data, account_objects):
+    ix = account_objects.ix
+
+    snapshot = ixf.snapshot(ix)
+    assert json.loads(snapshot["body"]) == json.loads(
+        ixf.export(ix, timestamp=snapshot["last_modified"])
+    )
+
+    # cached snapshot is served without touching the member table
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert ixf.snapshot(ix) == snapshot
+
+    assert not [q for q in ctx.captured_queries if "ixctl_member" in q["sql"]]
+
+    # pretty output is cached separately
+
+    pretty = ixf.snapshot(ix, pretty=True)
+    assert pretty["body"] != snapshot["body"]
+    assert json.loads(pretty["body"]) == json.loads(snapshot["body"])
+    assert pretty["version"] == snapshot["version"]
+
+
+def test_ixf_export_snapshot_invalidate(
+    db, pdb_data, account_objects, django_capture_on_commit_callbacks
+):
+    ix = account_objects.ix
+
+    snapshot = ixf.snapshot(ix)
+    pretty = ixf.snapshot(ix, pretty=True)
+
+    # member added, snapshots are invalidated once the change is
+    # committed
+
+    with django_capture_on_commit_callbacks(execute=True):
+        add_members(ix, 1)
+        assert ixf.snapshot(ix) == snapshot
+
+    new_snapshot = ixf.snapshot(ix)
+    assert new_snapshot["version"] != snapshot["version"]
+    assert 64500 in [
+        m["asnum"] for m in json.loads(new_snapshot["body"])["member_list"]
+    ]
+    assert ixf.snapshot(ix, pretty=True)["version"] != pretty["version"]
+
+    # member removed
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ix.member_set.get(asn=64500).delete()
+
+    snapshot = ixf.snapshot(ix)
+    assert snapshot["version"] != new_snapshot["version"]
+    assert 64500 not in [
+        m["asnum"] for m in json.loads(snapshot["body"])["member_list"]
+    ]
+
+    # exchange renamed
+
+    ix.name = "Renamed Exchange"
+    with django_capture_on_commit_callbacks(execute=True):
+        ix.save()
+
+    data = json.loads(ixf.snapshot(ix)["body"])
+    assert data["ixp_list"][0]["shortname"] == "Renamed Exchange"
+
+
+def test_ixf_export_stream(db, pdb_data, account_objects, settings):
+    ix = account_objects.ix
+    add_members(ix, 25)
+
+    settings.IXCTL_IXF_EXPORT_STREAM_CHUNK_SIZE = 10
+
+    timestamp = datetime.datetime.now()
+    chunks = list(ixf.export_stream(ix, timestamp=timestamp))
+
+    assert len(chunks) > 2
+    assert "".join(chunks) == ixf.export(ix, timestamp=timestamp)
+
+
+def test_ixf_export_stream_version(db, pdb_data, account_objects):
+    ix = account_objects.ix
+
+    timestamp = datetime.datetime.now()
+    assert "".join(
+        ixf.export_stream(ix, timestamp=timestamp, version="1.0")
+    ) == ixf.export(ix, timestamp=timestamp, version="1.0")
+
+
+def test_ixf_export_stream_empty(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    ix.member_set.all().delete()
+
+    timestamp = datetime.datetime.now()
+    assert "".join(ixf.export_stream(ix, timestamp=timestamp)) == ixf.export(
+        ix, timestamp=timestamp
+    )
+
+
+def test_ixf_export_snapshot_encoded(db, pdb_data, account_objects):
+    ix = account_objects.ix
+
+    snapshot = ixf.snapshot(ix)
+
+    assert set(snapshot["encoded"].keys()) == set(ixf.EXPORT_ENCODINGS)
+    assert gzip.decompress(snapshot["encoded"]["gzip"]) == snapshot["body"]
+
+    if "br" in ixf.EXPORT_ENCODINGS:
+        assert ixf.brotli.decompress(snapshot["encoded"]["br"]) == snapshot["body"]
+
+
+def test_ixf_export_instance(db, pdb_data, account_objects, django_assert_num_queries):
+    ix = account_objects.ix
+    instance = account_objects.ixctl_instance
+
+    ix_b = models.InternetExchange.objects.create(
+        instance=instance, name="Second Exchange", slug="second"
+    )
+    models.InternetExchangeMember.objects.create(
+        ix=ix_b, asn=63311, ipaddr4="10.1.0.1", speed=1000
+    )
+    add_members(ix_b, 2)
+
+    ix_private = models.InternetExchange.objects.create(
+        instance=instance,
+        name="Private Exchange",
+        slug="private",
+        ixf_export_privacy="private",
+    )
+    models.InternetExchangeMember.objects.create(
+        ix=ix_private, asn=64999, ipaddr4="10.2.0.1", speed=1000
+    )
+
+    with django_assert_num_queries(2):
+        data = json.loads(ixf.export_instance(instance))
+
+    assert data["ixp_list"] == [
+        {"ixp_id": ix.id, "shortname": ix.name},
+        {"ixp_id": ix_b.id, "shortname": ix_b.name},
+    ]
+
+    asns = [member["asnum"] for member in data["member_list"]]
+    assert asns == sorted(set(asns))
+    assert 64999 not in asns
+
+    member = [m for m in data["member_list"] if m["asnum"] == 63311][0]
+    assert {conn["ixp_id"] for conn in member["connection_list"]} == {
+        ix.id,
+        ix_b.id,
+    }
+
+
+def test_ixf_export_delta(db, pdb_data, account_objects, django_assert_num_queries):
+    ix = account_objects.ix
+
+    cursor = ix.member_change_set.order_by("-id").values_list("id", flat=True).first()
+
+    with django_assert_num_queries(1):
+        data = json.loads(ixf.export_delta(ix, cursor=cursor))
+
+    assert data["added"] == data["changed"] == data["removed"] == []
+    assert ixf.decode_cursor(data["cursor"]) == cursor
+    assert not data["more"]
+
+    add_members(ix, 3)
+
+    changed = ix.member_set.get(asn=64500)
+    changed.speed = 100000
+    changed.save()
+
+    removed = ix.member_set.get(asn=64501)
+    removed_id = removed.id
+    removed.delete()
+
+    existing = ix.member_set.exclude(asn__in=[64500, 64501, 64502]).first()
+    existing.speed = 1000
+    existing.save()
+
+    existing_removed = (
+        ix.member_set.exclude(asn__in=[64500, 64501, 64502])
+        .exclude(id=existing.id)
+        .first()
+    )
+    existing_removed_id = existing_removed.id
+    existing_removed.delete()
+
+    with django_assert_num_queries(2):
+        data = json.loads(ixf.export_delta(ix, cursor=cursor))
+
+    # added and changed again within the window is listed as added,
+    # added and removed again within the window is not listed at all
+
+    assert [m["asnum"] for m in data["added"]] == [64500, 64502]
+    assert data["added"][0]["connection"]["if_list"] == [{"if_speed": 100000}]
+    assert [m["member_id"] for m in data["changed"]] == [existing.id]
+    assert data["removed"] == [
+        {"member_id": existing_removed_id, "asnum": existing_removed.asn}
+    ]
+    assert removed_id not in [m["member_id"] for m in data["added"]]
+
+    # nothing changed since the returned cursor
+
+    data = json.loads(ixf.export_delta(ix, cursor=ixf.decode_cursor(data["cursor"])))
+    assert data["added"] == data["changed"] == data["removed"] == []
+
+
+def test_ixf_export_delta_limit(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    cursor = ix.member_change_set.order_by("-id").values_list("id", flat=True).first()
+
+    add_members(ix, 5)
+
+    asns = []
+
+    while True:
+        data = json.loads(ixf.export_delta(ix, cursor=cursor, limit=2))
+        asns += [m["asnum"] for m in data["added"]]
+        cursor = ixf.decode_cursor(data["cursor"])
+        if not data["more"]:
+            break
+
+    assert asns == list(range(64500, 64505))
+
+
+def test_ixf_export_delta_cursor():
+    assert ixf.decode_cursor(ixf.encode_cursor(12345)) == 12345
+
+    for cursor in ["", "invalid", ixf.encode_cursor(1)[:-1] + "!"]:
+        try:
+            ixf.decode_cursor(cursor)
+            assert False, cursor
+        except ValueError:
+            pass
+
+
+def test_ixf_export_versions(db, pdb_data, account_objects):
+    ix = account_objects.ix
+
+    member = ix.member_set.first()
+    member.name = "Test Network"
+    member.macaddr = "00:0a:95:9d:68:16"
+    member.as_macro_override = "AS-TEST"
+    member.save()
+
+    rows = list(ixf.member_rows(ix.member_set.all()))
+
+    data = json.loads(ixf.export(ix, rows=rows))
+    assert data == json.loads(ixf.export(ix))
+    assert "name" not in data["member_list"][0]
+
+    for version in ["0.7", "1.0"]:
+        data = json.loads(ixf.export(ix, version=version, rows=rows))
+        assert data["version"] == version
+
+        entry = [m for m in data["member_list"] if m["asnum"] == member.asn][0]
+        assert entry["name"] == "Test Network"
+
+        vlans = [conn["vlan_list"][0] for conn in entry["connection_list"]]
+        assert {
+            "address": f"{member.ipaddr4}",
+            "routeserver": member.is_rs_peer,
+            "as_macro": "AS-TEST",
+            "mac_addresses": ["00:0a:95:9d:68:16"],
+        } in [vlan["ipv4"] for vlan in vlans if "ipv4" in vlan]
+
+    try:
+        ixf.export(ix, version="0.1")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_ixf_export_snapshot_versions(
+    db, pdb_data, account_objects, django_capture_on_commit_callbacks
+):
+    ix = account_objects.ix
+
+    snapshot = ixf.snapshot(ix)
+
+    # other schema versions are rendered from the cached member rows
+
+    with CaptureQueriesContext(connection) as ctx:
+        snapshot_10 = ixf.snapshot(ix, version="1.0")
+
+    assert not [q for q in ctx.captured_queries if "ixctl_member" in q["sql"]]
+
+    assert json.loads(snapshot["body"])["version"] == "0.6"
+    assert json.loads(snapshot_10["body"])["version"] == "1.0"
+    assert ixf.snapshot(ix, version="1.0") == snapshot_10
+    assert ixf.snapshot(ix) == snapshot
+
+    with django_capture_on_commit_callbacks(execute=True):
+        add_members(ix, 1)
+
+    assert 64500 in [
+        m["asnum"]
+        for m in json.loads(ixf.snapshot(ix, version="1.0")["body"])["member_list"]
+    ]
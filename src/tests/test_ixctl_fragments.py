@@ -0,0 +1,225 @@
+import os
+import time
+
+import django_ixctl.artifacts as artifacts
+import django_ixctl.fragments as fragments
+import django_ixctl.models as models
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "data", "rs", "bird-clients.conf")
+
+
+def read_sample():
+    with open(SAMPLE) as fh:
+        return fh.read()
+
+
+def test_split_config():
+    body = read_sample()
+
+    parts = fragments.split_config(body, "/srv/bird/etc/clients")
+
+    assert sorted(parts) == ["AS64500", "AS64501", "main"]
+    assert fragments.assemble(parts) == body
+
+    # all sections of an asn end up in its fragment, included once
+
+    assert "protocol bgp AS64500_1 {" in parts["AS64500"]
+    assert "protocol bgp AS64500_2 {" in parts["AS64500"]
+    assert parts["AS64501"].startswith("# AS-SET for AS64501_1\n")
+    assert parts["AS64501"].endswith('\tpassword "secret";\n}\n')
+
+    assert 'include "/srv/bird/etc/clients/AS64500.conf";\n' in parts["main"]
+    assert parts["main"].count("include") == 2
+    assert "router id 192.0.2.1;" in parts["main"]
+    assert parts["main"].endswith("# footer\n")
+
+    parts = fragments.split_config(
+        body, "/srv/bird/etc/clients", ip_version=6, split_ip_versions=True
+    )
+    assert 'include "/srv/bird/etc/clients/AS64500.ipv6.conf";\n' in parts["main"]
+    assert fragments.assemble(parts) == body
+
+    # the ixctl header is left out, so the main file does not change
+    # with the generation time
+
+    header = "# generated by ixctl-1.0.0 at 2026-10-18T12:00:00.000001\n"
+    assert fragments.split_config(header + body, "/tmp") == fragments.split_config(
+        body, "/tmp"
+    )
+
+
+def test_split_config_unexpected():
+    # client section without a closing brace
+
+    assert fragments.split_config("# AS-SET for AS64500_1\n", "/tmp") is None
+
+    # sections of an asn separated by other config
+
+    body = (
+        "# AS-SET for AS64500_1\nprotocol bgp AS64500_1 {\n}\n"
+        "define X = 1;\n"
+        "# AS-SET for AS64500_2\nprotocol bgp AS64500_2 {\n}\n"
+    )
+    assert fragments.split_config(body, "/tmp") is None
+
+    # no client sections
+
+    assert fragments.split_config("# config\n", "/tmp") == {"main": "# config\n"}
+
+
+def test_update_fragments(db, pdb_data, account_objects, arouteserver):
+    rs = account_objects.routeserver
+    rs.ars_type = "bird2"
+    rs.save()
+
+    routeserver_config = rs.routeserver_config
+    arouteserver.output = read_sample()
+
+    routeserver_config.generate()
+
+    def get_fragments():
+        return {
+            fragment.name: fragment
+            for fragment in routeserver_config.fragment_set.all()
+        }
+
+    initial = get_fragments()
+    assert sorted(initial) == ["AS64500", "AS64501", "main"]
+    assert {fragment.ip_version for fragment in initial.values()} == {4}
+    assert fragments.assemble(
+        {name: fragment.body for name, fragment in initial.items()}
+    ) == fragments.HEADER_RE.sub("", routeserver_config.body, count=1)
+
+    # only the fragment of the changed client is rewritten
+
+    arouteserver.output = arouteserver.output.replace("secret", "changed")
+    routeserver_config.generate(force=True)
+
+    current = get_fragments()
+    assert current["AS64500"].updated == initial["AS64500"].updated
+    assert current["AS64501"].updated > initial["AS64501"].updated
+    assert current["AS64501"].digest != initial["AS64501"].digest
+    assert current["main"].updated == initial["main"].updated
+    assert current["main"].digest == initial["main"].digest
+
+    # content is kept in the artifact store
+
+    assert (
+        current["AS64501"].body
+        == fragments.split_config(
+            routeserver_config.body, settings.IXCTL_RSCONF_FRAGMENT_DIR
+        )["AS64501"]
+    )
+
+    # removed clients
+
+    arouteserver.output = arouteserver.output.split("# AS-SET for AS64501_1")[0]
+    routeserver_config.generate(force=True)
+
+    assert sorted(get_fragments()) == ["AS64500", "main"]
+
+    # content of replaced and removed fragments is removed once stale
+
+    later = time.time() + settings.IXCTL_RSCONF_ARTIFACT_GRACE
+    models.RouteserverConfig.remove_unused_artifacts(now=later)
+
+    for digest in (initial["AS64501"].digest, current["AS64501"].digest):
+        with pytest.raises(FileNotFoundError):
+            artifacts.find(digest)
+    for fragment in get_fragments().values():
+        assert fragment.body
+
+
+def test_update_fragments_ip_versions(db, pdb_data, account_objects, arouteserver):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    arouteserver.output = read_sample()
+
+    routeserver_config.generate()
+
+    assert sorted(
+        (fragment.ip_version, fragment.filename)
+        for fragment in routeserver_config.fragment_set.all()
+    ) == [
+        (4, "AS64500.conf"),
+        (4, "AS64501.conf"),
+        (4, "main.conf"),
+        (6, "AS64500.ipv6.conf"),
+        (6, "AS64501.ipv6.conf"),
+        (6, "main.ipv6.conf"),
+    ]
+
+
+def test_update_fragments_openbgpd(db, pdb_data, account_objects, arouteserver):
+    rs = account_objects.routeserver
+    rs.ars_type = "openbgpd"
+    rs.save()
+
+    arouteserver.output = read_sample()
+    rs.routeserver_config.generate()
+
+    assert not rs.routeserver_config.fragment_set.exists()
+
+
+def test_fragments_api(db, pdb_data, account_objects, arouteserver):
+    rs = account_objects.routeserver
+    rs.ars_type = "bird2"
+    rs.save()
+
+    ix = account_objects.ix
+    client = account_objects.api_client
+    org = account_objects.org
+    args = (org.slug, ix.slug, rs.name)
+
+    arouteserver.output = read_sample()
+    rs.routeserver_config.generate()
+
+    url = reverse("ixctl_api:config/routeserver-fragments", args=args)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["filename"] for row in data] == [
+        "AS64500.conf",
+        "AS64501.conf",
+        "main.conf",
+    ]
+
+    fragment = rs.routeserver_config.fragment_set.get(name="AS64501")
+    assert data[1]["digest"] == fragment.digest
+
+    # changed since
+
+    since = fragment.updated.isoformat()
+    response = client.get(url, {"since": since})
+    assert response.json()["data"] == []
+
+    assert client.get(url, {"since": "invalid"}).status_code == 400
+
+    # fragment content
+
+    url = reverse("ixctl_api:config/routeserver-fragment", args=args)
+
+    response = client.get(url, {"fragment": "AS64501"})
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content).decode() == fragment.body
+    assert response.headers["ETag"] == f'"{fragment.digest}"'
+
+    # unchanged fragments are not sent again
+
+    response = client.get(
+        url, {"fragment": "AS64501"}, HTTP_IF_NONE_MATCH=f'"{fragment.digest}"'
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{fragment.digest}"'
+    assert not response.content
+
+    response = client.get(url, {"fragment": "AS64501"}, HTTP_IF_NONE_MATCH='"other"')
+    assert response.status_code == 200
+
+    assert client.get(url, {"fragment": "AS64502"}).status_code == 404
+    assert (
+        client.get(url, {"fragment": "AS64501", "ip_version": "x"}).status_code == 404
+    )
@@ -0,0 +1,124 @@
+import json
+
+import django_ixctl.history as history
+import django_ixctl.models as models
+import pytest
+import reversion
+from reversion.models import Version
+
+
+@pytest.mark.parametrize(
+    "old,new",
+    [
+        ("", ""),
+        ("", "a\nb\n"),
+        ("a\nb\n", ""),
+        ("a\nb\nc\n", "a\nx\nc\nd"),
+        ("a\nb\nc", "b\nc\nc\n"),
+        ("a\na\na\n", "a\na\n"),
+        ("x\na\nb\ny\n", "x\nb\na\ny\n"),
+    ],
+)
+def test_delta(old, new):
+    delta = history.make_delta(old, new)
+    assert history.apply_delta(old, delta) == new
+
+
+def test_delta_size():
+    old = "".join(f"line {i}\n" for i in range(1000))
+    new = old.replace("line 500\n", "changed\n")
+
+    delta = history.make_delta(old, new)
+    assert delta == [["=", 0, 500], ["+", ["changed\n"]], ["=", 501, 1000]]
+
+
+def test_routeserver_config_history(
+    db, pdb_data, account_objects, arouteserver, settings
+):
+    settings.IXCTL_RSCONF_HISTORY_FULL_INTERVAL = 3
+    settings.IXCTL_RSCONF_HISTORY_KEEP = 4
+
+    routeserver_config = account_objects.routeserver.routeserver_config
+    versions = {}
+
+    for _ in range(8):
+        routeserver_config.generate(force=True)
+        entry = routeserver_config.history_set.order_by("-id").first()
+        versions[entry.id] = {
+            field: getattr(routeserver_config, field) for field in history.FIELDS
+        }
+
+    # unchanged inputs are not recorded
+
+    assert routeserver_config.generate() == "no-op"
+
+    entries = list(routeserver_config.history_set.order_by("id"))
+
+    # the 4 most recent versions are kept, plus the full entry
+    # the oldest of them is a delta against
+
+    assert [entry.full for entry in entries] == [True, False, False, True, False]
+    assert [entry.id for entry in entries] == list(versions)[3:]
+
+    for entry in entries:
+        assert entry.rebuild() == versions[entry.id]
+        assert entry.size == sum(
+            len(value.encode("utf-8")) for value in versions[entry.id].values()
+        )
+
+
+def test_routeserver_config_history_previous(
+    db, pdb_data, account_objects, arouteserver, monkeypatch
+):
+    routeserver_config = account_objects.routeserver.routeserver_config
+
+    arouteserver.output = "".join(f"line {i}\n" for i in range(100))
+    routeserver_config.generate()
+
+    rebuilds = []
+    rebuild = models.RouteserverConfigHistory.rebuild
+
+    def counting_rebuild(self):
+        rebuilds.append(self.id)
+        return rebuild(self)
+
+    monkeypatch.setattr(models.RouteserverConfigHistory, "rebuild", counting_rebuild)
+
+    # deltas are made against the version the generation replaces,
+    # without rebuilding it from the history
+
+    arouteserver.output = arouteserver.output.replace("line 50\n", "changé\n")
+    routeserver_config.generate(force=True)
+
+    assert not rebuilds
+
+    # history not written by the previous generation
+
+    last = routeserver_config.history_set.order_by("-id").first()
+    routeserver_config.history_set.update(input_hash="other")
+
+    arouteserver.output += "added\n"
+    routeserver_config.generate(force=True)
+
+    assert rebuilds == [last.id]
+
+    entry = routeserver_config.history_set.order_by("-id").first()
+    assert not entry.full
+    assert entry.rebuild() == routeserver_config.get_history_values()
+    assert last.rebuild()["body"].count("changé") == 1
+
+
+def test_routeserver_config_reversion(db, pdb_data, account_objects):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    routeserver_config.body = "config"
+
+    with reversion.create_revision():
+        routeserver_config.save()
+
+    version = Version.objects.get_for_object(routeserver_config).first()
+    fields = json.loads(version.serialized_data)[0]["fields"]
+
+    assert routeserver_config.body_digest
+    for field in models.RSCONF_CONTENT_FIELDS:
+        assert field not in fields
+    assert "generated" in fields
@@ -0,0 +1,165 @@
+import io
+import json
+
+import django_ixctl.exporters.ixf as ixf
+import django_ixctl.importers.members as importers
+import django_ixctl.models as models
+import pytest
+
+CSV_HEADER = "asn,name,ipaddr4,ipaddr6,speed,is_rs_peer\n"
+
+
+def csv_rows(*lines):
+    return importers.parse(io.StringIO(CSV_HEADER + "\n".join(lines)), "csv")
+
+
+def test_import_members_csv(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    existing = ix.member_set.filter(ipaddr4__isnull=False).first()
+    count = ix.member_set.count()
+
+    result = importers.import_members(
+        ix,
+        csv_rows(
+            "64500,New Network,10.0.0.1,,10000,true",
+            "64501,,,2001:db8::1,1000,false",
+            f"{existing.asn},Renamed,{existing.ipaddr4},,{existing.speed},false",
+        ),
+    )
+
+    assert result == {"created": 2, "updated": 1}
+    assert ix.member_set.count() == count + 2
+
+    member = ix.member_set.get(asn=64500)
+    assert member.name == "New Network"
+    assert member.is_rs_peer
+    assert member.speed == 10000
+
+    existing.refresh_from_db()
+    assert existing.name == "Renamed"
+    assert not existing.is_rs_peer
+
+    # unchanged rows are not written again
+
+    assert importers.import_members(
+        ix, csv_rows("64500,New Network,10.0.0.1,,10000,true")
+    ) == {"created": 0, "updated": 0}
+
+
+def test_import_members_validation(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    member_a, member_b = ix.member_set.order_by("id")[:2]
+    count = ix.member_set.count()
+
+    with pytest.raises(importers.MemberImportError) as exc:
+        importers.import_members(
+            ix,
+            csv_rows(
+                "64500,,10.0.0.1,,10000,",
+                "64501,,10.0.0.1,,10000,",
+                "64502,,,,10000,",
+                "invalid,,10.0.0.2,,10000,",
+                "64503,,2001:db8::1,,10000,",
+                f"64504,,{member_a.ipaddr4},{member_b.ipaddr6},10000,",
+            ),
+        )
+
+    assert exc.value.errors == [
+        "Row 2: ipaddr4 10.0.0.1 appears more than once",
+        "Row 3: Input required for IPv4 or IPv6",
+        "Row 4: Invalid asn: invalid",
+        "Row 5: Not an IPv4 address: 2001:db8::1",
+        "Row 6: IPv4 and IPv6 address belong to different members",
+    ]
+
+    # nothing is written
+
+    assert ix.member_set.count() == count
+
+
+def test_import_members_limit(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    count = ix.member_set.count()
+
+    with pytest.raises(importers.MemberImportError):
+        importers.import_members(
+            ix,
+            csv_rows("64500,,10.0.0.1,,10000,", "64501,,10.0.0.2,,10000,"),
+            max_members=count + 1,
+        )
+
+    assert ix.member_set.count() == count
+
+
+def test_import_members_side_effects(
+    db, pdb_data, account_objects, django_assert_max_num_queries
+):
+    ix = account_objects.ix
+    rs = account_objects.routeserver
+    last_change = ix.member_change_set.order_by("-id").first().id
+
+    snapshot = ixf.snapshot(ix)
+
+    lines = [
+        f"{64500 + idx},,10.0.{idx // 250}.{idx % 250 + 1},,1000," for idx in range(100)
+    ]
+
+    # query count does not depend on the number of rows
+
+    with django_assert_max_num_queries(30):
+        importers.import_members(ix, csv_rows(*lines), batch_size=50)
+
+    assert ix.member_change_set.filter(id__gt=last_change, action="add").count() == 100
+    assert ixf.snapshot(ix)["version"] != snapshot["version"]
+
+    rs.routeserver_config.refresh_from_db()
+    assert rs.routeserver_config.task
+
+
+def test_import_members_ixf(db, pdb_data, account_objects):
+    ix = account_objects.ix
+    other = models.InternetExchange.objects.create(
+        instance=account_objects.ixctl_instance, name="Other", slug="other"
+    )
+
+    member = ix.member_set.first()
+    member.name = "Test Network"
+    member.macaddr = "00:0a:95:9d:68:16"
+    member.save()
+
+    data = ixf.export(ix, version="1.0")
+
+    result = importers.import_members(
+        other, importers.parse(io.BytesIO(data.encode()), "ixf", ixp_id=ix.id)
+    )
+
+    assert result == {"created": ix.member_set.count(), "updated": 0}
+
+    assert json.loads(ixf.export(other, version="1.0"))["member_list"] == [
+        {
+            **entry,
+            "connection_list": [
+                {**conn, "ixp_id": other.id} for conn in entry["connection_list"]
+            ],
+        }
+        for entry in json.loads(data)["member_list"]
+    ]
+
+    # connections at other exchanges are skipped
+
+    result = importers.import_members(
+        other, importers.parse(io.BytesIO(data.encode()), "ixf", ixp_id=0)
+    )
+    assert result == {"created": 0, "updated": 0}
+
+
+def test_iter_ixf_members(monkeypatch):
+    data = json.dumps({"member_list": [{"asnum": 64500}, {"asnum": 64501}]})
+
+    members = list(importers.iter_ixf_members(io.BytesIO(data.encode())))
+    assert [member["asnum"] for member in members] == [64500, 64501]
+
+    # without ijson the whole file is loaded
+
+    monkeypatch.setattr(importers, "ijson", None)
+    assert list(importers.iter_ixf_members(io.BytesIO(data.encode()))) == members
@@ -0,0 +1,175 @@
+import json
+import os
+
+import django_ixctl.ars as ars
+import django_ixctl.irr as irr
+import django_ixctl.models as models
+import pytest
+from django.core.management import call_command
+from pierky.arouteserver.irrdb import ASSet, RSet
+
+SAMPLE_DB = os.path.join(os.path.dirname(__file__), "data", "irr", "sample.db")
+
+
+@pytest.fixture
+def irr_data(db):
+    with irr.open_dump(SAMPLE_DB) as fh:
+        return irr.import_rpsl(fh)
+
+
+def test_parse_rpsl():
+    with irr.open_dump(SAMPLE_DB) as fh:
+        objects = list(irr.parse_rpsl(fh))
+
+    assert [object_class for object_class, _ in objects] == [
+        "as-set",
+        "as-set",
+        "route",
+        "route",
+        "route",
+        "route6",
+        "route",
+    ]
+
+    object_class, attrs = objects[0]
+    assert attrs["as-set"] == ["AS-TEST"]
+    assert irr.split_members(attrs["members"]) == [
+        "AS64500",
+        "AS64501",
+        "AS-TEST-NESTED",
+        "AS64502",
+    ]
+
+
+def test_import_rpsl(irr_data):
+    assert irr_data == {"as-set": 2, "route": 3, "route6": 1}
+
+    source = models.IrrSource.objects.get(name="TEST")
+    assert source.imported
+    assert source.as_set_set.count() == 2
+    assert source.route_set.count() == 4
+
+    # importing again replaces the objects of the source
+
+    with irr.open_dump(SAMPLE_DB) as fh:
+        irr.import_rpsl(fh)
+
+    assert source.as_set_set.count() == 2
+    assert source.route_set.count() == 4
+
+    # objects without a source attribute
+
+    with pytest.raises(ValueError):
+        irr.import_rpsl(["as-set: AS-NOSOURCE\n", "members: AS1\n"])
+
+    irr.import_rpsl(["as-set: AS-NOSOURCE\n", "members: AS1\n"], default_source="x")
+    assert models.IrrAsSet.objects.get(name="AS-NOSOURCE").source.name == "X"
+
+
+def test_resolver(irr_data, django_assert_num_queries):
+    resolver = irr.Resolver()
+
+    # nested as-sets are expanded one level per query, loops are ignored
+
+    with django_assert_num_queries(2):
+        asns = resolver.expand(["AS-TEST"])
+
+    assert asns == [64500, 64501, 64502, 64510]
+
+    with django_assert_num_queries(0):
+        assert resolver.expand(["AS-TEST-NESTED", "AS64599"]) == asns + [64599]
+
+    assert resolver.expand(["TEST::AS-TEST"]) == asns
+    assert resolver.expand(["OTHER::AS-TEST"]) == []
+    assert resolver.expand(["AS-UNKNOWN", "AS64599"]) == [64599]
+
+    with django_assert_num_queries(1):
+        assert [f"{prefix}" for prefix in resolver.prefixes(asns, 4)] == [
+            "192.0.2.0/24",
+            "198.51.100.0/24",
+        ]
+
+    assert [f"{prefix}" for prefix in resolver.prefixes(asns, 6)] == ["2001:db8::/32"]
+
+
+def test_seed_cache(irr_data, tmp_path):
+    cache_dir = str(tmp_path)
+
+    ars_clients = {
+        "asns": {},
+        "clients": [
+            {
+                "asn": 64500,
+                "ip": ["192.0.2.1"],
+                "cfg": {"filtering": {"irrdb": {"as_sets": ["AS-TEST"]}}},
+            },
+            {"asn": 64599, "ip": ["192.0.2.2"], "cfg": {}},
+        ],
+    }
+
+    assert irr.seed_cache(cache_dir, {"cfg": {}}, ars_clients) == 3
+
+    # arouteserver finds the resolved data in its cache
+
+    kwargs = {"cache_dir": cache_dir, "bgpq3_path": "bgpq4"}
+
+    as_set = ASSet(["AS-TEST"], **kwargs)
+    assert as_set.load_data_from_cache()
+    assert as_set.raw_data == [64500, 64501, 64502, 64510]
+
+    r_set = RSet(["AS-TEST"], 4, False, **kwargs)
+    assert r_set.load_data_from_cache()
+    assert [(p["prefix"], p["length"], p["exact"]) for p in r_set.raw_data] == [
+        ("192.0.2.0", 24, True),
+        ("198.51.100.0", 24, True),
+    ]
+
+    r_set = RSet(["AS64599"], 4, False, **kwargs)
+    assert r_set.load_data_from_cache()
+    assert [p["prefix"] for p in r_set.raw_data] == ["203.0.113.0"]
+
+    # longer prefixes
+
+    irr.seed_cache(
+        cache_dir,
+        {"cfg": {"filtering": {"irrdb": {"allow_longer_prefixes": True}}}},
+        ars_clients,
+    )
+
+    r_set = RSet(["AS-TEST"], 6, True, **kwargs)
+    assert r_set.load_data_from_cache()
+    assert [(p["prefix"], p["exact"], p["le"]) for p in r_set.raw_data] == [
+        ("2001:db8::", False, 128)
+    ]
+
+
+def test_generate_irr_local(
+    irr_data, pdb_data, account_objects, arouteserver, settings
+):
+    settings.IXCTL_IRR_LOCAL = True
+
+    rs = account_objects.routeserver
+    rs.ix.member_set.filter(is_rs_peer=True).update(as_macro_override="AS-TEST")
+
+    routeserver_config = rs.routeserver_config
+    assert routeserver_config.generate() == "generated"
+
+    cache_dir = ars.get_cache_dir()
+    with open(os.path.join(cache_dir, "AS_TEST-as_set.json")) as fh:
+        assert json.load(fh)["data"] == [64500, 64501, 64502, 64510]
+
+    assert routeserver_config.generate() == "no-op"
+
+    # newly imported IRR data is picked up
+
+    with irr.open_dump(SAMPLE_DB) as fh:
+        irr.import_rpsl(fh)
+
+    assert routeserver_config.generate() == "generated"
+
+
+def test_irr_import_command(db, capsys):
+    call_command("ixctl_irr_import", SAMPLE_DB)
+
+    assert "2 as-set, 3 route, 1 route6" in capsys.readouterr().out
+    assert models.IrrRoute.objects.count() == 4
@@ -0,0 +1,139 @@
+import contextlib
+
+import django_ixctl.longpoll as longpoll
+import pytest
+from django.urls import reverse
+
+
+def wait_url(account_objects):
+    rs = account_objects.routeserver
+    # config is created on first access
+    rs.routeserver_config
+    ix = account_objects.ix
+    org = account_objects.org
+    return reverse(
+        "ixctl_api:config/routeserver-wait", args=(org.slug, ix.slug, rs.name)
+    )
+
+
+def test_get_timeout(settings):
+    settings.IXCTL_RSCONF_WAIT_TIMEOUT = 30
+
+    assert longpoll.get_timeout() == 30
+    assert longpoll.get_timeout("10") == 10
+    assert longpoll.get_timeout("120") == 30
+
+    with pytest.raises(ValueError):
+        longpoll.get_timeout("-1")
+
+    with pytest.raises(ValueError):
+        longpoll.get_timeout("soon")
+
+    with pytest.raises(ValueError):
+        longpoll.get_timeout("nan")
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["abc", '"abc"', 'W/"abc"', '"abc-gzip"', 'W/"abc-zstd"', '"abc-br"'],
+)
+def test_normalize_digest(value):
+    assert longpoll.normalize_digest(value) == "abc"
+
+
+def test_routeserverconfig_wait(db, pdb_data, account_objects, arouteserver):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    client = account_objects.api_client
+    url = wait_url(account_objects)
+
+    routeserver_config.generate()
+    digest = routeserver_config.body_digest
+
+    # agent has an outdated config
+
+    response = client.get(url, {"digest": "outdated", "timeout": 0})
+    assert response.status_code == 200
+    data = response.json()["data"][0]
+    assert data["digest"] == digest
+    assert data["size"] == routeserver_config.body_size
+    assert data["ip_version"] == 4
+
+    # each ip version has its own digest
+
+    response = client.get(url, {"digest": digest, "ip_version": 6, "timeout": 0})
+    assert response.status_code == 200
+    assert response.json()["data"][0]["digest"] == routeserver_config.body6_digest
+
+    # no change within the timeout
+
+    response = client.get(url, {"digest": digest, "timeout": 0})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{digest}"'
+
+    # the ETag of the plain config can be passed as it is
+
+    response = client.get(url, {"digest": f'"{digest}"', "timeout": 0})
+    assert response.status_code == 304
+
+    # as well as the ETag of an encoded config
+
+    for etag in (f'"{digest}-gzip"', f'W/"{digest}-zstd"'):
+        response = client.get(url, {"digest": etag, "timeout": 0})
+        assert response.status_code == 304
+
+
+def test_routeserverconfig_wait_change(
+    db, pdb_data, account_objects, arouteserver, monkeypatch
+):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    client = account_objects.api_client
+    url = wait_url(account_objects)
+
+    routeserver_config.generate()
+    digest = routeserver_config.body_digest
+
+    # config is regenerated while the agent waits
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            routeserver_config.body = "changed"
+            routeserver_config.save()
+
+    monkeypatch.setattr(longpoll.time, "sleep", sleep)
+
+    response = client.get(url, {"digest": digest, "timeout": 30})
+    assert response.status_code == 200
+    assert response.json()["data"][0]["digest"] == routeserver_config.body_digest
+    assert routeserver_config.body_digest != digest
+    assert len(sleeps) == 2
+
+
+def test_routeserverconfig_wait_full(
+    db, pdb_data, account_objects, arouteserver, settings
+):
+    client = account_objects.api_client
+    url = wait_url(account_objects)
+
+    with contextlib.ExitStack() as stack:
+        for _ in range(settings.IXCTL_RSCONF_WAIT_MAX_WAITERS):
+            stack.enter_context(longpoll.waiter())
+
+        response = client.get(url, {"timeout": 0})
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+    # slots are released
+
+    response = client.get(url, {"timeout": 0})
+    assert response.status_code == 304
+
+
+def test_routeserverconfig_wait_invalid(db, pdb_data, account_objects):
+    client = account_objects.api_client
+    url = wait_url(account_objects)
+
+    assert client.get(url, {"timeout": "soon"}).status_code == 400
+    assert client.get(url, {"ip_version": 5}).status_code == 400
@@ -1,6 +1,7 @@
 import django_ixctl.models as models
 import pytest
 from django.core.management import call_command
+from django.core.management.base import CommandError
 
 
 @pytest.mark.skip
@@ -24,3 +25,91 @@ def test_routeserver_config_generate_outdated(db, pdb_data, account_objects, cap
     rs.save()
     call_command("ixctl_routeserver_config_generate")
     assert models.RouteserverConfig.objects.count() == 1
+
+
+def test_member_import(db, pdb_data, account_objects, tmp_path, capsys):
+    ix = account_objects.ix
+    count = ix.member_set.count()
+
+    path = tmp_path / "members.csv"
+    path.write_text("asn,ipaddr4,speed\n64500,10.0.0.1,1000\n64501,10.0.0.2,1000\n")
+
+    call_command("ixctl_member_import", ix.id, str(path))
+
+    assert ix.member_set.count() == count + 2
+    assert "Created 2 and updated 0 members" in capsys.readouterr().out
+
+    path.write_text("asn,ipaddr4,speed\n64502,10.0.0.1,1000\n64503,10.0.0.1,1000\n")
+
+    with pytest.raises(CommandError):
+        call_command("ixctl_member_import", ix.id, str(path))
+
+    assert ix.member_set.count() == count + 2
+
+
+def test_rsconf_generate(db, pdb_data, account_objects, arouteserver, capsys):
+    rs = account_objects.routeserver
+
+    call_command("ixctl_rsconf_generate", force=True)
+
+    assert rs.routeserver_config.body
+
+    # bird v1, one run per ip version
+
+    assert len(arouteserver.calls) == 2
+
+    out = capsys.readouterr().out
+    assert f"Regenerated {rs} in" in out
+    assert "Processed 1 route servers" in out
+
+    # failed generation is summarized and raises
+
+    arouteserver.returncode = 1
+
+    with pytest.raises(CommandError):
+        call_command("ixctl_rsconf_generate", force=True)
+
+    captured = capsys.readouterr()
+    assert f"- {rs}: Process returned 1" in captured.err
+    assert "1 failed" in captured.out
+
+
+def test_rsconf_generate_outdated(db, pdb_data, account_objects, arouteserver, capsys):
+    rs = account_objects.routeserver
+    models.RouteserverConfig.objects.filter(routeserver=rs).delete()
+
+    # missing config is created and generated
+
+    call_command("ixctl_rsconf_generate")
+    assert len(arouteserver.calls) == 2
+
+    # up to date config is left alone
+
+    call_command("ixctl_rsconf_generate")
+    assert len(arouteserver.calls) == 2
+    assert "Processed 0 route servers" in capsys.readouterr().out
+
+    rs.ars_type = "bird2"
+    rs.save()
+
+    call_command("ixctl_rsconf_generate")
+    assert len(arouteserver.calls) == 3
+
+
+def test_rsconf_generate_jobs(
+    transactional_db, pdb_data, account_objects, arouteserver, capsys
+):
+    rs = account_objects.routeserver
+    rs_b = models.Routeserver.objects.create(
+        ix=rs.ix, name="rs2", asn=rs.asn, router_id="192.0.2.2"
+    )
+
+    call_command("ixctl_rsconf_generate", force=True, jobs=2)
+
+    for routeserver in (rs, rs_b):
+        routeserver_config = models.RouteserverConfig.objects.get(
+            routeserver=routeserver
+        )
+        assert routeserver_config.body
+
+    assert "Processed 2 route servers" in capsys.readouterr().out
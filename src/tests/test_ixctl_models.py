@@ -1,10 +1,14 @@
 import json
 import os
+from datetime import timedelta
 
+import django_ixctl.artifacts
 import django_ixctl.models as models
 import pytest
 from django.core.exceptions import ValidationError
 from django.urls import reverse
+from django.utils import timezone
+from fullctl.django.models.concrete.tasks import WorkerUnqualified
 from fullctl.service_bridge.pdbctl import NetworkIXLan
 
 
@@ -184,6 +188,74 @@ def test_routeserver_routeserver_config(db, pdb_data, account_objects):
     assert models.RouteserverConfig.objects.filter(routeserver=rs).exists()
 
 
+def test_ix_ars_clients_shared(
+    db, pdb_data, account_objects, arouteserver, monkeypatch
+):
+    rs = account_objects.routeserver
+    ix = rs.ix
+    rs_b = models.Routeserver.objects.create(
+        ix=ix, name="rs2", asn=rs.asn, router_id="192.0.2.2"
+    )
+
+    build_ars_clients = models.InternetExchange.build_ars_clients
+    calls = []
+
+    def build(ix, rs_peers=None):
+        calls.append(ix)
+        return build_ars_clients(ix, rs_peers)
+
+    monkeypatch.setattr(models.InternetExchange, "build_ars_clients", build)
+
+    # built once for all route servers of the exchange
+
+    rs.routeserver_config.generate()
+    rs_b.routeserver_config.generate()
+
+    assert len(calls) == 1
+    assert rs.routeserver_config.ars_clients == rs_b.routeserver_config.ars_clients
+    assert rs_b.ars_clients == build_ars_clients(ix)
+
+    # member fields that do not end up in the clients config
+
+    key = ix.get_ars_clients_key()
+
+    ixmember = ix.member_set.filter(is_rs_peer=True).first()
+    ixmember.name = "Changed name"
+    ixmember.save()
+
+    assert ix.get_ars_clients_key() == key
+
+    # clients changed
+
+    ixmember.ipaddr4 = "206.41.110.99"
+    ixmember.save()
+
+    assert ix.get_ars_clients_key() != key
+
+    calls.clear()
+    clients = rs.ars_clients
+    assert rs_b.ars_clients == clients
+    assert len(calls) == 1
+    assert "206.41.110.99" in [
+        ip for client in clients["clients"] for ip in client["ip"]
+    ]
+
+    # as-set changed at the source of truth
+
+    key = ix.get_ars_clients_key()
+
+    monkeypatch.setattr(
+        models.InternetExchangeMember,
+        "as_macro",
+        property(lambda member: "AS-CHANGED"),
+    )
+
+    assert ix.get_ars_clients_key() != key
+    assert rs.ars_clients["clients"][0]["cfg"]["filtering"]["irrdb"]["as_sets"] == [
+        "AS-CHANGED"
+    ]
+
+
 @pytest.mark.skip
 def test_routeserver_config(db, pdb_data, account_objects):
     try:
@@ -222,3 +294,238 @@ def test_routeserver_config_outdated_update_ixmember(db, pdb_data, account_objec
     ixmember.name = "Changed name"
     ixmember.save()
     assert routeserver_config.outdated is True
+
+
+def test_routeserver_config_get_outdated(
+    db, pdb_data, account_objects, django_assert_num_queries
+):
+    rs = account_objects.routeserver
+    rs_b = models.Routeserver.objects.create(
+        ix=rs.ix, name="rs2", asn=rs.asn, router_id="192.0.2.2"
+    )
+
+    models.RouteserverConfig.create_missing()
+
+    configs = models.RouteserverConfig.objects.filter(routeserver__in=[rs, rs_b])
+    assert configs.count() == 2
+
+    with django_assert_num_queries(1):
+        assert list(models.RouteserverConfig.get_outdated(configs)) == []
+
+    # route server updated
+
+    rs.ars_type = "bird2"
+    rs.save()
+
+    with django_assert_num_queries(1):
+        outdated = list(models.RouteserverConfig.get_outdated(configs))
+
+    assert [config.routeserver_id for config in outdated] == [rs.id]
+
+    # rs peer updated (bypassing the signal that queues regeneration)
+
+    ixmember = rs.ix.member_set.filter(is_rs_peer=True).first()
+    updated = timezone.now()
+    models.InternetExchangeMember.objects.filter(id=ixmember.id).update(updated=updated)
+
+    outdated = models.RouteserverConfig.get_outdated(configs)
+    assert {config.routeserver_id for config in outdated} == {rs.id, rs_b.id}
+    assert outdated[0].last_member_update == updated
+
+    for config in outdated:
+        assert config.outdated is True
+
+
+def test_routeserver_config_create_missing(db, pdb_data, account_objects):
+    rs = account_objects.routeserver
+    models.RouteserverConfig.objects.filter(routeserver=rs).delete()
+
+    created = models.RouteserverConfig.create_missing()
+
+    assert [config.routeserver_id for config in created] == [rs.id]
+    assert models.RouteserverConfig.create_missing() == []
+
+
+def test_routeserver_config_generate_noop(db, pdb_data, account_objects, arouteserver):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+
+    # bird v1, one run per ip version
+
+    assert routeserver_config.generate() == "generated"
+    assert len(arouteserver.calls) == 2
+    assert routeserver_config.input_hash
+    body = routeserver_config.body
+
+    # inputs unchanged
+
+    assert routeserver_config.generate() == "no-op"
+    assert len(arouteserver.calls) == 2
+    assert routeserver_config.body == body
+    assert routeserver_config.outdated is False
+
+    # member fields that do not end up in the clients config
+
+    ixmember = rs.ix.member_set.filter(is_rs_peer=True).first()
+    ixmember.name = "Changed name"
+    ixmember.save()
+
+    assert routeserver_config.generate() == "no-op"
+    assert len(arouteserver.calls) == 2
+
+    # forced
+
+    assert routeserver_config.generate(force=True) == "generated"
+    assert len(arouteserver.calls) == 4
+
+    # clients changed
+
+    ixmember.ipaddr4 = "206.41.110.99"
+    ixmember.save()
+
+    assert routeserver_config.generate() == "generated"
+    assert len(arouteserver.calls) == 6
+
+    # ars type changed
+
+    rs.ars_type = "bird2"
+    rs.save()
+
+    assert routeserver_config.generate() == "generated"
+    assert len(arouteserver.calls) == 7
+    assert "--target-version" in arouteserver.calls[-1]
+
+
+def test_routeserver_config_generate_noop_artifacts(
+    db, pdb_data, account_objects, arouteserver, monkeypatch
+):
+    routeserver_config = account_objects.routeserver.routeserver_config
+    assert routeserver_config.generate() == "generated"
+
+    # the no-op check does not read the configs
+
+    routeserver_config = models.RouteserverConfig.objects.get(id=routeserver_config.id)
+
+    def read(digest):
+        raise AssertionError("config was read")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(django_ixctl.artifacts, "read", read)
+        assert routeserver_config.generate() == "no-op"
+
+    # a missing artifact is generated again
+
+    os.remove(django_ixctl.artifacts.find(routeserver_config.body6_digest)[0])
+
+    assert routeserver_config.generate() == "generated"
+    assert routeserver_config.body6
+
+
+def test_routeserver_config_generate_ip_versions(
+    db, pdb_data, account_objects, arouteserver
+):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+
+    assert rs.ars_type == "bird"
+    assert routeserver_config.generate() == "generated"
+
+    ip_versions = sorted(cmd[cmd.index("--ip-ver") + 1] for cmd in arouteserver.calls)
+    assert ip_versions == ["4", "6"]
+
+    # each run has its own directory
+
+    assert len({cmd[cmd.index("-o") + 1] for cmd in arouteserver.calls}) == 2
+
+    assert routeserver_config.body
+    assert routeserver_config.body6
+    assert routeserver_config.get_body(4) == routeserver_config.body
+    assert routeserver_config.get_body(6) == routeserver_config.body6
+
+    # configs generated before ip versions were split are regenerated
+
+    routeserver_config.body6 = None
+    routeserver_config.save()
+    assert routeserver_config.generate() == "generated"
+    assert len(arouteserver.calls) == 4
+
+    # a single config for both ip versions
+
+    rs.ars_type = "bird2"
+    rs.save()
+
+    assert routeserver_config.generate() == "generated"
+    assert len(arouteserver.calls) == 5
+    assert routeserver_config.body6 is None
+    assert routeserver_config.get_body(6) == routeserver_config.body
+
+
+def test_routeserver_config_queue_generate(db, pdb_data, account_objects, settings):
+    rs = account_objects.routeserver
+    routeserver_config = rs.routeserver_config
+    settings.IXCTL_RSCONF_QUIET_PERIOD = 30
+
+    tasks = models.RsConfGenerate.objects.filter(limit_id=routeserver_config.id)
+
+    # rapid changes are coalesced into one pending task
+
+    task = routeserver_config.queue_generate()
+
+    for ixmember in rs.ix.member_set.all():
+        ixmember.speed = 100000
+        ixmember.save()
+
+    assert routeserver_config.queue_generate() == task
+    assert tasks.count() == 1
+
+    # task waits for the quiet period after the last change
+
+    with pytest.raises(WorkerUnqualified):
+        task.qualifies
+
+    models.RouteserverConfig.objects.filter(id=routeserver_config.id).update(
+        changed=timezone.now() - timedelta(seconds=60)
+    )
+    assert task.qualifies
+
+    # changes during a running generation queue exactly one follow-up
+
+    task.status = "running"
+    task.save()
+
+    follow_up = routeserver_config.queue_generate()
+    assert follow_up.id != task.id
+    assert routeserver_config.queue_generate() == follow_up
+    assert tasks.count() == 2
+
+    # follow-up does not run next to the running generation
+
+    models.RouteserverConfig.objects.filter(id=routeserver_config.id).update(
+        changed=timezone.now() - timedelta(seconds=60)
+    )
+
+    with pytest.raises(WorkerUnqualified):
+        follow_up.qualifies
+
+    task.status = "completed"
+    task.save()
+
+    assert follow_up.qualifies
+
+
+def test_routeserver_config_queue_generate_concurrent(
+    db, pdb_data, account_objects, arouteserver
+):
+    routeserver_config = account_objects.routeserver.routeserver_config
+
+    # another process generates the config after this instance was
+    # loaded
+
+    stale = models.RouteserverConfig.objects.get(id=routeserver_config.id)
+    routeserver_config.generate()
+
+    stale.queue_generate()
+
+    routeserver_config.refresh_from_db()
+    assert routeserver_config.body_digest
+    assert routeserver_config.task == stale.task
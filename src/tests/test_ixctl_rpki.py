@@ -0,0 +1,125 @@
+import json
+import os
+
+import django_ixctl.ars as ars
+import django_ixctl.models as models
+import django_ixctl.rpki as rpki
+from django.core.management import call_command
+from pierky.arouteserver.ripe_rpki_cache import RIPE_RPKI_ROAs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "rpki")
+
+
+def test_load_snapshot(db, settings):
+    snapshot = rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.json"))
+
+    # vrp with max length shorter than the prefix is skipped
+
+    assert snapshot.count == 3
+    assert snapshot.source == "vrps.json"
+    assert snapshot.buildtime.isoformat() == "2026-10-18T08:00:00+00:00"
+
+    vrp = snapshot.vrp_set.get(asn=64501)
+    assert (f"{vrp.prefix}", vrp.max_length, vrp.ta) == ("2001:db8::/32", 48, "arin")
+
+    snapshot_csv = rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.csv"))
+    assert snapshot_csv.count == 2
+    assert models.VrpSnapshot.get_latest() == snapshot_csv
+
+    # older snapshots are removed
+
+    settings.IXCTL_VRP_SNAPSHOTS_KEEP = 1
+    snapshot_csv = rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.csv"))
+    assert list(models.VrpSnapshot.objects.all()) == [snapshot_csv]
+    assert models.Vrp.objects.count() == 2
+
+
+def test_rpki_roas_needed():
+    assert not rpki.rpki_roas_needed({"cfg": {}})
+
+    ars_general = {
+        "cfg": {"filtering": {"rpki_bgp_origin_validation": {"enabled": True}}}
+    }
+    assert rpki.rpki_roas_needed(ars_general)
+
+    ars_general["cfg"]["rpki_roas"] = {"source": "rtr"}
+    assert not rpki.rpki_roas_needed(ars_general)
+
+
+def test_seed_cache(db, settings, tmp_path):
+    settings.IXCTL_ARS_WORK_DIR = str(tmp_path)
+
+    snapshot = rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.json"))
+    cache_dir = ars.get_cache_dir()
+
+    rpki.seed_cache(cache_dir, snapshot)
+
+    # arouteserver finds the ROAs in its cache, expired ROAs are left out
+
+    roas = RIPE_RPKI_ROAs(cache_dir=cache_dir)
+    assert roas.load_data_from_cache()
+    assert sorted(roa["asn"] for roa in roas.raw_data["roas"]) == [
+        "AS64500",
+        "AS64501",
+    ]
+
+    # the snapshot is rendered once
+
+    rendered = rpki.get_rendered_path(snapshot)
+    mtime = os.stat(rendered).st_mtime_ns
+
+    snapshot.vrp_set.all().delete()
+    rpki.seed_cache(cache_dir, snapshot)
+
+    assert os.stat(rendered).st_mtime_ns == mtime
+    assert roas.load_data_from_cache()
+    assert len(roas.raw_data["roas"]) == 2
+
+
+def test_rendered_path_expiry(db, settings, tmp_path):
+    settings.IXCTL_ARS_WORK_DIR = str(tmp_path)
+
+    snapshot = rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.json"))
+    snapshot.vrp_set.filter(asn=64501).update(expires=2000)
+
+    def render(now):
+        with open(rpki.get_rendered_path(snapshot, now=now)) as fh:
+            return sorted(roa["asn"] for roa in json.load(fh)["roas"])
+
+    assert render(1000) == ["AS64500", "AS64501"]
+
+    # reused until the first of its VRPs expires
+
+    assert render(2000) == ["AS64500", "AS64501"]
+    assert render(2001) == ["AS64500"]
+    assert os.listdir(os.path.join(tmp_path, "vrp")) == [f"vrp-{snapshot.id}-0.json"]
+
+
+def test_generate_vrp_local(db, pdb_data, account_objects, arouteserver, settings):
+    settings.IXCTL_VRP_LOCAL = True
+
+    rs = account_objects.routeserver
+    rs.rpki_bgp_origin_validation = True
+    rs.save()
+
+    routeserver_config = rs.routeserver_config
+    path = os.path.join(ars.get_cache_dir(), "ripe-rpki-cache.json")
+
+    # no snapshot loaded yet
+
+    assert routeserver_config.generate() == "generated"
+    assert not os.path.exists(path)
+
+    rpki.load_snapshot(os.path.join(DATA_DIR, "vrps.json"))
+
+    assert routeserver_config.generate() == "generated"
+    with open(path) as fh:
+        assert len(json.load(fh)["data"]["roas"]) == 2
+
+    assert routeserver_config.generate() == "no-op"
+
+
+def test_vrp_import_command(db, capsys):
+    call_command("ixctl_vrp_import", os.path.join(DATA_DIR, "vrps.csv"))
+
+    assert "Loaded 2 VRPs" in capsys.readouterr().out
@@ -1,6 +1,10 @@
+import gzip
 import json
+from datetime import timedelta
 
+import django_ixctl.models as models
 from django.urls import reverse
+from django.utils import timezone
 
 
 def test_view_instance(db, pdb_data, account_objects):
@@ -112,3 +116,220 @@ def test_view_ixf_export_error(db, pdb_data, account_objects, client_anon):
         )
     )
     assert response.status_code == 404
+
+
+def test_view_ixf_export_conditional(
+    db, pdb_data, account_objects, client_anon, django_capture_on_commit_callbacks
+):
+    ix = account_objects.ix
+    url = reverse(
+        "ixf export",
+        args=(
+            account_objects.org.slug,
+            ix.slug,
+        ),
+    )
+
+    response = client_anon.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    # pretty output has its own etag
+
+    pretty_response = client_anon.get(url, {"pretty": 1})
+    assert pretty_response.headers["ETag"] != etag
+    assert pretty_response.headers["Last-Modified"] == last_modified
+
+    # unchanged export
+
+    response = client_anon.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    response = client_anon.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+
+    # export changed by member update
+
+    member = ix.member_set.first()
+    member.speed = 20000
+    with django_capture_on_commit_callbacks(execute=True):
+        member.save()
+
+    response = client_anon.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_view_ixf_export_conditional_member_removed(
+    db, pdb_data, account_objects, client_anon, django_capture_on_commit_callbacks
+):
+    ix = account_objects.ix
+    url = reverse(
+        "ixf export",
+        args=(
+            account_objects.org.slug,
+            ix.slug,
+        ),
+    )
+
+    # exchange and members last changed a day ago
+
+    yesterday = timezone.now() - timedelta(days=1)
+    models.InternetExchange.objects.filter(id=ix.id).update(updated=yesterday)
+    ix.member_set.update(updated=yesterday)
+    ix.member_change_set.update(created=yesterday)
+
+    response = client_anon.get(url)
+    last_modified = response.headers["Last-Modified"]
+
+    # removed members leave no updated timestamp behind, their change
+    # log entry moves the modification time forward
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ix.member_set.first().delete()
+
+    response = client_anon.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] != last_modified
+
+
+def test_view_ixf_export_stream(db, pdb_data, account_objects, client_anon, settings):
+    ix = account_objects.ix
+    url = reverse(
+        "ixf export",
+        args=(
+            account_objects.org.slug,
+            ix.slug,
+        ),
+    )
+
+    response = client_anon.get(url)
+    assert not response.streaming
+
+    settings.IXCTL_IXF_EXPORT_STREAM_THRESHOLD = 1
+
+    streamed = client_anon.get(url)
+    assert streamed.streaming
+    assert streamed.headers["ETag"] == response.headers["ETag"]
+    assert b"".join(streamed.streaming_content) == response.content
+
+    # pretty output is never streamed
+
+    response = client_anon.get(url, {"pretty": 1})
+    assert not response.streaming
+
+
+def test_view_ixf_export_encoding(db, pdb_data, account_objects, client_anon):
+    ix = account_objects.ix
+    url = reverse(
+        "ixf export",
+        args=(
+            account_objects.org.slug,
+            ix.slug,
+        ),
+    )
+
+    response = client_anon.get(url)
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    gzipped = client_anon.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] != response.headers["ETag"]
+    assert gzip.decompress(gzipped.content) == response.content
+
+    # conditional requests are answered per encoding
+
+    response = client_anon.get(
+        url,
+        HTTP_ACCEPT_ENCODING="gzip",
+        HTTP_IF_NONE_MATCH=gzipped.headers["ETag"],
+    )
+    assert response.status_code == 304
+
+    # gzip explicitly refused
+
+    response = client_anon.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0")
+    assert "Content-Encoding" not in response.headers
+
+
+def test_view_ixf_export_instance(db, pdb_data, account_objects, client_anon):
+    ix = account_objects.ix
+    response = client_anon.get(
+        reverse("ixf export instance", args=(account_objects.org.slug,))
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ixp_list"] == [{"ixp_id": ix.id, "shortname": ix.name}]
+
+    ix.ixf_export_privacy = "private"
+    ix.save()
+
+    response = client_anon.get(
+        reverse("ixf export instance", args=(account_objects.org.slug,))
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ixp_list"] == []
+    assert data["member_list"] == []
+
+
+def test_view_ixf_export_delta(db, pdb_data, account_objects, client_anon):
+    ix = account_objects.ix
+    url = reverse("ixf export delta", args=(account_objects.org.slug, ix.slug))
+
+    assert client_anon.get(url).status_code == 400
+    assert client_anon.get(url, {"cursor": "invalid"}).status_code == 400
+    assert client_anon.get(url, {"since": "invalid"}).status_code == 400
+
+    response = client_anon.get(url, {"since": "2000-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    data = response.json()
+    assert {m["asnum"] for m in data["added"]} == set(
+        ix.member_set.values_list("asn", flat=True)
+    )
+
+    member = ix.member_set.first()
+    member.speed = 1
+    member.save()
+
+    response = client_anon.get(url, {"cursor": data["cursor"]})
+    data = response.json()
+    assert data["added"] == []
+    assert [m["member_id"] for m in data["changed"]] == [member.id]
+
+    # private exports require the secret for the delta feed as well
+
+    ix.ixf_export_privacy = "private"
+    ix.save()
+
+    assert client_anon.get(url, {"cursor": data["cursor"]}).status_code == 404
+    assert (
+        client_anon.get(
+            url, {"cursor": data["cursor"], "secret": ix.urlkey}
+        ).status_code
+        == 200
+    )
+
+
+def test_view_ixf_export_version(db, pdb_data, account_objects, client_anon):
+    ix = account_objects.ix
+    url = reverse("ixf export", args=(account_objects.org.slug, ix.slug))
+
+    response = client_anon.get(url)
+    assert response.json()["version"] == "0.6"
+
+    response_10 = client_anon.get(url, {"version": "1.0"})
+    assert response_10.status_code == 200
+    assert response_10.json()["version"] == "1.0"
+    assert response_10.headers["ETag"] != response.headers["ETag"]
+
+    response = client_anon.get(
+        url, {"version": "1.0"}, HTTP_IF_NONE_MATCH=response_10.headers["ETag"]
+    )
+    assert response.status_code == 304
+
+    assert client_anon.get(url, {"version": "0.1"}).status_code == 400